@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark listing queries: full ORM rows vs. column-projected rows.
+
+Seeds a throwaway SQLite database with synthetic articles (content ~8 KB each)
+and times 100-article pages of the listing queries both ways, reporting the
+median latency and the bytes of column data handed back by the driver.
+
+    python -m benchmarks.bench_list_queries --articles 20000 --limit 100
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from models import Base, Article
+from services.news_service import NewsService
+
+CATEGORIES = ["technology", "business", "science", "health", "entertainment", "sports"]
+SOURCES = ["Reuters", "AP", "BBC News", "The Verge", "Bloomberg", "CNN"]
+
+
+def seed(session, count: int, content_bytes: int):
+    rng = random.Random(42)
+    words = "market policy research team report growth launch study data court game film".split()
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        rows.append({
+            "title": f"Synthetic headline {i} about {rng.choice(words)}",
+            "description": " ".join(rng.choice(words) for _ in range(30)),
+            "content": " ".join(rng.choice(words) for _ in range(content_bytes // 6))[:content_bytes],
+            "url": f"https://example.com/articles/{i}",
+            "image_url": f"https://example.com/images/{i}.jpg",
+            "source_name": rng.choice(SOURCES),
+            "author": "Staff",
+            "published_at": now - timedelta(minutes=i),
+            "category": rng.choice(CATEGORIES),
+            "tags": [rng.choice(words) for _ in range(10)],
+            "sentiment_score": rng.uniform(-1, 1),
+            "reading_time": rng.randint(1, 12),
+        })
+        if len(rows) == 5000:
+            session.execute(insert(Article), rows)
+            rows = []
+    if rows:
+        session.execute(insert(Article), rows)
+    session.commit()
+
+
+def row_bytes(values) -> int:
+    total = 0
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes)):
+            total += len(value)
+        elif isinstance(value, (list, dict)):
+            total += len(json.dumps(value))
+        else:
+            total += 8
+    return total
+
+
+def full_row_bytes(article) -> int:
+    return row_bytes(getattr(article, column.key) for column in Article.__table__.columns)
+
+
+def measure(fn, sizer, repeats: int):
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        size = sum(sizer(row) for row in rows)
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--content-bytes", type=int, default=8000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_list_queries.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    print(f"Seeding {args.articles} articles into {path}...")
+    seed(session, args.articles, args.content_bytes)
+
+    service = NewsService()
+    limit = args.limit
+
+    def fresh(fn):
+        # A new session per call so the identity map doesn't carry over between runs
+        def run():
+            s = Session()
+            try:
+                return fn(s)
+            finally:
+                s.close()
+        return run
+
+    cases = {
+        "latest": (
+            lambda s: s.query(Article).order_by(Article.published_at.desc()).limit(limit).all(),
+            lambda s: service.get_latest_articles(s, limit, collapse_clusters=False),
+        ),
+        "category": (
+            lambda s: s.query(Article).filter(Article.category.ilike("technology")).order_by(Article.published_at.desc()).limit(limit).all(),
+            lambda s: service.get_articles_by_category(s, "technology", limit, collapse_clusters=False),
+        ),
+        "source": (
+            lambda s: s.query(Article).filter(Article.source_name.ilike("reuters")).order_by(Article.published_at.desc()).limit(limit).all(),
+            lambda s: service.get_articles_by_source(s, "Reuters", limit),
+        ),
+        "search": (
+            lambda s: s.query(Article).filter(Article.title.ilike("%market%") | Article.description.ilike("%market%") | Article.content.ilike("%market%")).order_by(Article.published_at.desc()).limit(limit).all(),
+            lambda s: service.search_articles(s, "market", limit),
+        ),
+    }
+
+    results = {}
+    print(f"\n{'query':<10} {'orm ms':>9} {'proj ms':>9} {'orm KB':>9} {'proj KB':>9}")
+    for name, (orm_query, projected_query) in cases.items():
+        orm_ms, orm_bytes = measure(fresh(orm_query), full_row_bytes, args.repeats)
+        proj_ms, proj_bytes = measure(fresh(projected_query), row_bytes, args.repeats)
+        results[name] = {
+            "orm_ms": round(orm_ms, 3), "projected_ms": round(proj_ms, 3),
+            "orm_bytes": orm_bytes, "projected_bytes": proj_bytes
+        }
+        print(f"{name:<10} {orm_ms:>9.2f} {proj_ms:>9.2f} {orm_bytes / 1024:>9.1f} {proj_bytes / 1024:>9.1f}")
+
+    print("\n" + json.dumps({"articles": args.articles, "limit": limit, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
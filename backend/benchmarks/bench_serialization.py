@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/news/?limit=100 with the pre-encoded JSON path against the
+previous per-request dict building + jsonable_encoder path.
+
+The previous handler is mounted next to the real one on the same app and
+database, and both are driven in-process through the ASGI test client.
+
+    python -m benchmarks.bench_serialization --articles 5000 --requests 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_serialization.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi import Depends  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from database import SessionLocal, get_db  # noqa: E402
+import main  # noqa: E402
+from routers.news import news_service  # noqa: E402
+from benchmarks.bench_list_queries import seed  # noqa: E402
+
+
+async def legacy_get_news(limit: int = 20, db: Session = Depends(get_db)):
+    """The /api/news/ handler as it was before the serializer: dicts + default encoding"""
+    articles = news_service.get_latest_articles(db, limit)
+    response_articles = []
+    for article in articles:
+        response_articles.append({
+            "id": article.id,
+            "title": article.title,
+            "description": article.description,
+            "url": article.url,
+            "image_url": article.image_url,
+            "source_name": article.source_name,
+            "author": article.author,
+            "published_at": article.published_at.isoformat() if article.published_at else None,
+            "category": article.category,
+            "tags": article.tags,
+            "sentiment_score": article.sentiment_score,
+            "reading_time": article.reading_time
+        })
+    return {
+        "articles": response_articles,
+        "total": len(response_articles),
+        "category": None,
+        "search": None,
+        "personalized": False
+    }
+
+
+def run(client: TestClient, path: str, count: int) -> dict:
+    client.get(path)  # warm up caches
+    start = time.perf_counter()
+    size = 0
+    for _ in range(count):
+        response = client.get(path)
+        size = len(response.content)
+    elapsed = time.perf_counter() - start
+    return {"requests_per_sec": round(count / elapsed, 1), "ms_per_request": round(elapsed / count * 1000, 3), "response_bytes": size}
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    seed(session, args.articles, 2000)
+    session.close()
+
+    main.app.add_api_route("/bench/legacy-news", legacy_get_news, methods=["GET"])
+    client = TestClient(main.app)
+
+    new_path = f"/api/news/?limit={args.limit}"
+    legacy_path = f"/bench/legacy-news?limit={args.limit}"
+    assert json.loads(client.get(new_path).content)["articles"] == client.get(legacy_path).json()["articles"]
+
+    results = {
+        "legacy": run(client, legacy_path, args.requests),
+        "serializer": run(client, new_path, args.requests),
+    }
+    results["speedup"] = round(results["serializer"]["requests_per_sec"] / results["legacy"]["requests_per_sec"], 2)
+    print(json.dumps({"articles": args.articles, "limit": args.limit, "requests": args.requests, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Offline quality and speed benchmark of the AIService recommenders.
+
+A SQLite database (a synthetic corpus from benchmarks.synthetic, or a copy of
+--source) is split in time: reads after the --test-fraction quantile of
+reading_history.created_at are held out and deleted from the scratch copy,
+along with the feedback given after the same time. Each algorithm then
+recommends k articles, as of the end of the timeline, for a sample of users
+who have held-out reads, and is scored against them:
+
+  precision@k, recall@k, ndcg@k, hit_rate@k  - averaged over evaluated users
+  coverage                                   - distinct recommended articles / catalog size
+  latency_ms                                 - p50/p95/p99/mean per call, plus the cold first call
+  memory                                     - tracemalloc peak over --memory-users calls, RSS high-water mark
+
+The report is JSON (with the git revision) so runs can be diffed across
+versions; --compare against an earlier report exits non-zero on regressions.
+
+    python -m benchmarks.eval_recommenders --scale small --output results.json
+    python -m benchmarks.eval_recommenders --source ./personalized_news_ai.db --compare results.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Set
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "eval_recommenders.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DB}"
+
+from sqlalchemy import create_engine, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from database import migrate_schema  # noqa: E402
+from models import Article, ArticleFeedback, ReadingHistory  # noqa: E402
+from services.ai_service import AIService  # noqa: E402
+from benchmarks.synthetic import SCALES, SyntheticCorpus  # noqa: E402
+
+ALGORITHMS = ("content_based", "collaborative", "hybrid")
+QUALITY_METRICS = ("precision", "recall", "ndcg", "hit_rate", "coverage")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def prepare_database(args) -> Dict:
+    """Create the scratch database and describe the dataset"""
+    if args.source:
+        # sqlite3's backup API copies a consistent snapshot even if the source is in use
+        source, target = sqlite3.connect(args.source), sqlite3.connect(SCRATCH_DB)
+        source.backup(target)
+        source.close()
+        target.close()
+        return {"source": args.source}
+    corpus = SyntheticCorpus(days=args.days, seed=args.seed, **SCALES[args.scale])
+    summary = corpus.populate(create_engine(os.environ["DATABASE_URL"]))
+    return {"source": "synthetic", "scale": args.scale, **summary}
+
+
+def time_split(session, test_fraction: float, users: int, seed: int):
+    """Hold out the reads after the split time; returns (split, end, {user: held-out article ids})"""
+    total = session.query(func.count(ReadingHistory.id)).scalar()
+    if not total:
+        sys.exit("No reading history to evaluate; use --scale or a populated --source")
+    offset = int(total * (1 - test_fraction))
+    split = session.query(ReadingHistory.created_at).order_by(ReadingHistory.created_at).offset(offset).limit(1).scalar()
+    end = session.query(func.max(ReadingHistory.created_at)).scalar()
+
+    test_users = [row[0] for row in session.query(ReadingHistory.user_id).filter(
+        ReadingHistory.created_at >= split
+    ).distinct().all()]
+    trained = {row[0] for row in session.query(ReadingHistory.user_id).filter(
+        ReadingHistory.created_at < split
+    ).distinct().all()}
+    # Evaluate users with history on both sides of the split
+    candidates = sorted(u for u in test_users if u in trained)
+    sample = random.Random(seed).sample(candidates, min(users, len(candidates)))
+
+    held_out: Dict[int, Set[int]] = {user_id: set() for user_id in sample}
+    for user_id, article_id in session.query(ReadingHistory.user_id, ReadingHistory.article_id).filter(
+        ReadingHistory.created_at >= split,
+        ReadingHistory.user_id.in_(sample)
+    ).yield_per(10000):
+        held_out[user_id].add(article_id)
+
+    session.query(ReadingHistory).filter(ReadingHistory.created_at >= split).delete(synchronize_session=False)
+    # Likes after the split would leak the held-out reads into the liked-article signals
+    session.query(ArticleFeedback).filter(ArticleFeedback.created_at >= split).delete(synchronize_session=False)
+    session.commit()
+    return split, end, held_out
+
+
+def ndcg(ranked: List[int], relevant: Set[int], k: int) -> float:
+    dcg = sum(1.0 / math.log2(i + 2) for i, article_id in enumerate(ranked[:k]) if article_id in relevant)
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    return dcg / ideal if ideal else 0.0
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 2)
+
+
+def evaluate(service: AIService, session, algorithm: str, held_out: Dict[int, Set[int]], k: int,
+             catalog_size: int, memory_users: int, now: datetime) -> Dict:
+    compute = {
+        "content_based": lambda user_id: service.content_based_recommendations(session, user_id, k, now=now),
+        "collaborative": lambda user_id: service.collaborative_filtering(session, user_id, k),
+        "hybrid": lambda user_id: service.hybrid_recommendations(session, user_id, k, now=now),
+    }[algorithm]
+
+    users = list(held_out)
+    totals = {"precision": 0.0, "recall": 0.0, "ndcg": 0.0, "hit_rate": 0.0}
+    recommended: Set[int] = set()
+    latencies = []
+    for user_id in users:
+        start = time.perf_counter()
+        ranked = [rec["article"].id for rec in compute(user_id)]
+        latencies.append((time.perf_counter() - start) * 1000)
+        relevant = held_out[user_id]
+        hits = len(set(ranked[:k]) & relevant)
+        totals["precision"] += hits / k
+        totals["recall"] += hits / len(relevant)
+        totals["ndcg"] += ndcg(ranked, relevant, k)
+        totals["hit_rate"] += 1.0 if hits else 0.0
+        recommended.update(ranked[:k])
+
+    # Memory is measured in a separate pass: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    for user_id in users[:memory_users]:
+        compute(user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cold, warm = latencies[0], sorted(latencies[1:] or latencies)
+    result = {metric: round(total / len(users), 4) for metric, total in totals.items()}
+    result["coverage"] = round(len(recommended) / catalog_size, 4) if catalog_size else 0.0
+    result["evaluated_users"] = len(users)
+    result["latency_ms"] = {
+        "cold": round(cold, 2),
+        "p50": percentile(warm, 0.50),
+        "p95": percentile(warm, 0.95),
+        "p99": percentile(warm, 0.99),
+        "mean": round(statistics.fmean(warm), 2),
+    }
+    result["memory"] = {
+        "tracemalloc_peak_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return result
+
+
+def compare(report: Dict, baseline: Dict, quality_tolerance: float, latency_tolerance: float) -> List[str]:
+    """Human-readable regressions of report against baseline"""
+    regressions = []
+    for algorithm, current in report["algorithms"].items():
+        previous = baseline.get("algorithms", {}).get(algorithm)
+        if not previous:
+            continue
+        for metric in QUALITY_METRICS:
+            if previous.get(metric) and current[metric] < previous[metric] * (1 - quality_tolerance):
+                regressions.append(f"{algorithm} {metric}: {previous[metric]} -> {current[metric]}")
+        before, after = previous["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        if before and after > before * (1 + latency_tolerance):
+            regressions.append(f"{algorithm} p95 latency: {before} ms -> {after} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Evaluate a copy of this SQLite database instead of synthetic data")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--algorithms", nargs="+", choices=ALGORITHMS, default=list(ALGORITHMS))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--users", type=int, default=200, help="Users evaluated per algorithm")
+    parser.add_argument("--memory-users", type=int, default=20, help="Calls traced for the memory peak")
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--quality-tolerance", type=float, default=0.05, help="Allowed relative drop of quality metrics")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed relative growth of p95 latency")
+    args = parser.parse_args()
+
+    dataset = prepare_database(args)
+    engine = create_engine(os.environ["DATABASE_URL"])
+    migrate_schema(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    split, end, held_out = time_split(session, args.test_fraction, args.users, args.seed)
+    catalog_size = session.query(func.count(Article.id)).scalar()
+    dataset.update({"split_at": split.isoformat(), "end_at": end.isoformat(), "catalog_size": catalog_size})
+
+    report = {
+        "revision": git_revision(),
+        "run_at": datetime.now().isoformat(),
+        "dataset": dataset,
+        "k": args.k,
+        "algorithms": {}
+    }
+    service = AIService()
+    for algorithm in args.algorithms:
+        report["algorithms"][algorithm] = evaluate(
+            service, session, algorithm, held_out, args.k, catalog_size, args.memory_users, end
+        )
+        print(f"{algorithm}: {report['algorithms'][algorithm]}", file=sys.stderr)
+    session.close()
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.quality_tolerance, args.latency_tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    shutil.rmtree(os.path.dirname(SCRATCH_DB), ignore_errors=True)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
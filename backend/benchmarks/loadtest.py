@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+HTTP load test of the API with a weighted mix of realistic requests.
+
+Virtual users loop over scenarios picked by weight (browsing the latest and
+per-category news, personalized feeds, article pages, marking articles read,
+search, analytics, login and the occasional refresh) for --duration seconds,
+after a --warmup that is not recorded. The report has count, RPS, error rate
+and p50/p95/p99 latency per scenario, is JSON (with the git revision), and
+--compare against an earlier report exits non-zero on regressions.
+
+Targets:
+  in-process (default) - the app behind httpx's ASGI transport, sharing the
+                         load generator's event loop
+  --launch             - uvicorn subprocess(es) with --workers workers
+  --url                - an already running server (nothing is seeded)
+
+The database is DATABASE_URL when set (e.g. PostgreSQL), seeded only when
+--scale is given, otherwise a fresh SQLite file seeded with --scale (tiny).
+NewsAPI and the publisher sites are replaced by local stub servers.
+
+    python -m benchmarks.loadtest --scale tiny --duration 30 --output baseline.json
+    python -m benchmarks.loadtest --launch --workers 4 --concurrency 64 --compare baseline.json
+    DATABASE_URL=postgresql://localhost/news_load python -m benchmarks.loadtest --scale small --launch
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# The backend reads DATABASE_URL when database is first imported (by benchmarks.synthetic below)
+SCRATCH_DIR = tempfile.mkdtemp()
+FRESH_DATABASE = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(SCRATCH_DIR, 'loadtest.db')}")
+os.environ.setdefault("CONTENT_CACHE_PATH", os.path.join(SCRATCH_DIR, "content_cache.db"))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from benchmarks.stub_servers import FaultInjectingServer, NewsAPIStub  # noqa: E402
+from benchmarks.synthetic import SCALES, SyntheticCorpus  # noqa: E402
+
+MIXES = {
+    "browse": {
+        "latest": 20, "category": 15, "personalized_feed": 20, "article_detail": 15, "mark_read": 12,
+        "search": 6, "trending": 4, "analytics": 4, "login": 4, "refresh": 0.05,
+    },
+    "write_heavy": {
+        "latest": 10, "personalized_feed": 25, "article_detail": 10, "mark_read": 45, "analytics": 5,
+        "login": 5, "refresh": 0.1,
+    },
+    "login_storm": {"login": 60, "latest": 20, "personalized_feed": 20},
+}
+ACCOUNT_PASSWORD = "loadtest-password"
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 2)
+
+
+class Workload:
+    """Ids and terms the scenarios draw from, discovered through the API (and the database when local)"""
+
+    def __init__(self, article_ids: List[int], user_ids: List[int], categories: List[str],
+                 search_terms: List[str], accounts: List[Dict]):
+        self.article_ids = article_ids
+        self.user_ids = user_ids
+        self.categories = categories
+        self.search_terms = search_terms
+        self.accounts = accounts
+
+    @classmethod
+    async def discover(cls, client: httpx.AsyncClient, database_url: Optional[str], accounts: int) -> "Workload":
+        categories = [c["id"] for c in (await client.get("/api/news/categories")).json()["categories"]]
+        articles = (await client.get("/api/news/", params={"limit": 200, "collapse": False})).json()["articles"]
+        for category in categories:
+            response = await client.get("/api/news/", params={"category": category, "limit": 100, "collapse": False})
+            articles.extend(response.json()["articles"])
+        words = Counter(w for a in articles for w in re.findall(r"[a-z]{5,}", (a.get("title") or "").lower()))
+
+        registered = []
+        for i in range(accounts):
+            account = {"email": f"loadtest{i}@loadtest.example.com", "username": f"loadtest{i}", "password": ACCOUNT_PASSWORD}
+            # 400 means the account exists from an earlier run against the same database
+            response = await client.post("/api/users/register", json=account)
+            if response.status_code not in (200, 400):
+                sys.exit(f"Could not register {account['email']}: {response.status_code} {response.text}")
+            login = await client.post("/api/users/login", json={"email": account["email"], "password": ACCOUNT_PASSWORD})
+            login.raise_for_status()
+            registered.append({**account, "id": login.json()["user"]["id"]})
+
+        user_ids = [a["id"] for a in registered]
+        if database_url:
+            engine = create_engine(database_url)
+            with engine.connect() as conn:
+                user_ids += [row[0] for row in conn.execute(text("SELECT id FROM users ORDER BY id LIMIT 20000"))]
+            engine.dispose()
+
+        if not articles:
+            sys.exit("The target has no articles; seed it with --scale")
+        return cls(sorted({a["id"] for a in articles}), sorted(set(user_ids)), categories,
+                   [w for w, _ in words.most_common(50)] or ["news"], registered)
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, workload: Workload, rng: random.Random) -> httpx.Response:
+    user_id = rng.choice(workload.user_ids)
+    if name == "latest":
+        return await client.get("/api/news/", params={"limit": 20})
+    if name == "category":
+        return await client.get("/api/news/", params={"category": rng.choice(workload.categories), "limit": 20})
+    if name == "personalized_feed":
+        return await client.get("/api/news/", params={"user_id": user_id, "limit": 20})
+    if name == "article_detail":
+        return await client.get(f"/api/news/{rng.choice(workload.article_ids)}")
+    if name == "mark_read":
+        return await client.post(f"/api/news/{rng.choice(workload.article_ids)}/read", params={
+            "user_id": user_id, "read_duration": rng.randint(5, 300), "completed": rng.random() < 0.6
+        })
+    if name == "search":
+        return await client.get("/api/news/", params={"search": rng.choice(workload.search_terms), "limit": 20})
+    if name == "trending":
+        return await client.get("/api/news/trending")
+    if name == "analytics":
+        page = rng.choice(("reading", "preferences", "feedback", "insights"))
+        return await client.get(f"/api/analytics/{user_id}/{page}")
+    if name == "login":
+        account = rng.choice(workload.accounts)
+        return await client.post("/api/users/login", json={"email": account["email"], "password": account["password"]})
+    if name == "refresh":
+        return await client.post("/api/news/refresh")
+    raise ValueError(f"Unknown scenario {name}")
+
+
+class Recorder:
+    """Latencies and outcomes per scenario for the measured window"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, elapsed_ms: float, outcome):
+        self.latencies[name].append(elapsed_ms)
+        self.statuses[name][str(outcome)] += 1
+        if not isinstance(outcome, int) or outcome >= 400:
+            self.errors[name] += 1
+
+    def summary(self, seconds: float) -> Dict:
+        scenarios = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            scenarios[name] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / seconds, 2),
+                "error_rate": round(self.errors[name] / len(latencies), 4),
+                "statuses": dict(self.statuses[name]),
+                "latency_ms": {
+                    "p50": percentile(latencies, 0.50),
+                    "p95": percentile(latencies, 0.95),
+                    "p99": percentile(latencies, 0.99),
+                    "mean": round(statistics.fmean(latencies), 2),
+                    "max": round(latencies[-1], 2),
+                },
+            }
+        every = sorted(value for latencies in self.latencies.values() for value in latencies)
+        total = len(every)
+        overall = {
+            "requests": total,
+            "rps": round(total / seconds, 2),
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else 0.0,
+            "latency_ms": {"p50": percentile(every, 0.50), "p95": percentile(every, 0.95), "p99": percentile(every, 0.99)},
+        }
+        return {"overall": overall, "scenarios": scenarios}
+
+
+async def virtual_user(index: int, client: httpx.AsyncClient, workload: Workload, weights: Dict[str, float],
+                       recorder: Recorder, record_from: float, deadline: float, think_ms: float, seed: int):
+    rng = random.Random(seed * 100003 + index)
+    names, scenario_weights = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=scenario_weights)[0]
+        start = time.perf_counter()
+        try:
+            outcome = (await run_scenario(name, client, workload, rng)).status_code
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        # Requests started in the window count however long they take, so stalls are not hidden
+        if start >= record_from:
+            recorder.record(name, (time.perf_counter() - start) * 1000, outcome)
+        if think_ms:
+            await asyncio.sleep(rng.expovariate(1000 / think_ms))
+
+
+async def drive(client: httpx.AsyncClient, args, weights: Dict[str, float], database_url: Optional[str]) -> Dict:
+    workload = await Workload.discover(client, database_url, args.accounts)
+    print(f"🧪 {len(workload.article_ids)} articles, {len(workload.user_ids)} users, "
+          f"{args.concurrency} virtual users for {args.warmup}s + {args.duration}s", file=sys.stderr)
+    recorder = Recorder()
+    record_from = time.perf_counter() + args.warmup
+    deadline = record_from + args.duration
+    await asyncio.gather(*(
+        virtual_user(i, client, workload, weights, recorder, record_from, deadline, args.think_ms, args.seed)
+        for i in range(args.concurrency)
+    ))
+    return recorder.summary(args.duration)
+
+
+async def run_in_process(args, weights: Dict[str, float], database_url: str) -> Dict:
+    # Imported only once DATABASE_URL and the stub URLs are set
+    import main as backend
+
+    # httpx's ASGI transport does not run the lifespan, so start the background workers here
+    async with backend.app.router.lifespan_context(backend.app):
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await drive(client, args, weights, database_url)
+
+
+async def run_against(url: str, args, weights: Dict[str, float], database_url: Optional[str]) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await drive(client, args, weights, database_url)
+
+
+def launch_server(workers: int, env: Dict[str, str]):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if process.poll() is not None:
+            sys.exit(f"uvicorn exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    sys.exit("uvicorn did not become healthy within 60s")
+
+
+def compare(report: Dict, baseline: Dict, latency_tolerance: float, throughput_tolerance: float,
+            error_tolerance: float) -> List[str]:
+    """Human-readable regressions of report against baseline"""
+    regressions = []
+    previous_scenarios = baseline.get("results", {}).get("scenarios", {})
+    for name, current in report["results"]["scenarios"].items():
+        previous = previous_scenarios.get(name)
+        if not previous:
+            continue
+        before, after = previous["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        if before and after > before * (1 + latency_tolerance):
+            regressions.append(f"{name} p95 latency: {before} ms -> {after} ms")
+        if current["error_rate"] > previous["error_rate"] + error_tolerance:
+            regressions.append(f"{name} error rate: {previous['error_rate']} -> {current['error_rate']}")
+    before, after = baseline.get("results", {}).get("overall", {}).get("rps"), report["results"]["overall"]["rps"]
+    if before and after < before * (1 - throughput_tolerance):
+        regressions.append(f"throughput: {before} rps -> {after} rps")
+    return regressions
+
+
+def parse_weights(args) -> Dict[str, float]:
+    weights = dict(MIXES[args.mix])
+    for override in args.weight or []:
+        name, _, value = override.partition("=")
+        if name not in MIXES["browse"]:
+            sys.exit(f"Unknown scenario {name}; choose from {', '.join(MIXES['browse'])}")
+        weights[name] = float(value)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    parser.add_argument("--launch", action="store_true", help="Serve the app from a uvicorn subprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --launch")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Synthetic corpus to seed (default tiny for a fresh database)")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    parser.add_argument("--weight", action="append", metavar="SCENARIO=WEIGHT", help="Override one scenario weight")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unrecorded seconds before measuring")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a virtual user's requests")
+    parser.add_argument("--accounts", type=int, default=5, help="Accounts registered for the login scenario")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed relative growth of p95 latency")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.2, help="Allowed relative drop of overall RPS")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="Allowed absolute growth of error rates")
+    args = parser.parse_args()
+    weights = parse_weights(args)
+
+    database_url = None
+    dataset: Dict = {"source": args.url}
+    publisher = newsapi = process = None
+    if not args.url:
+        database_url = os.environ["DATABASE_URL"]
+        scale = args.scale or ("tiny" if FRESH_DATABASE else None)
+        dataset = {"source": "synthetic" if FRESH_DATABASE else database_url}
+        if scale:
+            corpus = SyntheticCorpus(days=args.days, seed=args.seed, **SCALES[scale])
+            engine = create_engine(database_url)
+            dataset.update(scale=scale, **corpus.populate(engine))
+            engine.dispose()
+
+        publisher = FaultInjectingServer().start()
+        newsapi = NewsAPIStub(publisher.base_url, articles_per_page=2).start()
+        os.environ.update({"NEWS_API_BASE_URL": newsapi.base_url, "NEWS_API_KEY": "loadtest"})
+        # Keep a refresh to a handful of stub articles so it does not dominate the run
+        os.environ.setdefault("NEWSAPI_CALLS_PER_REFRESH", "5")
+
+    try:
+        if args.url:
+            results = asyncio.run(run_against(args.url, args, weights, None))
+        elif args.launch:
+            process, url = launch_server(args.workers, dict(os.environ))
+            results = asyncio.run(run_against(url, args, weights, database_url))
+        else:
+            results = asyncio.run(run_in_process(args, weights, database_url))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        for server in (newsapi, publisher):
+            if server:
+                server.stop()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "run_at": datetime.now().isoformat(),
+        "target": args.url or (f"uvicorn --workers {args.workers}" if args.launch else "in-process"),
+        "dataset": dataset,
+        "mix": weights,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "stubs": {"newsapi_requests": sum(newsapi.requests.values()), "publisher_requests": sum(publisher.requests.values())}
+        if newsapi else None,
+        "results": results,
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.latency_tolerance, args.throughput_tolerance,
+                                  args.error_tolerance)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Article analysis throughput: in-process against the NLP worker pool at
+several worker counts, for ingestion batches (analyze_many) and for
+concurrent /analyze-article style calls going through the micro-batcher.
+
+Throughput can only scale with the worker count up to the number of cores.
+
+    python -m benchmarks.nlp_pool --articles 400 --workers 0 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.nlp_pool import NLPWorkerPool  # noqa: E402
+
+WORDS = (
+    "market economy election football movie research hospital software startup "
+    "investors policy championship award discovery patient stock senate film "
+    "study innovation game treatment trading company government science music"
+).split()
+
+
+def make_articles(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [{
+        "title": " ".join(rng.choices(WORDS, k=8)).capitalize(),
+        "description": " ".join(rng.choices(WORDS, k=30)),
+        "content": " ".join(rng.choices(WORDS, k=200)),
+    } for _ in range(count)]
+
+
+async def concurrent_calls(pool: NLPWorkerPool, articles: list, concurrency: int) -> None:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(article):
+        async with limit:
+            await pool.analyze(article)
+
+    await asyncio.gather(*[one(article) for article in articles])
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    articles = make_articles(args.articles)
+    results = {"cpus": os.cpu_count(), "articles": args.articles, "runs": []}
+    for workers in args.workers:
+        pool = NLPWorkerPool(workers=workers)
+        pool.start()
+        pool.analyze_many(articles[:workers * 2])  # warm up
+
+        start = time.perf_counter()
+        pool.analyze_many(articles)
+        batch_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(concurrent_calls(pool, articles, args.concurrency))
+        concurrent_elapsed = time.perf_counter() - start
+
+        results["runs"].append({
+            "workers": workers,
+            "analyze_many_per_sec": round(args.articles / batch_elapsed, 1),
+            "concurrent_per_sec": round(args.articles / concurrent_elapsed, 1),
+            "avg_batch_size": pool.stats()["avg_batch_size"],
+        })
+        pool.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Check that no route's SQL statement count grows with the data behind it.
+
+A scratch SQLite database is seeded with a small synthetic corpus, every GET
+route of the app (path parameters filled from the data) plus the POST
+recommendation and personalized-feed variants are requested once, then the
+chosen user's reading history and likes grow by --grow rows and every route
+is requested again. Routes running more statements the second time are
+loading rows one by one (an N+1 pattern) and fail the check (exit 1).
+
+New GET routes are picked up automatically; routes with path parameters not
+in path_values() are listed as skipped until a value is added there.
+
+    python -m benchmarks.query_scaling --grow 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "query_scaling.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DB}"
+
+from fastapi.routing import APIRoute  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, insert  # noqa: E402
+from database import engine, SessionLocal  # noqa: E402
+from models import Article, ReadingHistory, ArticleFeedback  # noqa: E402
+from services.events import event_bus, READING_RECORDED  # noqa: E402
+from services.query_guard import QueryScalingGuard  # noqa: E402
+from benchmarks.synthetic import SyntheticCorpus  # noqa: E402
+
+# Routes that are not about the data (or would call out to the internet)
+SKIPPED_PATHS = {"/metrics", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"}
+
+
+def path_values(session, user_id: int) -> dict:
+    article = session.query(Article).filter(Article.id == session.query(func.min(Article.id)).scalar_subquery()).one()
+    return {"user_id": user_id, "article_id": article.id, "source_name": article.source_name, "category": article.category}
+
+
+def register_routes(guard: QueryScalingGuard, app, client: TestClient, values: dict) -> list:
+    skipped = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods or route.path in SKIPPED_PATHS:
+            continue
+        params = route.param_convertors.keys()
+        if any(name not in values for name in params):
+            skipped.append(route.path)
+            continue
+        url = route.path.format(**{name: values[name] for name in params})
+        guard.register(f"GET {route.path}", lambda url=url: client.get(url))
+
+    user_id = values["user_id"]
+    guard.register("GET /api/news/?user_id", lambda: client.get("/api/news/", params={"user_id": user_id}))
+    guard.register("GET /api/news/?category", lambda: client.get("/api/news/", params={"category": values["category"]}))
+    for algorithm in ("content_based", "collaborative", "hybrid"):
+        guard.register(f"POST /api/ai/recommendations [{algorithm}]", lambda algorithm=algorithm: client.post(
+            "/api/ai/recommendations", json={"user_id": user_id, "limit": 10, "algorithm": algorithm}
+        ))
+    return skipped
+
+
+def grow_history(session, user_id: int, reads: int, seed: int):
+    """Give the user `reads` more reads (a tenth of them liked) of random articles"""
+    rng = random.Random(seed)
+    article_ids = [row[0] for row in session.query(Article.id).all()]
+    now = datetime.now()
+    picks = [rng.choice(article_ids) for _ in range(reads)]
+    session.execute(insert(ReadingHistory), [
+        {"user_id": user_id, "article_id": article_id, "created_at": now, "read_duration": 60, "completed": True}
+        for article_id in picks
+    ])
+    session.execute(insert(ArticleFeedback), [
+        {"user_id": user_id, "article_id": article_id, "liked": True, "rating": 5, "created_at": now}
+        for article_id in picks[::10]
+    ])
+    session.commit()
+    event_bus.publish(READING_RECORDED, user_id=user_id, article_id=picks[-1])
+
+
+def read_every_category(session, user_id: int):
+    """One read per category, so per-category fan-outs (capped by the profile's breadth) start at their cap"""
+    article_ids = [row[0] for row in session.query(func.min(Article.id)).group_by(Article.category).all()]
+    session.execute(insert(ReadingHistory), [
+        {"user_id": user_id, "article_id": article_id, "created_at": datetime.now(), "read_duration": 60, "completed": True}
+        for article_id in article_ids
+    ])
+    session.commit()
+    event_bus.publish(READING_RECORDED, user_id=user_id, article_id=article_ids[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grow", type=int, default=200, help="Reads added to the user between measurements")
+    parser.add_argument("--slack", type=int, default=0, help="Extra statements allowed after growing")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(articles=500, users=20, reads=400, seed=args.seed, feedback_rate=0.1)
+    corpus.populate(engine)
+
+    import main as backend  # The app binds to DATABASE_URL on import
+
+    session = SessionLocal()
+    user_id = session.query(ReadingHistory.user_id).group_by(ReadingHistory.user_id).order_by(
+        func.count(ReadingHistory.id)
+    ).first()[0]
+    read_every_category(session, user_id)
+    values = path_values(session, user_id)
+
+    # No `with`: the lifespan's background workers would add statements of their own
+    client = TestClient(backend.app, raise_server_exceptions=False)
+    guard = QueryScalingGuard(engine, slack=args.slack)
+    skipped = register_routes(guard, backend.app, client, values)
+
+    def check(name, response):
+        if response.status_code >= 500:
+            sys.exit(f"{name} failed with {response.status_code}: {response.text[:200]}")
+
+    before = guard.measure(check)
+    grow_history(session, user_id, args.grow, args.seed)
+    after = guard.measure(check)
+    session.close()
+
+    violations = guard.violations()
+    print(json.dumps({
+        "user_id": user_id,
+        "grown_by": args.grow,
+        "statements": {name: {"before": before[name], "after": after[name]} for name in before},
+        "skipped": skipped,
+        "violations": violations,
+    }, indent=2))
+    if violations:
+        print("Statement counts grew with the data:\n  " + "\n  ".join(violations), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Offline replay of reading_history to compare recommendation configurations.
+
+Reads are replayed in time order into a scratch SQLite database, with each
+article inserted once its published_at has passed. At sampled reads the
+content-based recommender is asked for its top k as of that moment (before
+the read is recorded) and scores a hit if the article actually read is among
+them. Every configuration replays the same events and the same sample.
+
+Configurations compared:
+  baseline  - no history decay, no freshness prior (the previous behaviour)
+  decayed   - PROFILE_HALF_LIFE_DAYS / FEEDBACK_HALF_LIFE_DAYS decay plus the
+              FRESHNESS_WEIGHT / FRESHNESS_HALF_LIFE_HOURS prior
+
+Events come from the database at --source (default: DATABASE_URL), or from a
+synthetic timeline of users whose interests drift (--synthetic).
+
+    python -m benchmarks.replay_eval --synthetic --users 200 --days 30 --sample 300
+    python -m benchmarks.replay_eval --source sqlite:///./personalized_news_ai.db
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from models import Base, Article, User, UserPreference, ReadingHistory  # noqa: E402
+from services.ai_service import AIService  # noqa: E402
+from services.candidates import CandidateGenerator  # noqa: E402
+from services.events import event_bus, ARTICLES_INGESTED  # noqa: E402
+from services.user_profiles import UserProfileStore  # noqa: E402
+from benchmarks.bench_list_queries import CATEGORIES, SOURCES  # noqa: E402
+
+ARTICLE_COLUMNS = (
+    "id", "title", "description", "content", "url", "image_url", "source_name", "author",
+    "published_at", "category", "tags", "sentiment_score", "reading_time"
+)
+WORDS = "market policy research team report growth launch study data court game film vote storm deal".split()
+
+
+def synthetic_events(users: int, days: int, articles_per_day: int, reads_per_day: int, seed: int = 7) -> Dict:
+    """A timeline of articles and reads by users who favour two categories and switch one halfway"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    articles = []
+    for i in range(days * articles_per_day):
+        category = rng.choice(CATEGORIES)
+        word = rng.choice(WORDS)
+        articles.append({
+            "id": i + 1,
+            "title": f"{category.title()} story {i} on the {word} {rng.choice(WORDS)}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(25)),
+            "content": " ".join(rng.choice(WORDS) for _ in range(200)),
+            "url": f"https://example.com/replay/{i}",
+            "image_url": None,
+            "source_name": rng.choice(SOURCES),
+            "author": "Staff",
+            "published_at": start + timedelta(seconds=rng.uniform(0, days * 86400)),
+            "category": category,
+            "tags": [word] + [rng.choice(WORDS) for _ in range(4)],
+            "sentiment_score": rng.uniform(-1, 1),
+            "reading_time": rng.randint(1, 12),
+        })
+    articles.sort(key=lambda a: a["published_at"])
+    by_category = {c: [a for a in articles if a["category"] == c] for c in CATEGORIES}
+
+    user_rows, preferences, reads = [], [], []
+    for user_id in range(1, users + 1):
+        user_rows.append({"id": user_id, "email": f"replay{user_id}@example.com", "username": f"replay{user_id}",
+                          "hashed_password": "-", "is_active": True})
+        favourites = rng.sample(CATEGORIES, 2)
+        # Stated preferences reflect the interests at sign-up only
+        preferences.extend({"user_id": user_id, "category": c, "weight": 1.0} for c in favourites)
+        drifted = favourites[:1] + [rng.choice([c for c in CATEGORIES if c not in favourites])]
+        for day in range(days):
+            current = favourites if day < days // 2 else drifted
+            for _ in range(reads_per_day):
+                at = start + timedelta(days=day, seconds=rng.uniform(0, 86400))
+                category = rng.choice(current) if rng.random() < 0.8 else rng.choice(CATEGORIES)
+                recent = [a for a in by_category[category] if at - timedelta(days=2) <= a["published_at"] <= at]
+                if not recent:
+                    continue
+                # News is read fresh: favour the newest articles
+                article = recent[-1 - min(int(rng.expovariate(0.25)), len(recent) - 1)]
+                reads.append({"user_id": user_id, "article_id": article["id"], "created_at": at})
+    reads.sort(key=lambda r: r["created_at"])
+    return {"articles": articles, "users": user_rows, "preferences": preferences, "reads": reads}
+
+
+def source_events(url: str) -> Dict:
+    """Articles, users, preferences and reads of an existing database"""
+    engine = create_engine(url)
+    session = sessionmaker(bind=engine)()
+    articles = [dict(zip(ARTICLE_COLUMNS, row)) for row in session.query(
+        *(getattr(Article, column) for column in ARTICLE_COLUMNS)
+    ).order_by(Article.published_at).all()]
+    users = [{"id": u.id, "email": u.email, "username": u.username, "hashed_password": u.hashed_password,
+              "is_active": u.is_active} for u in session.query(User).all()]
+    preferences = [{"user_id": p.user_id, "category": p.category, "weight": p.weight}
+                   for p in session.query(UserPreference).all()]
+    reads = [{"user_id": user_id, "article_id": article_id, "created_at": created_at}
+             for user_id, article_id, created_at in session.query(
+                 ReadingHistory.user_id, ReadingHistory.article_id, ReadingHistory.created_at
+             ).filter(ReadingHistory.created_at.isnot(None)).order_by(ReadingHistory.created_at).all()]
+    session.close()
+    return {"articles": articles, "users": users, "preferences": preferences, "reads": reads}
+
+
+def sample_reads(events: Dict, sample: int, warmup: float, seed: int = 11) -> set:
+    """Indices of reads to evaluate, skipping the warm-up share of the timeline"""
+    reads = events["reads"]
+    eligible = list(range(int(len(reads) * warmup), len(reads)))
+    return set(random.Random(seed).sample(eligible, min(sample, len(eligible))))
+
+
+def replay(events: Dict, service: AIService, sampled: set, k: int) -> Dict:
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'replay.db')}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.execute(insert(User), events["users"])
+    if events["preferences"]:
+        session.execute(insert(UserPreference), events["preferences"])
+    session.commit()
+
+    articles, reads = events["articles"], events["reads"]
+    next_article, pending_reads = 0, []
+    hits, reciprocal_ranks, latencies = 0, [], []
+
+    for index, read in enumerate(reads):
+        if index in sampled:
+            new_articles = []
+            while next_article < len(articles) and articles[next_article]["published_at"] <= read["created_at"]:
+                new_articles.append(articles[next_article])
+                next_article += 1
+            if new_articles:
+                session.execute(insert(Article), new_articles)
+            if pending_reads:
+                session.execute(insert(ReadingHistory), pending_reads)
+                pending_reads = []
+            session.commit()
+            if new_articles:
+                event_bus.publish(ARTICLES_INGESTED, article_ids=[a["id"] for a in new_articles])
+
+            start = time.perf_counter()
+            recommendations = service.content_based_recommendations(session, read["user_id"], k, now=read["created_at"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            ranked = [rec["article"].id for rec in recommendations]
+            if read["article_id"] in ranked:
+                hits += 1
+                reciprocal_ranks.append(1.0 / (ranked.index(read["article_id"]) + 1))
+            else:
+                reciprocal_ranks.append(0.0)
+        pending_reads.append(read)
+
+    session.close()
+    evaluated = len(latencies)
+    latencies.sort()
+    return {
+        "evaluated": evaluated,
+        f"hit_rate@{k}": round(hits / evaluated, 4) if evaluated else None,
+        f"mrr@{k}": round(sum(reciprocal_ranks) / evaluated, 4) if evaluated else None,
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 2) if latencies else None,
+            "p95": round(latencies[int(0.95 * (evaluated - 1))], 2) if latencies else None,
+            "mean": round(statistics.fmean(latencies), 2) if latencies else None,
+        }
+    }
+
+
+def configurations() -> List[Tuple[str, AIService]]:
+    """Fresh services (own profile store and candidate index) for each compared setup"""
+    setups = []
+    for name, history_days, feedback_days, freshness in (("baseline", 0, 0, 0.0), ("decayed", None, None, None)):
+        service = AIService(freshness_weight=freshness)
+        service.profile_store = UserProfileStore(
+            lambda tags, description, service=service: service.article_keywords(tags, description, top_n=5),
+            history_half_life_days=history_days,
+            feedback_half_life_days=feedback_days
+        )
+        service.candidate_generator = CandidateGenerator()
+        setups.append((name, service))
+    return setups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=os.getenv("DATABASE_URL", "sqlite:///./personalized_news_ai.db"))
+    parser.add_argument("--synthetic", action="store_true", help="Replay a generated timeline instead of --source")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--articles-per-day", type=int, default=200)
+    parser.add_argument("--reads-per-day", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=300, help="Number of reads to evaluate")
+    parser.add_argument("--warmup", type=float, default=0.3, help="Share of the timeline replayed before evaluating")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        events = synthetic_events(args.users, args.days, args.articles_per_day, args.reads_per_day)
+    else:
+        events = source_events(args.source)
+    if not events["reads"]:
+        sys.exit("No reading history to replay; use --synthetic or point --source at a populated database")
+
+    sampled = sample_reads(events, args.sample, args.warmup)
+    report = {
+        "source": "synthetic" if args.synthetic else args.source,
+        "articles": len(events["articles"]),
+        "users": len(events["users"]),
+        "reads": len(events["reads"]),
+        "k": args.k,
+        "results": {}
+    }
+    for name, service in configurations():
+        report["results"][name] = replay(events, service, sampled, args.k)
+        print(f"{name}: {report['results'][name]}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Local stub HTTP servers for exercising the backend without the internet.
+
+FaultInjectingServer serves publisher-style article pages and can be told to
+fail: fixed status sequences per path, random error rates, added latency,
+Retry-After headers and dropped connections. Point ContentFetcher at it, or
+set NEWS_API_BASE_URL to it, to watch retries and circuit breakers work.
+NewsAPIStub answers NewsAPI requests with fresh articles whose URLs point at
+a publisher stub, so a whole refresh runs offline.
+
+Run standalone:
+    python -m benchmarks.stub_servers --port 8081 --error-rate 0.3 --delay 0.5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ARTICLE_TEMPLATE = """<html>
+<head>
+<title>{title}</title>
+<meta property="og:title" content="{title}">
+<meta name="description" content="Stub article {slug}">
+</head>
+<body>
+<header><h1>{title}</h1><span class="byline">Stub Reporter</span></header>
+<article>{body}</article>
+</body>
+</html>"""
+
+
+class FaultInjectingServer:
+    """Threaded HTTP server with scriptable failures, run in a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, error_rate: float = 0.0,
+                 error_status: int = 503, delay: float = 0.0, retry_after: Optional[str] = None,
+                 seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.delay = delay
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests: Dict[str, int] = defaultdict(int)
+        self._scripts: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, path: str, responses: List):
+        """Queue responses for a path: status codes, "drop" (close the socket) or ("hang", seconds)"""
+        with self._lock:
+            self._scripts[path] = deque(responses)
+
+    def _next_fault(self, path: str):
+        with self._lock:
+            self.requests[path] += 1
+            script = self._scripts.get(path)
+            if script:
+                return script.popleft()
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+    def render(self, path: str) -> bytes:
+        """Page body served for a path; override to serve other content"""
+        slug = path.strip("/").replace("/", "-") or "index"
+        body = " ".join(f"Paragraph text for {slug} number {i}." for i in range(120))
+        return ARTICLE_TEMPLATE.format(title=f"Stub story {slug}", slug=slug, body=body).encode("utf-8")
+
+    def content_type(self, path: str) -> str:
+        return "text/html; charset=utf-8"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                fault = server._next_fault(path)
+                if server.delay:
+                    time.sleep(server.delay)
+
+                if fault == "drop":
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if isinstance(fault, tuple) and fault[0] == "hang":
+                    time.sleep(fault[1])
+                    fault = None
+                if isinstance(fault, int) and fault >= 400:
+                    body = b"injected failure"
+                    self.send_response(fault)
+                    if server.retry_after is not None and fault in (429, 503):
+                        self.send_header("Retry-After", server.retry_after)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                body = server.render(self.path)
+                etag = f'"{zlib.crc32(body):x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", server.content_type(path))
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. a read timeout after an injected hang)
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FaultInjectingServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class NewsAPIStub(FaultInjectingServer):
+    """NewsAPI stand-in: every request returns articles_per_page never-seen articles.
+
+    Article URLs point at publisher_url and content is left short, so the
+    backend goes on to fetch each full page from the publisher stub.
+    """
+
+    def __init__(self, publisher_url: str, articles_per_page: int = 5, **kwargs):
+        super().__init__(**kwargs)
+        self.publisher_url = publisher_url.rstrip("/")
+        self.articles_per_page = articles_per_page
+        self._next_article = 0
+
+    def render(self, path: str) -> bytes:
+        query = parse_qs(urlsplit(path).query)
+        topic = (query.get("category") or query.get("q") or ["general"])[0]
+        with self._lock:
+            first = self._next_article
+            self._next_article += self.articles_per_page
+        articles = [
+            {
+                "source": {"id": None, "name": "Stub Wire"},
+                "author": "Stub Reporter",
+                "title": f"Stub {topic} story {n} from the wire",
+                "description": f"Stub description of {topic} story {n}.",
+                "url": f"{self.publisher_url}/{topic.replace(' ', '-')}/{n}",
+                "urlToImage": None,
+                "publishedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "content": f"Stub {topic} story {n}",
+            }
+            for n in range(first, first + self.articles_per_page)
+        ]
+        return json.dumps({"status": "ok", "totalResults": len(articles), "articles": articles}).encode("utf-8")
+
+    def content_type(self, path: str) -> str:
+        return "application/json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fault-injecting stub publisher server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--retry-after", default=None, help="Retry-After header sent with 429/503")
+    args = parser.parse_args()
+
+    server = FaultInjectingServer(args.host, args.port, args.error_rate, args.error_status, args.delay, args.retry_after)
+    print(f"🧪 Stub server listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Synthetic corpora for recommender benchmarks, grown from the hand-written
+articles of populate_sample_data.py.
+
+Each sample article seeds the vocabulary, tags, sources and typical
+sentiment of its category. Some categories are much busier than others,
+each category's sources follow a power law, and article length (so reading
+time) is log-normal. Generated users favour one to three categories and
+weigh them in their preferences, user activity follows a power law, and
+reads favour recently published articles of the reader's categories. A
+fraction of reads leave feedback, mostly likes. Reads are generated in time
+order, so reading_history ids grow with created_at.
+
+Rows are generated a batch at a time as NumPy columns. On SQLite they go in
+through the driver's executemany in transactions of --transaction-rows rows
+with synchronous writes off; other databases get Core bulk inserts. Indexes
+are dropped during the load and rebuilt at the end. The largest preset
+(1M articles / 100k users / 50M reads) streams in constant memory per batch.
+
+    python -m benchmarks.synthetic --scale small --db /tmp/bench.db
+    python -m benchmarks.synthetic --scale medium --reads 5000000 --db /tmp/bench.db
+    python -m benchmarks.synthetic --scale small --url postgresql://localhost/bench
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import JSON, create_engine, insert, inspect, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from models import Base, Article, User, UserPreference, ReadingHistory, ArticleFeedback  # noqa: E402
+from populate_sample_data import sample_articles  # noqa: E402
+
+SCALES = {
+    "tiny": {"articles": 2000, "users": 200, "reads": 20000},
+    "small": {"articles": 20000, "users": 2000, "reads": 200000},
+    "medium": {"articles": 100000, "users": 10000, "reads": 2000000},
+    "large": {"articles": 1000000, "users": 100000, "reads": 50000000},
+}
+GENERIC_SOURCES = ["Reuters", "AP", "BBC News", "Bloomberg", "CNN", "The Guardian"]
+
+
+def category_templates() -> Dict[str, Dict]:
+    """Vocabulary, tags, sources and sentiment per category, taken from the sample articles"""
+    templates = {}
+    for article in sample_articles():
+        words = re.findall(r"[a-z]+", f"{article['title']} {article['description']} {article['content']}".lower())
+        templates[article["category"]] = {
+            "words": sorted({w for w in words if len(w) > 3}),
+            "tags": article["tags"],
+            "sources": [article["source_name"]] + GENERIC_SOURCES,
+            "sentiment": article["sentiment_score"],
+            "author": article["author"],
+            "image_url": article["image_url"],
+        }
+    return templates
+
+
+def power_law(count: int, exponent: float) -> np.ndarray:
+    """Probabilities of ranks 1..count falling off as rank ** -exponent"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+class BulkWriter:
+    """Inserts column batches through the fastest path the database offers.
+
+    SQLite gets the driver's executemany on one raw connection, with values
+    converted the way SQLAlchemy stores them (datetimes as text, JSON as its
+    text), committing every `transaction_rows` rows. Other databases get a
+    Core bulk insert per batch on a Session.
+    """
+
+    def __init__(self, engine, transaction_rows: int = 1000000):
+        self.transaction_rows = transaction_rows
+        self.sqlite = engine.dialect.name == "sqlite"
+        self.uncommitted = 0
+        self.rows: Dict[str, int] = {}
+        if self.sqlite:
+            self.connection = engine.raw_connection()
+            self.cursor = self.connection.cursor()
+            # A half-written benchmark database is thrown away, so skip durability
+            # (restored in close(), as the connection goes back to the pool)
+            self.pragmas = {name: self._pragma(name)[0][0] for name in ("synchronous", "journal_mode")}
+            self._pragma("synchronous = OFF")
+            self._pragma("journal_mode = MEMORY")
+        else:
+            self.session = Session(bind=engine)
+
+    def _pragma(self, statement: str) -> list:
+        # Fetch every row: an unfinished PRAGMA keeps a statement open and blocks later commits
+        return self.cursor.execute(f"PRAGMA {statement}").fetchall()
+
+    def insert(self, model, columns: Dict[str, Sequence]):
+        table = model.__table__
+        names = list(columns)
+        if self.sqlite:
+            values = [self._sqlite_values(table.c[name], columns[name]) for name in names]
+            self.cursor.executemany(
+                f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                zip(*values)
+            )
+        else:
+            values = [self._python_values(columns[name]) for name in names]
+            self.session.execute(insert(table), [dict(zip(names, row)) for row in zip(*values)])
+
+        count = len(values[0])
+        self.rows[table.name] = self.rows.get(table.name, 0) + count
+        self.uncommitted += count
+        if self.uncommitted >= self.transaction_rows:
+            self.commit()
+
+    @staticmethod
+    def _python_values(column: Sequence) -> list:
+        # datetime64[us] arrays become datetime objects, other arrays Python scalars
+        return column.tolist() if isinstance(column, np.ndarray) else list(column)
+
+    @staticmethod
+    def _sqlite_values(table_column, column: Sequence) -> list:
+        if isinstance(column, np.ndarray) and column.dtype.kind == "M":
+            # SQLAlchemy's SQLite DATETIME format
+            return np.char.replace(np.datetime_as_string(column, unit="us"), "T", " ").tolist()
+        if isinstance(table_column.type, JSON):
+            return [None if value is None else json.dumps(value) for value in column]
+        return BulkWriter._python_values(column)
+
+    def commit(self):
+        if self.sqlite:
+            self.connection.commit()
+        else:
+            self.session.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        if self.sqlite:
+            for name, value in self.pragmas.items():
+                self._pragma(f"{name} = {value}")
+            self.cursor.close()
+            self.connection.close()
+        else:
+            self.session.close()
+
+
+class SyntheticCorpus:
+    """Generates and bulk-inserts a reproducible synthetic dataset"""
+
+    def __init__(self, articles: int, users: int, reads: int, days: int = 30, seed: int = 42,
+                 batch_size: int = 50000, content_words: int = 120, feedback_rate: float = 0.02,
+                 end: Optional[datetime] = None, transaction_rows: int = 1000000):
+        self.articles = articles
+        self.users = users
+        self.reads = reads
+        self.days = days
+        self.batch_size = batch_size
+        self.content_words = content_words
+        self.feedback_rate = feedback_rate
+        self.transaction_rows = transaction_rows
+        self.rng = np.random.default_rng(seed)
+        self.end = end or datetime.now()
+        self.start = self.end - timedelta(days=days)
+        self.start64 = np.datetime64(self.start, "us")
+        self.templates = category_templates()
+        self.categories = sorted(self.templates)
+        # Some categories are much busier than others
+        self.category_weights = power_law(len(self.categories), 0.7)
+
+    def _times(self, offsets: np.ndarray) -> np.ndarray:
+        """Seconds after the window start as datetime64[us]"""
+        return self.start64 + (offsets * 1e6).astype("timedelta64[us]")
+
+    def _texts(self, words: List[str], lengths: np.ndarray) -> List[str]:
+        """One text per length, of words drawn from the vocabulary"""
+        drawn = np.asarray(words, dtype=object)[self.rng.integers(0, len(words), int(lengths.sum()))]
+        ends = np.cumsum(lengths).tolist()
+        starts = [0] + ends[:-1]
+        return [" ".join(drawn[start:end]) for start, end in zip(starts, ends)]
+
+    def _article_batch(self, ids: np.ndarray, codes: np.ndarray, offsets: np.ndarray) -> Dict[str, Sequence]:
+        count = len(ids)
+        titles, descriptions, contents = [None] * count, [None] * count, [None] * count
+        sources, authors, images, tags = [None] * count, [None] * count, [None] * count, [None] * count
+        lengths = np.clip(
+            self.rng.lognormal(np.log(self.content_words), 0.5, count), 20, 8 * self.content_words
+        ).astype(np.int64)
+        sentiment_means = np.array([self.templates[c]["sentiment"] * 0.5 for c in self.categories])
+
+        for code in np.unique(codes):
+            rows = np.flatnonzero(codes == code).tolist()
+            template = self.templates[self.categories[code]]
+            words, template_tags, template_sources = template["words"], template["tags"], template["sources"]
+            for row, text in zip(rows, self._texts(words, np.full(len(rows), 10))):
+                titles[row] = text.capitalize()
+            for row, text in zip(rows, self._texts(words, np.full(len(rows), 30))):
+                descriptions[row] = text
+            for row, text in zip(rows, self._texts(words, lengths[rows])):
+                contents[row] = text
+            # Two distinct template tags and three vocabulary words
+            first = self.rng.integers(0, len(template_tags), len(rows))
+            second = (first + self.rng.integers(1, len(template_tags), len(rows))) % len(template_tags)
+            extra = self.rng.integers(0, len(words), (len(rows), 3))
+            source_picks = self.rng.choice(len(template_sources), len(rows), p=power_law(len(template_sources), 1.1))
+            for i, row in enumerate(rows):
+                tags[row] = [template_tags[first[i]], template_tags[second[i]]] + [words[j] for j in extra[i]]
+                sources[row] = template_sources[source_picks[i]]
+                authors[row] = template["author"]
+                images[row] = template["image_url"]
+
+        category_names = np.array(self.categories, dtype=object)[codes]
+        sentiments = np.clip(self.rng.normal(sentiment_means[codes], 0.35), -1, 1)
+        return {
+            "id": ids,
+            "title": titles,
+            "description": descriptions,
+            "content": contents,
+            "url": [f"https://synthetic.example.com/{category}/{i}" for category, i in zip(category_names, ids.tolist())],
+            "image_url": images,
+            "source_name": sources,
+            "author": authors,
+            "published_at": self._times(offsets),
+            "category": category_names,
+            "tags": tags,
+            "sentiment_score": np.round(sentiments, 4),
+            "reading_time": np.maximum(1, np.round(lengths / 200)).astype(np.int64),
+            "story_cluster_id": ids,
+            "created_at": self._times(offsets),
+        }
+
+    def generate_articles(self, writer: BulkWriter):
+        """Articles with published_at spread uniformly over the window; returns per-category arrays"""
+        category_codes = self.rng.choice(len(self.categories), self.articles, p=self.category_weights)
+        offsets = np.sort(self.rng.uniform(0, self.days * 86400, self.articles))
+        ids = np.arange(1, self.articles + 1)
+        for start in range(0, self.articles, self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            writer.insert(Article, self._article_batch(ids[batch], category_codes[batch], offsets[batch]))
+        writer.commit()
+
+        return {
+            code: (ids[category_codes == code], offsets[category_codes == code])
+            for code in range(len(self.categories))
+        }
+
+    def generate_users(self, writer: BulkWriter) -> np.ndarray:
+        """Users and preferences; returns each user's favourite category codes (-1 padded)"""
+        # One to three favourites each, drawn without replacement by category
+        # popularity (Gumbel top-k: the largest log p + Gumbel noise)
+        keys = np.log(self.category_weights) + self.rng.gumbel(size=(self.users, len(self.categories)))
+        favourites = np.argsort(-keys, axis=1)[:, :3]
+        counts = self.rng.integers(1, 4, self.users)
+        favourites[np.arange(3) >= counts[:, None]] = -1
+
+        for start in range(0, self.users, self.batch_size):
+            user_ids = np.arange(start + 1, min(start + self.batch_size, self.users) + 1)
+            writer.insert(User, {
+                "id": user_ids,
+                "email": [f"user{i}@synthetic.example.com" for i in user_ids.tolist()],
+                "username": [f"user{i}" for i in user_ids.tolist()],
+                "hashed_password": ["-"] * len(user_ids),
+                "is_active": np.ones(len(user_ids), dtype=bool),
+            })
+            chosen = favourites[user_ids - 1]
+            rows, slots = np.nonzero(chosen >= 0)
+            writer.insert(UserPreference, {
+                "user_id": user_ids[rows],
+                "category": np.array(self.categories, dtype=object)[chosen[rows, slots]],
+                "weight": np.round(self.rng.uniform(0.5, 1.0, len(rows)), 2),
+            })
+        writer.commit()
+        return favourites
+
+    def generate_reads(self, writer: BulkWriter, by_category: Dict, favourites: np.ndarray):
+        """Reads in time order, from power-law active users, favouring fresh articles"""
+        activity = self.rng.pareto(1.2, self.users) + 1
+        activity /= activity.sum()
+        generated = 0
+        next_id = 1
+        while generated < self.reads:
+            count = min(self.batch_size, self.reads - generated)
+            # Each batch covers the next slice of the timeline
+            low = generated / self.reads * self.days * 86400
+            high = (generated + count) / self.reads * self.days * 86400
+            times = np.sort(self.rng.uniform(low, high, count))
+            user_idx = self.rng.choice(self.users, count, p=activity)
+
+            user_favourites = favourites[user_idx]
+            slot = self.rng.integers(0, 3, count)
+            codes = user_favourites[np.arange(count), slot]
+            # Unset slots and 20% of reads go to any category
+            explore = (codes < 0) | (self.rng.random(count) < 0.2)
+            codes[explore] = self.rng.choice(len(self.categories), int(explore.sum()), p=self.category_weights)
+
+            article_ids = np.zeros(count, dtype=np.int64)
+            for code in np.unique(codes):
+                mask = codes == code
+                ids, published = by_category[code]
+                if len(ids) == 0:
+                    continue
+                newest = np.searchsorted(published, times[mask], side="right")
+                back = np.floor(self.rng.exponential(20, int(mask.sum()))).astype(np.int64)
+                article_ids[mask] = ids[np.clip(newest - 1 - back, 0, len(ids) - 1)]
+
+            keep = article_ids > 0
+            user_ids, article_ids, created_at = user_idx[keep] + 1, article_ids[keep], self._times(times[keep])
+            durations = np.clip(self.rng.lognormal(np.log(90), 0.8, len(user_ids)), 5, 1800).astype(np.int64)
+            writer.insert(ReadingHistory, {
+                "id": np.arange(next_id, next_id + len(user_ids)),
+                "user_id": user_ids,
+                "article_id": article_ids,
+                "created_at": created_at,
+                "read_duration": durations,
+                "completed": durations >= 60,
+            })
+            next_id += len(user_ids)
+
+            # Mostly likes; the rating follows the thumb
+            feedback = np.flatnonzero(self.rng.random(len(user_ids)) < self.feedback_rate)
+            if len(feedback):
+                liked = self.rng.random(len(feedback)) < 0.85
+                writer.insert(ArticleFeedback, {
+                    "user_id": user_ids[feedback],
+                    "article_id": article_ids[feedback],
+                    "liked": liked,
+                    "rating": np.where(liked, self.rng.integers(4, 6, len(feedback)), self.rng.integers(1, 3, len(feedback))),
+                    "created_at": created_at[feedback],
+                })
+            generated += count
+        writer.commit()
+
+    def populate(self, engine) -> Dict:
+        Base.metadata.create_all(engine)
+        # Building indexes once at the end is much cheaper than maintaining them per row
+        indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+        for index in indexes:
+            index.drop(engine, checkfirst=True)
+
+        writer = BulkWriter(engine, self.transaction_rows)
+        timings = {}
+        start = time.perf_counter()
+        by_category = self.generate_articles(writer)
+        timings["articles_s"] = round(time.perf_counter() - start, 2)
+        start = time.perf_counter()
+        favourites = self.generate_users(writer)
+        timings["users_s"] = round(time.perf_counter() - start, 2)
+        start = time.perf_counter()
+        self.generate_reads(writer, by_category, favourites)
+        timings["reads_s"] = round(time.perf_counter() - start, 2)
+        writer.close()
+
+        start = time.perf_counter()
+        for index in indexes:
+            index.create(engine)
+        timings["indexes_s"] = round(time.perf_counter() - start, 2)
+
+        total_rows = sum(writer.rows.values())
+        total_s = sum(timings.values())
+        return {"articles": self.articles, "users": self.users, "reads": self.reads, "days": self.days,
+                "rows": writer.rows, "generation": timings,
+                "rows_per_minute": round(total_rows / total_s * 60) if total_s else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="SQLite file to create")
+    target.add_argument("--url", help="SQLAlchemy URL of an existing database without articles (any dialect)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--articles", type=int, help="Override the scale's article count")
+    parser.add_argument("--users", type=int, help="Override the scale's user count")
+    parser.add_argument("--reads", type=int, help="Override the scale's read count")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--feedback-rate", type=float, default=0.02, help="Share of reads that leave feedback")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows generated and inserted at a time")
+    parser.add_argument("--transaction-rows", type=int, default=1000000, help="Rows per SQLite transaction")
+    args = parser.parse_args()
+
+    if args.db:
+        if os.path.exists(args.db):
+            sys.exit(f"{args.db} already exists")
+        engine = create_engine(f"sqlite:///{args.db}")
+    else:
+        engine = create_engine(args.url)
+        if inspect(engine).has_table(Article.__tablename__):
+            with engine.connect() as connection:
+                if connection.execute(text(f"SELECT 1 FROM {Article.__tablename__} LIMIT 1")).first():
+                    sys.exit(f"{engine.url.render_as_string(hide_password=True)} already has articles")
+    sizes = dict(SCALES[args.scale])
+    sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+    corpus = SyntheticCorpus(days=args.days, seed=args.seed, feedback_rate=args.feedback_rate,
+                             batch_size=args.batch_size, transaction_rows=args.transaction_rows, **sizes)
+    print(json.dumps(corpus.populate(engine), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Build the recommendation artifacts and publish them to ARTIFACT_DIR.
+
+API workers started with ARTIFACT_DIR set memory-map the published arrays
+instead of building the item similarity model, the topic neighbour index, the
+TF-IDF text features and the article catalog themselves, so extra workers
+cost almost no extra memory and start without touching the corpus (see
+serve.py). With --watch the builder keeps running, folding new reads and
+articles in incrementally and publishing a new version every interval.
+--verify checks the current version against its manifest checksums and exits.
+
+    ARTIFACT_DIR=./artifacts python build_artifacts.py
+    ARTIFACT_DIR=./artifacts python build_artifacts.py --watch 300
+    ARTIFACT_DIR=./artifacts python build_artifacts.py --verify
+"""
+
+import argparse
+import os
+import sys
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Article
+from services.article_catalog import ArticleCatalog
+from services.artifacts import ArtifactStore
+from services.candidates import ArticleNeighbourIndex
+from services.item_similarity import ItemSimilarityModel
+from services.text_features import IncrementalTextFeatures
+
+
+class ArtifactBuilder:
+    """Keeps the models in memory between publishes so each rebuild is incremental"""
+
+    def __init__(self, store: ArtifactStore):
+        self.store = store
+        self.item_similarity = ItemSimilarityModel()
+        self.neighbour_index = ArticleNeighbourIndex()
+        self.text_features = IncrementalTextFeatures()
+        self.catalog = ArticleCatalog()
+        self._max_article_id = 0
+
+    def build(self, db: Session) -> str:
+        start = time.perf_counter()
+        self.item_similarity.refresh(db)
+
+        # Articles ingested by the API workers since the last build
+        max_article_id = db.query(func.max(Article.id)).scalar() or 0
+        if max_article_id > self._max_article_id:
+            new_ids = [row[0] for row in db.query(Article.id).filter(Article.id > self._max_article_id).all()]
+            self.neighbour_index.add_articles(new_ids)
+            self.catalog.add_articles(new_ids)
+            if self._max_article_id:
+                # The first build fits the text features over everything anyway
+                self.text_features.add_articles(new_ids)
+            self._max_article_id = max_article_id
+
+        self.text_features.sync(db)
+        text = self.text_features.text
+        self.catalog.sync(db)
+
+        arrays = {
+            **self.item_similarity.to_arrays(),
+            **self.neighbour_index.to_arrays(db),
+            **text.to_arrays(),
+            **self.catalog.to_arrays(),
+        }
+        version = self.store.publish(arrays, {
+            "item_sim": {
+                "top_k": self.item_similarity.top_k,
+                "window_days": self.item_similarity.window_days,
+                "users": len(self.item_similarity.user_items),
+            },
+            "neighbours": {
+                "max_article_id": max_article_id,
+                "num_perm": self.neighbour_index.minhasher.num_perm,
+                "bands": self.neighbour_index.index.bands,
+                "window_days": self.neighbour_index.window_days,
+            },
+            "text": text.metadata(),
+            "catalog": {"articles": len(self.catalog)},
+        })
+        size_mb = sum(array.nbytes for array in arrays.values()) / 2**20
+        print(f"📦 Published artifact {version} ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+        return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifact-dir", default=os.getenv("ARTIFACT_DIR", "./artifacts"))
+    parser.add_argument("--watch", type=float, help="Keep rebuilding every this many seconds")
+    parser.add_argument("--verify", action="store_true", help="Check the current version's checksums and exit")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.artifact_dir)
+    if args.verify:
+        artifact = store.load()
+        if artifact is None:
+            sys.exit(f"No artifact published in {args.artifact_dir}")
+        try:
+            artifact.verify()
+        except ValueError as e:
+            sys.exit(f"❌ Artifact {artifact.version} is damaged: {e}")
+        print(f"✅ Artifact {artifact.version} matches its manifest ({len(artifact.metadata['files'])} files)")
+        return
+
+    builder = ArtifactBuilder(store)
+    while True:
+        db = SessionLocal()
+        try:
+            builder.build(db)
+        except Exception as e:
+            if not args.watch:
+                raise
+            print(f"❌ Error building artifacts: {e}")
+        finally:
+            db.close()
+        if not args.watch:
+            break
+        try:
+            time.sleep(args.watch)
+        except KeyboardInterrupt:
+            sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Export the article corpus to files and import it into another database.
+
+export streams the articles table, and with --with-history the users,
+reading history and article feedback, from DATABASE_URL into a directory
+holding one gzip-compressed NDJSON file per table and a manifest.json.
+Rows are read through a streaming cursor in --batch-size partitions, so
+memory stays constant however large the tables are. import reads a
+directory back in batches of --batch-size rows, each one bulk INSERT and
+one transaction.
+
+Ids are kept, so history and feedback still point at their users and
+articles. Password hashes are not exported: imported users get a hash of a
+random secret nobody knows, so they cannot log in until their password is
+reset. Import into an empty database, or pass --skip-existing to leave rows
+whose id, URL, email or username is already there. Running API workers
+pick imported articles up on demand; restart them (or rebuild the
+artifacts) to refit the text features.
+
+    python corpus_io.py export ./corpus --with-history --batch-size 20000
+    DATABASE_URL=postgresql://... python corpus_io.py import ./corpus --batch-size 10000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import secrets
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import DateTime, Table, insert, select, text
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine, migrate_schema
+from models import Base, User, Article, ReadingHistory, ArticleFeedback
+from services.auth_service import password_hasher
+from services.serializers import dumps
+
+try:
+    from orjson import loads
+except ImportError:  # orjson is in requirements.txt
+    from json import loads
+
+# Exportable tables, in an order that satisfies their foreign keys on import
+TABLES: Dict[str, Table] = {
+    "users": User.__table__,
+    "articles": Article.__table__,
+    "reading_history": ReadingHistory.__table__,
+    "article_feedback": ArticleFeedback.__table__,
+}
+HISTORY_TABLES = ("users", "reading_history", "article_feedback")
+# Columns written as null on export
+REDACTED = {"users": ("hashed_password",)}
+FILE_FORMAT = "ndjson"
+EXTENSION = ".ndjson.gz"
+
+
+class TableCodec:
+    """Converts rows of one table between database values and file records"""
+
+    def __init__(self, table: Table, unusable_password: Optional[str] = None):
+        self.table = table
+        self.names = [column.name for column in table.columns]
+        self.datetimes = [c.name for c in table.columns if isinstance(c.type, DateTime)]
+        self.redacted = REDACTED.get(table.name, ())
+        self.unusable_password = unusable_password
+
+    def for_export(self, row: Dict) -> Dict:
+        for name in self.redacted:
+            row[name] = None
+        return row
+
+    def from_ndjson(self, record: Dict) -> Dict:
+        for name in self.datetimes:
+            value = record.get(name)
+            if value is not None:
+                record[name] = datetime.fromisoformat(value)
+        if "hashed_password" in self.names and not record.get("hashed_password"):
+            record["hashed_password"] = self.unusable_password
+        return record
+
+
+# Export
+
+def stream_rows(db: Session, table: Table, batch_size: int) -> Iterator[List[Dict]]:
+    """Rows of a table in id order, as partitions of at most batch_size dicts (server-side cursor)"""
+    result = db.connection().execution_options(stream_results=True, yield_per=batch_size).execute(
+        select(table).order_by(table.c.id)
+    )
+    for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+
+def export_table(db: Session, table: Table, path: str, batch_size: int) -> int:
+    codec = TableCodec(table)
+    count = 0
+    with gzip.open(path, "wb", compresslevel=5) as f:
+        for rows in stream_rows(db, table, batch_size):
+            f.write(b"".join(dumps(codec.for_export(row)) + b"\n" for row in rows))
+            count += len(rows)
+    return count
+
+
+def export_corpus(db: Session, directory: str, tables: List[str], batch_size: int) -> Dict:
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"format": FILE_FORMAT, "created_at": datetime.now().isoformat(), "tables": {}}
+    for name in TABLES:
+        if name not in tables:
+            continue
+        filename = f"{name}{EXTENSION}"
+        start = time.perf_counter()
+        count = export_table(db, TABLES[name], os.path.join(directory, filename), batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"📤 {name}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+        manifest["tables"][name] = {
+            "file": filename,
+            "rows": count,
+            "columns": [column.name for column in TABLES[name].columns],
+        }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# Import
+
+def read_records(path: str, codec: TableCodec, batch_size: int) -> Iterator[List[Dict]]:
+    """Records of an exported file in batches of at most batch_size, limited to the table's current columns"""
+    names = set(codec.names)
+    batch = []
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            record = loads(line)
+            batch.append(codec.from_ndjson({k: v for k, v in record.items() if k in names}))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _insert_statement(db: Session, table: Table, skip_existing: bool):
+    if not skip_existing:
+        return insert(table)
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        sys.exit(f"❌ --skip-existing needs ON CONFLICT support, which {dialect} lacks")
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+def import_table(db: Session, table: Table, path: str, batch_size: int, skip_existing: bool,
+                 unusable_password: Optional[str] = None) -> int:
+    codec = TableCodec(table, unusable_password)
+    statement = _insert_statement(db, table, skip_existing)
+    count = 0
+    for records in read_records(path, codec, batch_size):
+        db.execute(statement, records)
+        db.commit()
+        count += len(records)
+    if db.bind.dialect.name == "postgresql":
+        # Explicit ids leave the id sequence behind; move it past the imported rows
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+        ))
+        db.commit()
+    return count
+
+
+def import_corpus(db: Session, directory: str, batch_size: int, skip_existing: bool) -> Dict:
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["format"] != FILE_FORMAT:
+        sys.exit(f"❌ {directory} holds {manifest['format']} files; only {FILE_FORMAT} can be imported")
+    # One bcrypt hash per run, of a secret that is thrown away
+    unusable_password = password_hasher.context.hash(secrets.token_urlsafe(32)) if "users" in manifest["tables"] else None
+
+    imported = {}
+    for name in TABLES:
+        entry = manifest["tables"].get(name)
+        if entry is None:
+            continue
+        start = time.perf_counter()
+        count = import_table(db, TABLES[name], os.path.join(directory, entry["file"]), batch_size, skip_existing, unusable_password)
+        elapsed = time.perf_counter() - start
+        print(f"📥 {name}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+        imported[name] = count
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write the corpus of DATABASE_URL to a directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--with-history", action="store_true", help="Also export users, reading history and feedback")
+    export_parser.add_argument("--batch-size", type=int, default=int(os.getenv("CORPUS_BATCH_SIZE", 5000)))
+
+    import_parser = commands.add_parser("import", help="Load an exported directory into DATABASE_URL")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--batch-size", type=int, default=int(os.getenv("CORPUS_BATCH_SIZE", 5000)))
+    import_parser.add_argument("--skip-existing", action="store_true", help="Leave rows whose id, URL, email or username already exists")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            tables = ["articles"] + (list(HISTORY_TABLES) if args.with_history else [])
+            export_corpus(db, args.directory, tables, args.batch_size)
+        else:
+            Base.metadata.create_all(bind=engine)
+            migrate_schema(engine)
+            import_corpus(db, args.directory, args.batch_size, args.skip_existing)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
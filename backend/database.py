@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -24,6 +24,48 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+def migrate_schema(bind=None):
+    """Bring existing tables up to date with the models.
+    
+    create_all() only creates missing tables, so databases created by an older
+    version get newly added (nullable) columns and indexes created in place.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)} \
+            if inspector.has_table(table.name) else set()
+        for index in table.indexes:
+            if index.unique and index.info.get("keep_newest_duplicate") and index.name not in existing_indexes:
+                _drop_older_duplicates(bind, table.name, [column.name for column in index.columns])
+            try:
+                index.create(bind=bind, checkfirst=True)
+            except Exception as e:
+                # e.g. a unique index over rows that already contain duplicates
+                print(f"⚠️ Could not create index {index.name}: {e}")
+
+def _drop_older_duplicates(bind, table_name: str, columns):
+    """Delete all but the highest-id row of each group of rows sharing `columns`"""
+    not_null = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+    group_by = ", ".join(columns)
+    with bind.begin() as conn:
+        deleted = conn.execute(text(
+            f"DELETE FROM {table_name} WHERE {not_null} AND id NOT IN "
+            f"(SELECT MAX(id) FROM {table_name} WHERE {not_null} GROUP BY {group_by})"
+        )).rowcount
+    if deleted:
+        print(f"🧹 Removed {deleted} duplicate rows from {table_name} before indexing ({group_by})")
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
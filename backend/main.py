@@ -1,30 +1,53 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import uvicorn
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
 
-from database import engine, get_db
+from database import engine, get_db, migrate_schema
 from models import Base
 from routers import news, users, preferences, analytics, ai
 from services.ai_service import AIService
 from services.news_service import NewsService
+from services.item_similarity import get_item_similarity_model
+from services.text_features import get_article_features
+from services.article_catalog import get_article_catalog
+from services.nlp_pool import get_nlp_pool
+from services.event_relay import get_event_relay
+from services.metrics import InstrumentationMiddleware, instrument_engine, render as render_metrics
 
 load_dotenv()
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+migrate_schema(engine)
+instrument_engine(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting Personalized News AI Backend...")
+    get_nlp_pool().start()
+    get_item_similarity_model().start()
+    get_article_features().start()
+    get_article_catalog().start()
+    news.feed_materializer.start()
+    relay = get_event_relay()
+    if relay:
+        relay.start()
     yield
     # Shutdown
     print("🛑 Shutting down Personalized News AI Backend...")
+    if relay:
+        relay.stop()
+    news.feed_materializer.stop()
+    get_article_features().stop()
+    get_item_similarity_model().stop()
+    get_nlp_pool().stop()
 
 app = FastAPI(
     title="Personalized News AI API",
@@ -42,6 +65,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL cost and stage timings, served on /metrics
+app.add_middleware(InstrumentationMiddleware)
+
 # Include routers
 app.include_router(news.router, prefix="/api/news", tags=["news"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -62,6 +88,11 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "personalized-news-ai"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of this worker"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
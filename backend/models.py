@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -22,6 +22,10 @@ class User(Base):
 
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        # Newest articles of a category, read by the recommender's candidate generation
+        Index("ix_articles_category_published_at", "category", "published_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -31,11 +35,12 @@ class Article(Base):
     image_url = Column(String)
     source_name = Column(String)
     author = Column(String)
-    published_at = Column(DateTime(timezone=True))
+    published_at = Column(DateTime(timezone=True), index=True)
     category = Column(String, index=True)
     tags = Column(JSON)  # Store as JSON array
     sentiment_score = Column(Float)
     reading_time = Column(Integer)  # Estimated reading time in minutes
+    story_cluster_id = Column(Integer, index=True)  # ID of the first article reporting the same story
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -44,6 +49,12 @@ class Article(Base):
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
+    __table_args__ = (
+        # One weight per user and category; also the conflict target for bulk upserts.
+        # Older versions could store duplicates; migrate_schema keeps the newest
+        Index("ix_user_preferences_user_category", "user_id", "category", unique=True,
+              info={"keep_newest_duplicate": True}),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -59,11 +70,11 @@ class ReadingHistory(Base):
     __tablename__ = "reading_history"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    article_id = Column(Integer, ForeignKey("articles.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    article_id = Column(Integer, ForeignKey("articles.id"), index=True)
     read_duration = Column(Integer)  # Time spent reading in seconds
     completed = Column(Boolean, default=False)  # Whether user finished reading
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     user = relationship("User", back_populates="reading_history")
@@ -73,7 +84,7 @@ class ArticleFeedback(Base):
     __tablename__ = "article_feedback"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     article_id = Column(Integer, ForeignKey("articles.id"))
     rating = Column(Integer)  # 1-5 rating
     liked = Column(Boolean)  # Thumbs up/down
@@ -97,4 +108,52 @@ class AIRecommendation(Base):
     
     # Relationships
     user = relationship("User")
-    article = relationship("Article") 
\ No newline at end of file
+    article = relationship("Article") 
+
+class FetchWatermark(Base):
+    __tablename__ = "fetch_watermarks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    query_key = Column(String, unique=True, index=True)  # e.g. "top-headlines:technology"
+    last_published_at = Column(DateTime(timezone=True))  # Newest publishedAt seen for this query
+    yield_per_call = Column(Float, default=1.0)  # Smoothed new articles per API call
+    total_calls = Column(Integer, default=0)
+    total_new_articles = Column(Integer, default=0)
+    last_run_at = Column(DateTime(timezone=True))
+
+class NewsAPIUsage(Base):
+    __tablename__ = "news_api_usage"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(String, unique=True, index=True)  # UTC date, YYYY-MM-DD
+    calls = Column(Integer, default=0)
+
+class UserFeedItem(Base):
+    __tablename__ = "user_feed_items"
+    __table_args__ = (
+        # A user's feed is read in one range scan ordered by rank
+        Index("ix_user_feed_items_user_rank", "user_id", "rank"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    rank = Column(Integer)  # 0-based position in the feed
+    article_id = Column(Integer, ForeignKey("articles.id"))
+    score = Column(Float)
+    computed_at = Column(DateTime)  # UTC; the same for every row of one materialization
+
+class BusEvent(Base):
+    __tablename__ = "bus_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String)
+    payload = Column(JSON)  # Keyword arguments of the event
+    origin = Column(String)  # Relay of the process that published it
+    created_at = Column(DateTime)  # UTC; events older than the relay's retention are pruned
+
+class UserFeedClaim(Base):
+    __tablename__ = "user_feed_claims"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    origin = Column(String)  # Process that last took the user's recomputation
+    claimed_at = Column(DateTime)  # UTC; requests made before this are covered by that recomputation
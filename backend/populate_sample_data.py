@@ -7,17 +7,13 @@ import sys
 import os
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from database import engine, get_db
+from database import engine, get_db, migrate_schema
 from models import Article, Base
 import random
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-def create_sample_articles():
-    """Create sample articles for testing"""
-    
-    sample_articles = [
+def sample_articles():
+    """Hand-written articles, one per category; also the templates of the synthetic benchmark data"""
+    return [
         {
             "title": "AI Breakthrough: New Machine Learning Model Achieves 99% Accuracy",
             "description": "Researchers at Stanford University have developed a revolutionary machine learning model that achieves unprecedented accuracy in image recognition tasks.",
@@ -103,6 +99,12 @@ def create_sample_articles():
             "reading_time": 3
         }
     ]
+
+def create_sample_articles():
+    """Create sample articles for testing"""
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+    migrate_schema(engine)
     
     db = next(get_db())
     
@@ -114,12 +116,13 @@ def create_sample_articles():
             return
         
         # Create sample articles
-        for article_data in sample_articles:
+        articles = sample_articles()
+        for article_data in articles:
             article = Article(**article_data)
             db.add(article)
         
         db.commit()
-        print(f"✅ Successfully created {len(sample_articles)} sample articles!")
+        print(f"✅ Successfully created {len(articles)} sample articles!")
         
     except Exception as e:
         db.rollback()
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from database import get_db
 from services.ai_service import AIService
+from services import nlp
+from services.nlp_pool import get_nlp_pool, NLPPoolBusy
+from services.serializers import article_serializer, json_response, RECOMMENDATION_FIELDS
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 
@@ -25,49 +29,44 @@ async def get_ai_recommendations(
 ):
     """Get AI-powered article recommendations"""
     try:
-        if request.algorithm == "content_based":
-            recommendations = ai_service.content_based_recommendations(
-                db, request.user_id, request.limit
-            )
-        elif request.algorithm == "collaborative":
-            recommendations = ai_service.collaborative_filtering(
-                db, request.user_id, request.limit
-            )
-        else:  # hybrid
-            recommendations = ai_service.hybrid_recommendations(
-                db, request.user_id, request.limit
-            )
+        # "content_based", "collaborative", anything else -> hybrid
+        recommendations = ai_service.recommend(
+            db, request.user_id, request.limit, request.algorithm
+        )
         
         # Format response
         formatted_recommendations = []
         for rec in recommendations:
-            article = rec["article"]
             formatted_recommendations.append({
-                "article": {
-                    "id": article.id,
-                    "title": article.title,
-                    "description": article.description,
-                    "url": article.url,
-                    "image_url": article.image_url,
-                    "source_name": article.source_name,
-                    "category": article.category,
-                    "sentiment_score": article.sentiment_score,
-                    "reading_time": article.reading_time
-                },
+                "article": article_serializer.fragment(rec["article"], RECOMMENDATION_FIELDS),
                 "score": rec["score"],
                 "type": rec["type"],
                 "confidence": min(rec["score"] * 100, 100)  # Convert to percentage
             })
         
-        return {
+        return json_response({
             "recommendations": formatted_recommendations,
             "algorithm": request.algorithm,
             "total": len(formatted_recommendations)
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
+@router.get("/recommendation-stats")
+async def get_recommendation_stats():
+    """Per-stage latency of the recommender and the size of its candidate sets"""
+    return {
+        "stages": ai_service.stage_timings.snapshot(),
+        "candidates": ai_service.candidate_generator.stats(),
+        "item_similarity": ai_service.item_similarity.stats(),
+        "cache": ai_service.recommendation_cache.stats(),
+        "article_features": ai_service.article_features.stats(),
+        "catalog": ai_service.catalog.stats(),
+        "nlp_pool": get_nlp_pool().stats(),
+        "keyword_cache": nlp.keyword_cache.stats()
+    }
+
 @router.post("/analyze-article")
 async def analyze_article(request: ArticleAnalysisRequest):
     """Analyze article content using AI"""
@@ -78,7 +77,8 @@ async def analyze_article(request: ArticleAnalysisRequest):
             "content": request.content
         }
         
-        analysis = ai_service.analyze_article(article_data)
+        # Sentiment and keyword extraction are CPU-bound; run them on the NLP worker processes
+        analysis = await get_nlp_pool().analyze(article_data)
         
         return {
             "sentiment_score": analysis["sentiment_score"],
@@ -88,6 +88,13 @@ async def analyze_article(request: ArticleAnalysisRequest):
             "sentiment_label": "positive" if analysis["sentiment_score"] > 0.1 else "negative" if analysis["sentiment_score"] < -0.1 else "neutral"
         }
         
+    except NLPPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Article analysis is busy, please retry shortly"
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Article analysis timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing article: {str(e)}")
 
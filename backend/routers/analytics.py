@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from models import ReadingHistory, Article, UserPreference, ArticleFeedback
+from models import ReadingHistory, UserPreference, ArticleFeedback
+from services.article_catalog import get_article_catalog
 from pydantic import BaseModel
 from typing import List, Dict
 from datetime import datetime, timedelta
 from collections import Counter
 
 router = APIRouter()
+article_catalog = get_article_catalog()
 
 class ReadingAnalytics(BaseModel):
     total_articles_read: int
@@ -22,8 +24,12 @@ class ReadingAnalytics(BaseModel):
 async def get_reading_analytics(user_id: int, db: Session = Depends(get_db)):
     """Get user reading analytics"""
     try:
-        # Get reading history
-        reading_history = db.query(ReadingHistory).filter(
+        # Only the history columns are read here; each article's category and
+        # source come from the shared article catalog
+        reading_history = db.query(
+            ReadingHistory.article_id, ReadingHistory.read_duration,
+            ReadingHistory.completed, ReadingHistory.created_at
+        ).filter(
             ReadingHistory.user_id == user_id
         ).all()
         
@@ -43,28 +49,20 @@ async def get_reading_analytics(user_id: int, db: Session = Depends(get_db)):
         total_reading_time = sum(h.read_duration or 0 for h in reading_history)
         average_reading_time = total_reading_time / total_articles_read if total_articles_read > 0 else 0
         
-        # Get favorite categories
-        categories = []
-        for history in reading_history:
-            if history.article and history.article.category:
-                categories.append(history.article.category)
+        articles = article_catalog.lookup(db, [h.article_id for h in reading_history if h.article_id is not None])
         
-        category_counts = Counter(categories)
+        # Get favorite categories
+        category_counts = Counter(int(code) for code in articles["category"][articles["found"]] if code)
         favorite_categories = [
-            {"category": cat, "count": count}
-            for cat, count in category_counts.most_common(5)
+            {"category": article_catalog.categories[code], "count": count}
+            for code, count in category_counts.most_common(5)
         ]
         
         # Get favorite sources
-        sources = []
-        for history in reading_history:
-            if history.article and history.article.source_name:
-                sources.append(history.article.source_name)
-        
-        source_counts = Counter(sources)
+        source_counts = Counter(int(code) for code in articles["source"][articles["found"]] if code)
         favorite_sources = [
-            {"source": source, "count": count}
-            for source, count in source_counts.most_common(5)
+            {"source": article_catalog.sources[code], "count": count}
+            for code, count in source_counts.most_common(5)
         ]
         
         # Calculate completion rate
@@ -2,8 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
-from services.news_service import NewsService
+from services.news_service import NewsService, LISTING_COLUMNS
 from services.ai_service import AIService
+from services.serializers import (
+    article_serializer, json_response, LIST_FIELDS, DETAIL_FIELDS, TRENDING_FIELDS, SOURCE_FIELDS
+)
+from services.events import event_bus, READING_RECORDED
+from services.feed_materializer import FeedMaterializer
 from models import Article, ReadingHistory
 from datetime import datetime
 import json
@@ -11,6 +16,7 @@ import json
 router = APIRouter()
 news_service = NewsService()
 ai_service = AIService()
+feed_materializer = FeedMaterializer(ai_service)
 
 @router.get("/")
 async def get_news(
@@ -18,6 +24,7 @@ async def get_news(
     search: Optional[str] = Query(None, description="Search query"),
     limit: int = Query(20, description="Number of articles to return"),
     user_id: Optional[int] = Query(None, description="User ID for personalization"),
+    collapse: bool = Query(True, description="Show one article per story cluster"),
     db: Session = Depends(get_db)
 ):
     """Get news articles with optional filtering and personalization"""
@@ -25,39 +32,24 @@ async def get_news(
         if search:
             articles = news_service.search_articles(db, search, limit)
         elif category:
-            articles = news_service.get_articles_by_category(db, category, limit)
+            articles = news_service.get_articles_by_category(db, category, limit, collapse_clusters=collapse)
         elif user_id:
-            # Get personalized recommendations
-            recommendations = ai_service.get_personalized_recommendations(db, user_id, limit)
-            articles = [rec["article"] for rec in recommendations]
+            # Serve the precomputed feed, computing recommendations live for cold users
+            articles = feed_materializer.get_feed(db, user_id, limit, LISTING_COLUMNS)
+            if articles is None:
+                recommendations = ai_service.get_personalized_recommendations(db, user_id, limit)
+                articles = [rec["article"] for rec in recommendations]
         else:
-            articles = news_service.get_latest_articles(db, limit)
+            articles = news_service.get_latest_articles(db, limit, collapse_clusters=collapse)
         
         # Convert to response format
-        response_articles = []
-        for article in articles:
-            response_articles.append({
-                "id": article.id,
-                "title": article.title,
-                "description": article.description,
-                "url": article.url,
-                "image_url": article.image_url,
-                "source_name": article.source_name,
-                "author": article.author,
-                "published_at": article.published_at.isoformat() if article.published_at else None,
-                "category": article.category,
-                "tags": article.tags,
-                "sentiment_score": article.sentiment_score,
-                "reading_time": article.reading_time
-            })
-        
-        return {
-            "articles": response_articles,
-            "total": len(response_articles),
+        return json_response({
+            "articles": article_serializer.many(articles, LIST_FIELDS),
+            "total": len(articles),
             "category": category,
             "search": search,
             "personalized": user_id is not None
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching news: {str(e)}")
@@ -82,28 +74,23 @@ async def get_trending_news(db: Session = Depends(get_db)):
     """Get trending news articles"""
     try:
         # Get articles from the last 24 hours with high engagement
-        articles = db.query(Article).filter(
+        articles = db.query(*LISTING_COLUMNS).filter(
             Article.published_at >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         ).order_by(Article.published_at.desc()).limit(10).all()
         
-        response_articles = []
-        for article in articles:
-            response_articles.append({
-                "id": article.id,
-                "title": article.title,
-                "description": article.description,
-                "url": article.url,
-                "image_url": article.image_url,
-                "source_name": article.source_name,
-                "category": article.category,
-                "published_at": article.published_at.isoformat() if article.published_at else None
-            })
-        
-        return {"articles": response_articles}
+        return json_response({"articles": article_serializer.many(articles, TRENDING_FIELDS)})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching trending news: {str(e)}")
 
+@router.get("/feed/stats")
+async def get_feed_stats(db: Session = Depends(get_db)):
+    """Queue depth, staleness and hit counters of the precomputed feed store"""
+    try:
+        return feed_materializer.stats(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching feed stats: {str(e)}")
+
 @router.get("/{article_id}")
 async def get_article(article_id: int, db: Session = Depends(get_db)):
     """Get a specific article by ID"""
@@ -112,21 +99,7 @@ async def get_article(article_id: int, db: Session = Depends(get_db)):
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
-        return {
-            "id": article.id,
-            "title": article.title,
-            "description": article.description,
-            "content": article.content,
-            "url": article.url,
-            "image_url": article.image_url,
-            "source_name": article.source_name,
-            "author": article.author,
-            "published_at": article.published_at.isoformat() if article.published_at else None,
-            "category": article.category,
-            "tags": article.tags,
-            "sentiment_score": article.sentiment_score,
-            "reading_time": article.reading_time
-        }
+        return json_response(article_serializer.fragment(article, DETAIL_FIELDS))
         
     except HTTPException:
         raise
@@ -144,8 +117,7 @@ async def mark_article_read(
     """Mark an article as read and track reading behavior"""
     try:
         # Check if article exists
-        article = news_service.get_article_by_id(db, article_id)
-        if not article:
+        if not news_service.article_exists(db, article_id):
             raise HTTPException(status_code=404, detail="Article not found")
         
         # Create or update reading history
@@ -158,6 +130,7 @@ async def mark_article_read(
         
         db.add(reading_history)
         db.commit()
+        event_bus.publish(READING_RECORDED, user_id=user_id, article_id=article_id)
         
         return {"message": "Article marked as read", "article_id": article_id}
         
@@ -168,13 +141,20 @@ async def mark_article_read(
         raise HTTPException(status_code=500, detail=f"Error marking article as read: {str(e)}")
 
 @router.post("/refresh")
-async def refresh_news_database(db: Session = Depends(get_db)):
-    """Refresh the news database with latest articles from NewsAPI"""
+def refresh_news_database(db: Session = Depends(get_db)):
+    """Refresh the news database with latest articles from NewsAPI.
+    
+    A plain def, so FastAPI runs the blocking fetch, analysis and save on its
+    threadpool instead of on the event loop.
+    """
     try:
-        count = news_service.refresh_news_database(db)
+        result = news_service.refresh_news_database(db)
         return {
             "message": "News database refreshed successfully",
-            "articles_added": count
+            "articles_added": result["articles_added"],
+            "articles_fetched": result["articles_fetched"],
+            "duplicates_skipped": result["duplicates_skipped"],
+            "http": result["http"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refreshing news database: {str(e)}")
@@ -189,23 +169,11 @@ async def get_articles_by_source(
     try:
         articles = news_service.get_articles_by_source(db, source_name, limit)
         
-        response_articles = []
-        for article in articles:
-            response_articles.append({
-                "id": article.id,
-                "title": article.title,
-                "description": article.description,
-                "url": article.url,
-                "image_url": article.image_url,
-                "category": article.category,
-                "published_at": article.published_at.isoformat() if article.published_at else None
-            })
-        
-        return {
-            "articles": response_articles,
+        return json_response({
+            "articles": article_serializer.many(articles, SOURCE_FIELDS),
             "source": source_name,
-            "total": len(response_articles)
-        }
+            "total": len(articles)
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching articles by source: {str(e)}") 
\ No newline at end of file
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 from database import get_db
 from models import UserPreference
 from pydantic import BaseModel
-from typing import List
+from typing import List, Dict
+from services.events import event_bus, PREFERENCES_CHANGED
 
 router = APIRouter()
 
@@ -11,6 +13,9 @@ class PreferenceCreate(BaseModel):
     category: str
     weight: float = 1.0
 
+class PreferenceBulkUpdate(BaseModel):
+    preferences: Dict[str, float]  # category -> weight
+
 class PreferenceResponse(BaseModel):
     id: int
     user_id: int
@@ -56,6 +61,7 @@ async def create_user_preference(
             # Update existing preference
             existing_pref.weight = preference.weight
             db.commit()
+            event_bus.publish(PREFERENCES_CHANGED, user_id=user_id, categories=[preference.category])
             return {"message": "Preference updated successfully"}
         else:
             # Create new preference
@@ -66,12 +72,92 @@ async def create_user_preference(
             )
             db.add(new_pref)
             db.commit()
+            event_bus.publish(PREFERENCES_CHANGED, user_id=user_id, categories=[preference.category])
             return {"message": "Preference created successfully"}
             
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating preference: {str(e)}")
 
+def _upsert_preferences(db: Session, user_id: int, weights: Dict[str, float]):
+    """Insert or update all of a user's category weights in one statement"""
+    rows = [
+        {"user_id": user_id, "category": category, "weight": weight}
+        for category, weight in weights.items()
+    ]
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # No portable ON CONFLICT; fall back to per-row merge
+        for row in rows:
+            existing = db.query(UserPreference).filter(
+                UserPreference.user_id == user_id,
+                UserPreference.category == row["category"]
+            ).first()
+            if existing:
+                existing.weight = row["weight"]
+            else:
+                db.add(UserPreference(**row))
+        return
+    
+    statement = insert(UserPreference).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "category"],
+        set_={"weight": statement.excluded.weight, "updated_at": func.now()}
+    )
+    db.execute(statement)
+
+@router.put("/{user_id}", response_model=List[PreferenceResponse])
+async def replace_user_preferences(
+    user_id: int,
+    update: PreferenceBulkUpdate,
+    db: Session = Depends(get_db)
+):
+    """Set a user's whole category -> weight preference map at once"""
+    try:
+        previous = {
+            category: weight for category, weight in db.query(
+                UserPreference.category, UserPreference.weight
+            ).filter(UserPreference.user_id == user_id).all()
+        }
+        
+        if update.preferences:
+            _upsert_preferences(db, user_id, update.preferences)
+        
+        # Categories missing from the new map are removed
+        db.query(UserPreference).filter(
+            UserPreference.user_id == user_id,
+            UserPreference.category.notin_(list(update.preferences.keys()))
+        ).delete(synchronize_session=False)
+        db.commit()
+        
+        changed = sorted(
+            category for category in set(previous) | set(update.preferences)
+            if previous.get(category) != update.preferences.get(category)
+        )
+        if changed:
+            event_bus.publish(PREFERENCES_CHANGED, user_id=user_id, categories=changed)
+        
+        preferences = db.query(UserPreference).filter(
+            UserPreference.user_id == user_id
+        ).all()
+        return [
+            PreferenceResponse(
+                id=pref.id,
+                user_id=pref.user_id,
+                category=pref.category,
+                weight=pref.weight
+            )
+            for pref in preferences
+        ]
+        
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error updating preferences: {str(e)}")
+
 @router.delete("/{user_id}/{category}")
 async def delete_user_preference(
     user_id: int,
@@ -90,6 +176,7 @@ async def delete_user_preference(
         
         db.delete(preference)
         db.commit()
+        event_bus.publish(PREFERENCES_CHANGED, user_id=user_id, categories=[category])
         
         return {"message": "Preference deleted successfully"}
         
@@ -3,14 +3,14 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from pydantic import BaseModel
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
+from services.auth_service import password_hasher, token_cache, AuthenticatedUser, PasswordHasherBusy
+from services.events import event_bus, USER_DEACTIVATED
 import jwt
 import os
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -33,11 +33,11 @@ class UserResponse(BaseModel):
     is_active: bool
     created_at: datetime
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -73,7 +73,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash(user.password)
         db_user = User(
             email=user.email,
             username=user.username,
@@ -94,6 +94,11 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ups in progress, please retry shortly"
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -108,7 +113,7 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
         # Find user by email
         user = db.query(User).filter(User.email == user_credentials.email).first()
         
-        if not user or not verify_password(user_credentials.password, user.hashed_password):
+        if not user or not await verify_password(user_credentials.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
@@ -139,14 +144,27 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry shortly"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error during login: {str(e)}"
         )
 
-async def get_current_user(db: Session = Depends(get_db), token: str = Depends(get_current_user_token)):
-    """Get current user from token"""
+async def get_current_user(db: Session = Depends(get_db), token: str = Depends(get_current_user_token)) -> AuthenticatedUser:
+    """Get current user from token.
+    
+    Validated tokens are cached for a short time (never past their expiry), so
+    repeat requests with the same token skip JWT decoding and the user lookup.
+    """
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         # Decode JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -170,10 +188,18 @@ async def get_current_user(db: Session = Depends(get_db), token: str = Depends(g
             detail="User not found"
         )
     
-    return user
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    
+    authenticated_user = AuthenticatedUser.from_user(user)
+    token_cache.put(token, authenticated_user, expires_at=payload.get("exp"))
+    return authenticated_user
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: AuthenticatedUser = Depends(get_current_user)):
     """Get current user information"""
     return UserResponse(
         id=current_user.id,
@@ -183,6 +209,35 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         created_at=current_user.created_at
     )
 
+@router.post("/me/deactivate")
+async def deactivate_current_user(current_user: AuthenticatedUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Deactivate the current user's account"""
+    try:
+        user = db.query(User).filter(User.id == current_user.id).first()
+        if not user:
+            # A cached token can outlive its user's row by up to the cache TTL
+            event_bus.publish(USER_DEACTIVATED, user_id=current_user.id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user.is_active = False
+        db.commit()
+        
+        # Cached tokens, in every worker, would otherwise keep authenticating until they expire
+        event_bus.publish(USER_DEACTIVATED, user_id=current_user.id)
+        
+        return {"message": "User deactivated successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error deactivating user: {str(e)}"
+        )
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get user by ID"""
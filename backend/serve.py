@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Production launcher: several uvicorn workers sharing one set of model artifacts.
+
+A separate builder process (build_artifacts.py --watch) publishes the
+artifacts before the workers start and republishes them every
+--rebuild-seconds. Workers run with ARTIFACT_DIR set, so they memory-map the
+current version read-only and pick up new versions as they are published
+instead of each building its own models. Cache-invalidation events reach
+every worker through the database (services/event_relay.py), and each
+worker's NLP pool gets its share of the cores (--nlp-workers, default
+cpu_count / --workers) rather than all of them. The same environment works
+under gunicorn:
+
+    ARTIFACT_DIR=./artifacts NLP_WORKERS=1 gunicorn -k uvicorn.workers.UvicornWorker -w 4 main:app
+
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import uvicorn
+from services.artifacts import ArtifactStore
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--artifact-dir", default=os.getenv("ARTIFACT_DIR", os.path.join(BACKEND_DIR, "artifacts")))
+    parser.add_argument("--rebuild-seconds", type=float, default=float(os.getenv("ITEM_SIM_REFRESH_SECONDS", 300)))
+    parser.add_argument("--nlp-workers", type=int, default=os.getenv("NLP_WORKERS"),
+                        help="NLP processes per worker (default: cpu_count / --workers, at least 1)")
+    args = parser.parse_args()
+
+    os.environ["ARTIFACT_DIR"] = os.path.abspath(args.artifact_dir)
+    # Every worker starts its own NLP pool; sized at cpu_count each they would oversubscribe the cores workers-fold
+    nlp_workers = args.nlp_workers if args.nlp_workers is not None else max(1, (os.cpu_count() or 1) // args.workers)
+    os.environ["NLP_WORKERS"] = str(nlp_workers)
+    builder = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "build_artifacts.py"), "--watch", str(args.rebuild_seconds)],
+        cwd=BACKEND_DIR
+    )
+    # Workers can start on a version left by an earlier run; otherwise wait for the first build
+    store = ArtifactStore(os.environ["ARTIFACT_DIR"])
+    while store.current_version() is None:
+        if builder.poll() is not None:
+            sys.exit(f"Artifact builder exited with code {builder.returncode}")
+        time.sleep(0.5)
+    # Workers only check sizes when they map a version; read the checksums once here
+    try:
+        store.load().verify()
+    except (OSError, ValueError) as e:
+        builder.terminate()
+        sys.exit(f"Artifact {store.current_version()} is damaged: {e}")
+
+    try:
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level="info")
+    finally:
+        builder.terminate()
+        builder.wait()
+
+
+if __name__ == "__main__":
+    main()
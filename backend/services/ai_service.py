@@ -1,17 +1,29 @@
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import scipy.sparse as sp
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.cluster import KMeans
-from textblob import TextBlob
+from sklearn.preprocessing import normalize
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-import re
 from typing import List, Dict, Tuple, Optional
 from sqlalchemy.orm import Session
-from models import Article, User, ReadingHistory, UserPreference, ArticleFeedback
+from models import Article
+from services.story_clustering import collapse_story_clusters
+from services.cache import TTLCache
+from services.candidates import get_candidate_generator, recommendation_timings
+from services.item_similarity import get_item_similarity_model
+from services.events import event_bus, PREFERENCES_CHANGED, READING_RECORDED, ARTICLES_INGESTED
+from services.decay import freshness_prior
+from services.metrics import timed
+from services import nlp
+from services.user_profiles import UserProfileStore, get_user_profile_store
+from services.text_features import get_article_features
+from services.article_catalog import get_article_catalog
+from datetime import datetime
 import json
+import os
 
 # Download required NLTK data
 try:
@@ -25,251 +37,230 @@ except LookupError:
     nltk.download('stopwords')
 
 class AIService:
-    def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=1000,
-            stop_words='english',
-            ngram_range=(1, 2)
+    def __init__(
+        self,
+        profile_store: Optional[UserProfileStore] = None,
+        freshness_weight: Optional[float] = None,
+        freshness_half_life_hours: Optional[float] = None,
+        text_similarity_weight: Optional[float] = None
+    ):
+        # Corpus TF-IDF features, mapped from the published artifact; without
+        # ARTIFACT_DIR they are fitted once and kept up to date incrementally
+        self.article_features = get_article_features()
+        self.catalog = get_article_catalog()
+        self.candidate_generator = get_candidate_generator()
+        self.stage_timings = recommendation_timings
+        self.item_similarity = get_item_similarity_model()
+        self.profile_store = profile_store or get_user_profile_store(
+            lambda tags, description: self.article_keywords(tags, description, top_n=5)
         )
-        self.article_vectors = None
-        self.articles_df = None
+        self.freshness_weight = freshness_weight if freshness_weight is not None else float(os.getenv("FRESHNESS_WEIGHT", 1.0))
+        self.freshness_half_life_hours = freshness_half_life_hours if freshness_half_life_hours is not None else float(os.getenv("FRESHNESS_HALF_LIFE_HOURS", 36))
+        self.text_similarity_weight = text_similarity_weight if text_similarity_weight is not None else float(os.getenv("TEXT_SIMILARITY_WEIGHT", 1.0))
+        
+        # Recommendation lists keyed by (user_id, algorithm, limit); dropped when
+        # the inputs they were computed from change
+        self.recommendation_cache = TTLCache(
+            maxsize=int(os.getenv("RECOMMENDATION_CACHE_SIZE", 5000)),
+            ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", 900))
+        )
+        event_bus.subscribe(PREFERENCES_CHANGED, self._on_user_changed)
+        event_bus.subscribe(READING_RECORDED, self._on_user_changed)
+        event_bus.subscribe(ARTICLES_INGESTED, self._on_articles_ingested)
+    
+    def _on_user_changed(self, user_id: int, **_):
+        self.recommendation_cache.discard_where(lambda key: key[0] == user_id)
+    
+    def _on_articles_ingested(self, **_):
+        # New articles can outrank anything in any cached list
+        self.recommendation_cache.clear()
         
     def preprocess_text(self, text: str) -> str:
         """Clean and preprocess text for analysis"""
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        return text
+        return nlp.preprocess_text(text)
     
     def analyze_sentiment(self, text: str) -> float:
         """Analyze sentiment of text using TextBlob"""
-        if not text:
-            return 0.0
-        
-        blob = TextBlob(text)
-        return blob.sentiment.polarity
+        return nlp.analyze_sentiment(text)
     
     def extract_keywords(self, text: str, top_n: int = 10) -> List[str]:
         """Extract top keywords from text using TF-IDF"""
-        if not text:
-            return []
-        
-        processed_text = self.preprocess_text(text)
-        if not processed_text:
-            return []
-        
-        # Create TF-IDF vectorizer for single document
-        vectorizer = TfidfVectorizer(
-            max_features=top_n,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
-        
-        try:
-            tfidf_matrix = vectorizer.fit_transform([processed_text])
-            feature_names = vectorizer.get_feature_names_out()
-            
-            # Get top keywords
-            tfidf_scores = tfidf_matrix.toarray()[0]
-            keyword_scores = list(zip(feature_names, tfidf_scores))
-            keyword_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            return [keyword for keyword, score in keyword_scores if score > 0]
-        except:
-            return []
+        return nlp.extract_keywords(text, top_n)
+    
+    def article_keywords(self, tags: Optional[List[str]], text: Optional[str], top_n: int = 10) -> List[str]:
+        """Top keywords of a stored article, from the tags extracted at ingestion when it has them"""
+        return nlp.article_keywords(tags, text, top_n)
     
     def calculate_reading_time(self, text: str) -> int:
         """Estimate reading time in minutes (average 200 words per minute)"""
-        if not text:
-            return 1
-        
-        word_count = len(text.split())
-        return max(1, round(word_count / 200))
+        return nlp.calculate_reading_time(text)
     
-    def build_user_profile(self, db: Session, user_id: int) -> Dict:
-        """Build comprehensive user profile based on reading history and preferences"""
-        # Get user preferences
-        preferences = db.query(UserPreference).filter(UserPreference.user_id == user_id).all()
-        preference_dict = {pref.category: pref.weight for pref in preferences}
-        
-        # Get reading history
-        reading_history = db.query(ReadingHistory).filter(
-            ReadingHistory.user_id == user_id
-        ).all()
-        
-        # Get feedback
-        feedback = db.query(ArticleFeedback).filter(
-            ArticleFeedback.user_id == user_id
-        ).all()
-        
-        # Analyze reading patterns
-        categories_read = {}
-        sources_read = {}
-        sentiment_preference = 0.0
-        avg_reading_time = 0.0
-        
-        for history in reading_history:
-            article = history.article
-            if article:
-                # Category preference
-                if article.category:
-                    categories_read[article.category] = categories_read.get(article.category, 0) + 1
-                
-                # Source preference
-                if article.source_name:
-                    sources_read[article.source_name] = sources_read.get(article.source_name, 0) + 1
-                
-                # Sentiment preference
-                if article.sentiment_score:
-                    sentiment_preference += article.sentiment_score
-                
-                # Reading time preference
-                if article.reading_time:
-                    avg_reading_time += article.reading_time
-        
-        # Calculate averages
-        total_articles = len(reading_history)
-        if total_articles > 0:
-            sentiment_preference /= total_articles
-            avg_reading_time /= total_articles
-        
-        # Get liked articles for content analysis
-        liked_articles = [f.article for f in feedback if f.liked and f.article]
-        liked_keywords = []
-        for article in liked_articles:
-            if article.description:
-                keywords = self.extract_keywords(article.description, top_n=5)
-                liked_keywords.extend(keywords)
-        
+    def build_user_profile(self, db: Session, user_id: int, now: Optional[datetime] = None) -> Dict:
+        """Build comprehensive user profile based on reading history and preferences.
+        
+        Besides raw read counts the profile carries time-decayed affinities
+        (category_affinity, source_affinity, liked_keyword_weights, and decayed
+        sentiment / reading time averages) so recent behaviour dominates.
+        """
+        return self.profile_store.build(db, user_id, now)
+    
+    def content_based_recommendations(self, db: Session, user_id: int, limit: int = 20, now: Optional[datetime] = None) -> List[Dict]:
+        """Generate content-based recommendations.
+        
+        Candidate generators pick a few hundred plausible articles through
+        indexed queries, and those are scored from the article catalog; only
+        the tags (for keyword overlap) and the final articles are read from
+        the database; text similarity to the articles the user liked comes
+        from the TF-IDF features. Relevance is then boosted by a freshness
+        prior: an article published just now scores (1 + FRESHNESS_WEIGHT)
+        times its relevance, halving every FRESHNESS_HALF_LIFE_HOURS.
+        """
+        now = now or datetime.now()
+        with self.stage_timings.time("profile"):
+            user_profile = self.build_user_profile(db, user_id, now)
+        
+        candidates = self.candidate_generator.generate(db, user_id, user_profile, self.stage_timings, now)
+        if not candidates:
+            return []
+        with self.stage_timings.time("load"):
+            rows = self.catalog.lookup(db, sorted(candidates))
+            keywords = self.candidate_keywords(db, rows["id"][rows["found"]].tolist()) \
+                if user_profile["liked_keywords"] else {}
+        
+        with self.stage_timings.time("rerank"):
+            relevance = self.score_articles(rows, keywords, user_profile)
+            scores = relevance * (1 + self.freshness_weight * freshness_prior(
+                rows["published_at"], now.timestamp(), self.freshness_half_life_hours * 3600
+            ))
+            # Best first, one per story
+            picked, seen_clusters = [], set()
+            for i in np.argsort(-scores, kind="stable"):
+                if relevance[i] <= 0:
+                    continue
+                cluster_id = int(rows["story_cluster_id"][i]) or int(rows["id"][i])
+                if cluster_id not in seen_clusters:
+                    seen_clusters.add(cluster_id)
+                    picked.append(i)
+                    if len(picked) == limit:
+                        break
+        
+        with self.stage_timings.time("hydrate"):
+            articles = {
+                article.id: article
+                for article in db.query(Article).filter(Article.id.in_([int(rows["id"][i]) for i in picked])).all()
+            } if picked else {}
+        return [
+            {
+                "article": articles[int(rows["id"][i])],
+                "score": float(scores[i]),
+                "type": "content_based",
+                "sources": candidates[int(rows["id"][i])]
+            }
+            for i in picked if int(rows["id"][i]) in articles
+        ]
+    
+    def candidate_keywords(self, db: Session, article_ids: List[int]) -> Dict[int, set]:
+        """Keywords of each article, from its stored tags (descriptions are read only for untagged articles)"""
+        tags = dict(db.query(Article.id, Article.tags).filter(Article.id.in_(article_ids)).all()) if article_ids else {}
+        untagged = [article_id for article_id, article_tags in tags.items() if not article_tags]
+        descriptions = dict(db.query(Article.id, Article.description).filter(
+            Article.id.in_(untagged)
+        ).all()) if untagged else {}
         return {
-            "user_id": user_id,
-            "preferences": preference_dict,
-            "categories_read": categories_read,
-            "sources_read": sources_read,
-            "sentiment_preference": sentiment_preference,
-            "avg_reading_time": avg_reading_time,
-            "liked_keywords": liked_keywords,
-            "total_articles_read": total_articles
+            article_id: set(self.article_keywords(article_tags, descriptions.get(article_id), top_n=10))
+            for article_id, article_tags in tags.items()
         }
     
-    def content_based_recommendations(self, db: Session, user_id: int, limit: int = 20) -> List[Dict]:
-        """Generate content-based recommendations"""
-        user_profile = self.build_user_profile(db, user_id)
-        
-        # Get all articles
-        articles = db.query(Article).all()
-        
-        # Calculate similarity scores
-        recommendations = []
-        
-        for article in articles:
-            score = 0.0
-            
-            # Category preference
-            if article.category in user_profile["preferences"]:
-                score += user_profile["preferences"][article.category] * 2
-            
-            if article.category in user_profile["categories_read"]:
-                score += user_profile["categories_read"][article.category] * 0.5
-            
-            # Source preference
-            if article.source_name in user_profile["sources_read"]:
-                score += user_profile["sources_read"][article.source_name] * 0.3
-            
-            # Sentiment preference
-            if article.sentiment_score and user_profile["sentiment_preference"]:
-                sentiment_diff = abs(article.sentiment_score - user_profile["sentiment_preference"])
-                score += (1 - sentiment_diff) * 0.5
-            
-            # Reading time preference
-            if article.reading_time and user_profile["avg_reading_time"]:
-                time_diff = abs(article.reading_time - user_profile["avg_reading_time"])
-                score += (1 - min(time_diff / 10, 1)) * 0.3
-            
-            # Keyword similarity
-            if article.description and user_profile["liked_keywords"]:
-                article_keywords = set(self.extract_keywords(article.description, top_n=10))
-                liked_keywords_set = set(user_profile["liked_keywords"])
-                if article_keywords and liked_keywords_set:
-                    keyword_overlap = len(article_keywords.intersection(liked_keywords_set))
-                    score += keyword_overlap * 0.2
-            
-            if score > 0:
-                recommendations.append({
-                    "article": article,
-                    "score": score,
-                    "type": "content_based"
-                })
-        
-        # Sort by score and return top recommendations
-        recommendations.sort(key=lambda x: x["score"], reverse=True)
-        return recommendations[:limit]
+    def score_articles(self, rows: Dict[str, np.ndarray], keywords: Dict[int, set], user_profile: Dict) -> np.ndarray:
+        """Content-based relevance to a user profile of catalog rows (see ArticleCatalog.lookup)"""
+        catalog = self.catalog
+        
+        def by_code(table: Dict[str, float], codes: List[str], code_of) -> np.ndarray:
+            weights = np.zeros(len(codes))
+            for name, weight in table.items():
+                weights[code_of(name)] += weight
+            weights[0] = 0.0  # articles without a category / source
+            return weights
+        
+        # Category preference, recency-weighted reading history and source preference
+        categories, sources = catalog.categories, catalog.sources
+        score = by_code(user_profile["preferences"], categories, catalog.category_code)[rows["category"]] * 2
+        score += by_code(user_profile["category_affinity"], categories, catalog.category_code)[rows["category"]] * 0.5
+        score += by_code(user_profile["source_affinity"], sources, catalog.source_code)[rows["source"]] * 0.3
+        
+        # Sentiment preference
+        sentiment_preference = user_profile["sentiment_preference"]
+        if sentiment_preference:
+            sentiment = rows["sentiment_score"].astype(np.float64)
+            has_sentiment = ~np.isnan(sentiment) & (sentiment != 0)
+            score += np.where(has_sentiment, (1 - np.abs(sentiment - sentiment_preference)) * 0.5, 0.0)
+        
+        # Reading time preference
+        avg_reading_time = user_profile["avg_reading_time"]
+        if avg_reading_time:
+            reading_time = rows["reading_time"].astype(np.float64)
+            time_diff = np.abs(reading_time - avg_reading_time)
+            score += np.where(reading_time != 0, (1 - np.minimum(time_diff / 10, 1)) * 0.3, 0.0)
+        
+        # Keyword similarity
+        liked_keyword_weights = user_profile["liked_keyword_weights"]
+        if keywords and user_profile["liked_keywords"]:
+            for i, article_id in enumerate(rows["id"].tolist()):
+                article_keywords = keywords.get(article_id)
+                if article_keywords:
+                    # Each shared keyword counts by how recently it was liked
+                    score[i] += sum(liked_keyword_weights[k] for k in article_keywords if k in liked_keyword_weights) * 0.2
+        
+        # Text similarity to recently liked articles
+        if self.text_similarity_weight and user_profile["liked_article_weights"]:
+            score += self.text_similarity(rows["id"], user_profile["liked_article_weights"]) * self.text_similarity_weight
+        
+        # Articles deleted since they became candidates
+        score[~rows["found"]] = 0.0
+        return score
+    
+    def text_similarity(self, article_ids: np.ndarray, liked_article_weights: Dict[int, float]) -> np.ndarray:
+        """Cosine similarity of each article's TF-IDF vector to the recency-weighted sum of the liked articles' vectors.
+        
+        Articles the features do not cover yet (ingested since the last fit
+        or publish) score 0.
+        """
+        similarity = np.zeros(len(article_ids))
+        text = self.article_features.text
+        if text is None or not text.terms:
+            return similarity
+        liked_ids = list(liked_article_weights)
+        liked, liked_found = text.vectors(liked_ids)
+        if not liked_found.any():
+            return similarity
+        weights = np.array([liked_article_weights[a] for a, found in zip(liked_ids, liked_found) if found], dtype=np.float32)
+        profile = normalize(sp.csr_matrix(weights) @ liked)
+        vectors, found = text.vectors(article_ids.tolist())
+        similarity[found] = (vectors @ profile.T).toarray().ravel()
+        return similarity
     
     def collaborative_filtering(self, db: Session, user_id: int, limit: int = 20) -> List[Dict]:
-        """Generate collaborative filtering recommendations"""
-        # Get all users and their reading history
-        users = db.query(User).all()
-        
-        # Build user-item matrix
-        user_article_matrix = {}
-        for user in users:
-            user_article_matrix[user.id] = {}
-            for history in user.reading_history:
-                if history.article:
-                    user_article_matrix[user.id][history.article.id] = 1
-        
-        # Find similar users
-        target_user_articles = user_article_matrix.get(user_id, {})
-        similar_users = []
-        
-        for other_user_id, other_user_articles in user_article_matrix.items():
-            if other_user_id != user_id:
-                # Calculate Jaccard similarity
-                intersection = len(set(target_user_articles.keys()) & set(other_user_articles.keys()))
-                union = len(set(target_user_articles.keys()) | set(other_user_articles.keys()))
-                
-                if union > 0:
-                    similarity = intersection / union
-                    if similarity > 0:
-                        similar_users.append((other_user_id, similarity))
-        
-        # Sort by similarity
-        similar_users.sort(key=lambda x: x[1], reverse=True)
-        
-        # Get recommendations from similar users
-        recommendations = []
-        seen_articles = set(target_user_articles.keys())
-        
-        for similar_user_id, similarity in similar_users[:10]:  # Top 10 similar users
-            similar_user_articles = user_article_matrix[similar_user_id]
-            
-            for article_id in similar_user_articles:
-                if article_id not in seen_articles:
-                    article = db.query(Article).filter(Article.id == article_id).first()
-                    if article:
-                        recommendations.append({
-                            "article": article,
-                            "score": similarity,
-                            "type": "collaborative"
-                        })
-                        seen_articles.add(article_id)
-        
-        # Sort by score and return top recommendations
-        recommendations.sort(key=lambda x: x["score"], reverse=True)
+        """Generate collaborative filtering recommendations from the item-item co-read model"""
+        with self.stage_timings.time("collaborative"):
+            # Over-fetch so collapsing story clusters still leaves `limit` items
+            scored = self.item_similarity.recommend(db, user_id, limit * 2)
+            articles = {
+                article.id: article
+                for article in db.query(Article).filter(Article.id.in_([a for a, _ in scored])).all()
+            } if scored else {}
+        
+        recommendations = [
+            {"article": articles[article_id], "score": score, "type": "collaborative"}
+            for article_id, score in scored if article_id in articles
+        ]
+        
+        # Already sorted by score; return top recommendations, one per story
+        recommendations = collapse_story_clusters(recommendations, key=lambda rec: rec["article"])
         return recommendations[:limit]
     
-    def hybrid_recommendations(self, db: Session, user_id: int, limit: int = 20) -> List[Dict]:
+    def hybrid_recommendations(self, db: Session, user_id: int, limit: int = 20, now: Optional[datetime] = None) -> List[Dict]:
         """Generate hybrid recommendations combining content-based and collaborative filtering"""
-        content_based = self.content_based_recommendations(db, user_id, limit)
+        content_based = self.content_based_recommendations(db, user_id, limit, now)
         collaborative = self.collaborative_filtering(db, user_id, limit)
         
         # Combine recommendations
@@ -311,59 +302,47 @@ class AIService:
             })
         
         recommendations.sort(key=lambda x: x["score"], reverse=True)
+        recommendations = collapse_story_clusters(recommendations, key=lambda rec: rec["article"])
         return recommendations[:limit]
     
     def get_personalized_recommendations(self, db: Session, user_id: int, limit: int = 20) -> List[Dict]:
         """Get personalized recommendations using hybrid approach"""
-        return self.hybrid_recommendations(db, user_id, limit)
+        return self.recommend(db, user_id, limit, "hybrid")
+    
+    def recommend(self, db: Session, user_id: int, limit: int = 20, algorithm: str = "hybrid") -> List[Dict]:
+        """Recommendations from the named algorithm, served from cache while the user's inputs are unchanged"""
+        if algorithm == "content_based":
+            compute = self.content_based_recommendations
+        elif algorithm == "collaborative":
+            compute = self.collaborative_filtering
+        else:
+            algorithm, compute = "hybrid", self.hybrid_recommendations
+        
+        # The cache holds article ids, never ORM instances: those belong to the
+        # Session of the request that computed them
+        key = (user_id, algorithm, limit)
+        cached = self.recommendation_cache.get(key)
+        if cached is None:
+            recommendations = compute(db, user_id, limit)
+            self.recommendation_cache.set(key, [
+                {**{k: v for k, v in rec.items() if k != "article"}, "article_id": rec["article"].id}
+                for rec in recommendations
+            ])
+            return recommendations
+        
+        articles = {
+            article.id: article
+            for article in db.query(Article).filter(Article.id.in_([rec["article_id"] for rec in cached])).all()
+        } if cached else {}
+        return [
+            {**{k: v for k, v in rec.items() if k != "article_id"}, "article": articles[rec["article_id"]]}
+            for rec in cached if rec["article_id"] in articles
+        ]
     
     def analyze_article(self, article_data: Dict) -> Dict:
-        """Analyze article content and extract features"""
-        title = article_data.get("title", "")
-        description = article_data.get("description", "")
-        content = article_data.get("content", "")
-        
-        # Combine text for analysis
-        full_text = f"{title} {description} {content}"
-        
-        # Analyze sentiment
-        sentiment_score = self.analyze_sentiment(full_text)
-        
-        # Extract keywords
-        keywords = self.extract_keywords(full_text, top_n=15)
-        
-        # Calculate reading time
-        reading_time = self.calculate_reading_time(full_text)
-        
-        # Determine category based on keywords
-        category = self.categorize_article(keywords, title, description)
-        
-        return {
-            "sentiment_score": sentiment_score,
-            "keywords": keywords,
-            "reading_time": reading_time,
-            "category": category
-        }
+        """Analyze article content and extract features (in this thread; see services/nlp_pool.py)"""
+        return nlp.analyze_article(article_data, stage=lambda name: timed("analyze_article", name))
     
     def categorize_article(self, keywords: List[str], title: str, description: str) -> str:
         """Categorize article based on keywords and content"""
-        categories = {
-            "technology": ["tech", "technology", "software", "ai", "artificial intelligence", "machine learning", "programming", "startup", "innovation"],
-            "business": ["business", "economy", "finance", "market", "investment", "stock", "trading", "company", "corporate"],
-            "politics": ["politics", "government", "election", "policy", "democrat", "republican", "congress", "senate", "president"],
-            "sports": ["sports", "football", "basketball", "baseball", "soccer", "tennis", "olympics", "championship", "game"],
-            "entertainment": ["entertainment", "movie", "music", "celebrity", "hollywood", "film", "actor", "actress", "award"],
-            "health": ["health", "medical", "medicine", "disease", "treatment", "hospital", "doctor", "patient", "covid"],
-            "science": ["science", "research", "study", "discovery", "experiment", "laboratory", "scientist", "physics", "chemistry"]
-        }
-        
-        # Check title and description for category keywords
-        text_to_check = f"{title} {description}".lower()
-        
-        for category, keywords_list in categories.items():
-            for keyword in keywords_list:
-                if keyword in text_to_check:
-                    return category
-        
-        # Default category
-        return "general" 
\ No newline at end of file
+        return nlp.categorize_article(keywords, title, description)
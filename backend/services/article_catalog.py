@@ -0,0 +1,342 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Article
+from services.artifacts import Artifact, ArtifactStore, get_artifact_store, pack_strings
+from services.events import event_bus, ARTICLES_INGESTED
+
+# Column dtypes; missing values are 0 (codes, reading time, cluster) or NaN
+COLUMNS = {
+    "id": np.int32,
+    "category": np.int16,
+    "source": np.int32,
+    "sentiment_score": np.float32,
+    "reading_time": np.int16,
+    "published_at": np.float64,
+    "story_cluster_id": np.int32,
+}
+
+_QUERY_COLUMNS = (
+    Article.id, Article.category, Article.source_name, Article.sentiment_score,
+    Article.reading_time, Article.published_at, Article.story_cluster_id
+)
+
+
+class ArticleCatalog:
+    """Compact in-memory read model of the article attributes used for ranking and aggregation.
+
+    One row per article in typed NumPy columns, about 30 bytes an article
+    against several kilobytes for a loaded ORM Article with its instance state
+    and text fields. Category and source are codes into interned string tables
+    (code 0 is a missing value). Rows stay in id order, so an id is found by
+    binary search and ingestion appends at the end.
+
+    The catalog loads on first use and afterwards only fetches articles it
+    has not seen: those announced by ARTICLES_INGESTED in this process, and
+    any id lookup() is asked for but does not know (an article ingested by
+    another worker), so callers never see a stale miss. Database reads run
+    without the lock; only appending the rows they return takes it.
+    """
+
+    def __init__(self):
+        self.categories: List[str] = [""]
+        self.sources: List[str] = [""]
+        self._category_codes: Dict[str, int] = {"": 0}
+        self._source_codes: Dict[str, int] = {"": 0}
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = 0
+        self._loaded = False
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        # Serialises the first full load; readers only wait on _lock
+        self._load_lock = threading.Lock()
+        event_bus.subscribe(ARTICLES_INGESTED, self._on_articles_ingested)
+
+    def _on_articles_ingested(self, article_ids: List[int], **_):
+        self.add_articles(article_ids)
+
+    def add_articles(self, article_ids: List[int]):
+        """Queue stored articles to be fetched on the next sync"""
+        with self._lock:
+            self._pending.update(article_ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def category_code(self, category: Optional[str]) -> int:
+        return self._category_codes.get(category or "", 0)
+
+    def source_code(self, source_name: Optional[str]) -> int:
+        return self._source_codes.get(source_name or "", 0)
+
+    # Loading
+
+    def _append(self, rows: List[tuple]):
+        """Add rows (as selected by _QUERY_COLUMNS); call with the lock held"""
+        if not rows:
+            return
+        known = self._columns["id"][:self._size]
+        incoming = np.array([row[0] for row in rows], dtype=np.int64)
+        positions = np.minimum(np.searchsorted(known, incoming), max(self._size - 1, 0))
+        seen = known[positions] == incoming if self._size else np.zeros(len(rows), dtype=bool)
+        if seen.any():
+            rows = [row for row, duplicate in zip(rows, seen) if not duplicate]
+            if not rows:
+                return
+        size = self._size + len(rows)
+        capacity = len(self._columns["id"])
+        if size > capacity:
+            # Grow geometrically so appends stay amortised O(batch)
+            capacity = max(size, 2 * capacity, 1024)
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+
+        new = slice(self._size, size)
+        columns = self._columns
+        columns["id"][new] = [row[0] for row in rows]
+        columns["category"][new] = [self._intern(self.categories, self._category_codes, row[1]) for row in rows]
+        columns["source"][new] = [self._intern(self.sources, self._source_codes, row[2]) for row in rows]
+        columns["sentiment_score"][new] = [np.nan if row[3] is None else row[3] for row in rows]
+        columns["reading_time"][new] = [row[4] or 0 for row in rows]
+        columns["published_at"][new] = [row[5].timestamp() if row[5] else np.nan for row in rows]
+        columns["story_cluster_id"][new] = [row[6] or 0 for row in rows]
+
+        ids = columns["id"]
+        out_of_order = self._size and ids[self._size] < ids[self._size - 1]
+        self._size = size
+        if out_of_order or np.any(np.diff(ids[new]) < 0):
+            # A batch committed out of id order: rare, so just re-sort everything
+            # into new arrays (readers may still hold views of the old ones)
+            order = np.argsort(ids[:size], kind="stable")
+            for name, column in columns.items():
+                resorted = np.zeros_like(column)
+                resorted[:size] = column[:size][order]
+                columns[name] = resorted
+
+    @staticmethod
+    def _intern(table: List[str], codes: Dict[str, int], value: Optional[str]) -> int:
+        code = codes.get(value or "")
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def sync(self, db: Session):
+        """Load on first use, then fetch the articles ingested since the last sync"""
+        if not self._loaded:
+            self._load(db)
+            return
+        self._fetch_pending(db)
+
+    def _load(self, db: Session):
+        with self._load_lock:
+            if self._loaded:
+                return
+            with self._lock:
+                # The full load covers everything announced before it starts
+                self._pending = set()
+            batch = []
+            for row in db.query(*_QUERY_COLUMNS).order_by(Article.id).yield_per(5000):
+                batch.append(row)
+                if len(batch) == 5000:
+                    with self._lock:
+                        self._append(batch)
+                    batch = []
+            with self._lock:
+                self._append(batch)
+            self._loaded = True
+
+    def _fetch_pending(self, db: Session):
+        with self._lock:
+            pending, self._pending = sorted(self._pending), set()
+        pending = self._unknown(pending)
+        rows = []
+        for start in range(0, len(pending), 1000):
+            rows.extend(db.query(*_QUERY_COLUMNS).filter(
+                Article.id.in_(pending[start:start + 1000])
+            ).order_by(Article.id).all())
+        with self._lock:
+            self._append(rows)
+
+    def _unknown(self, article_ids: List[int]) -> List[int]:
+        """The ids among `article_ids` that still have to be read from the database"""
+        return article_ids
+
+    def start(self, session_factory=SessionLocal):
+        """Load in the background so the first request does not pay for it"""
+        def load():
+            db = session_factory()
+            try:
+                self.sync(db)
+                print(f"🗂️ Article catalog loaded: {len(self)} articles")
+            except Exception as e:
+                print(f"Error loading article catalog: {e}")
+            finally:
+                db.close()
+        threading.Thread(target=load, name="article-catalog", daemon=True).start()
+
+    # Reading
+
+    def lookup(self, db: Session, article_ids: Iterable[int]) -> Dict[str, np.ndarray]:
+        """Columns for the given ids, in the given order, plus a `found` mask (deleted articles are not found)"""
+        wanted = np.fromiter(article_ids, dtype=np.int64)
+        self.sync(db)
+        result = self._select(wanted)
+        missing = wanted[~result["found"]]
+        if len(missing):
+            rows = db.query(*_QUERY_COLUMNS).filter(Article.id.in_(missing.tolist())).all()
+            with self._lock:
+                self._append(rows)
+            result = self._select(wanted)
+        return result
+
+    def _select(self, wanted: np.ndarray) -> Dict[str, np.ndarray]:
+        with self._lock:
+            size = self._size
+            columns = {name: column[:size] for name, column in self._columns.items()}
+        positions = np.searchsorted(columns["id"], wanted)
+        found = positions < size
+        found[found] = columns["id"][positions[found]] == wanted[found]
+        positions = np.where(found, positions, 0)
+        selected = {name: column[positions] if size else np.zeros(len(wanted), dtype=column.dtype)
+                    for name, column in columns.items()}
+        selected["id"] = wanted.astype(np.int32)
+        selected["found"] = found
+        return selected
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The columns and string tables as artifact arrays, read back by MappedArticleCatalog"""
+        with self._lock:
+            size = self._size
+            arrays = {f"catalog.{name}": column[:size].copy() for name, column in self._columns.items()}
+            categories, sources = list(self.categories), list(self.sources)
+        return {
+            **arrays,
+            **pack_strings("catalog.categories", categories),
+            **pack_strings("catalog.sources", sources),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "articles": self._size,
+            "categories": len(self.categories) - 1,
+            "sources": len(self.sources) - 1,
+            "bytes": int(sum(column[:self._size].nbytes for column in self._columns.values())),
+            "loaded": self._loaded,
+        }
+
+
+class MappedArticleCatalog(ArticleCatalog):
+    """The catalog of the latest published artifact plus the articles it does not have yet.
+
+    The artifact's columns are memory-mapped and shared by every worker, so
+    only articles newer than the published version (fetched as in
+    ArticleCatalog) are held in process memory; they are dropped once a
+    version that contains them is mapped. Category and source codes are
+    translated into this process's tables, which only ever grow, so a code a
+    caller got stays valid across versions. Falls back to a full in-process
+    load while no version with a catalog has been published.
+    """
+
+    def __init__(self, store: ArtifactStore):
+        super().__init__()
+        self.store = store
+        self._version: Optional[str] = None
+        self._mapped: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        mapped = self._current()
+        return self._size + (len(mapped["id"]) if mapped is not None else 0)
+
+    def _current(self) -> Optional[Dict[str, np.ndarray]]:
+        artifact = self.store.latest()
+        if artifact is not None and "catalog.id" in artifact and artifact.version != self._version:
+            self._map(artifact)
+        return self._mapped
+
+    def _map(self, artifact: Artifact):
+        mapped = {name: artifact[f"catalog.{name}"] for name in COLUMNS}
+        categories, sources = artifact.strings("catalog.categories"), artifact.strings("catalog.sources")
+        with self._lock:
+            if artifact.version == self._version:
+                return
+            mapped["category_codes"] = np.array(
+                [self._intern(self.categories, self._category_codes, name) for name in categories], dtype=np.int16
+            )
+            mapped["source_codes"] = np.array(
+                [self._intern(self.sources, self._source_codes, name) for name in sources], dtype=np.int32
+            )
+            # Keep only the articles the new version does not have, in new arrays
+            ids = self._columns["id"][:self._size]
+            positions = np.minimum(np.searchsorted(mapped["id"], ids), max(len(mapped["id"]) - 1, 0))
+            keep = mapped["id"][positions] != ids if len(mapped["id"]) else np.ones(self._size, dtype=bool)
+            self._columns = {name: column[:self._size][keep] for name, column in self._columns.items()}
+            self._size = int(keep.sum())
+            self._mapped, self._version = mapped, artifact.version
+            # Appending only the new articles is all a full load would add now
+            self._loaded = True
+
+    def sync(self, db: Session):
+        if self._current() is None and not self._loaded:
+            self._load(db)
+            return
+        self._fetch_pending(db)
+
+    def _unknown(self, article_ids: List[int]) -> List[int]:
+        mapped = self._mapped
+        if mapped is None or not article_ids:
+            return article_ids
+        wanted = np.array(article_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(mapped["id"], wanted), max(len(mapped["id"]) - 1, 0))
+        known = mapped["id"][positions] == wanted if len(mapped["id"]) else np.zeros(len(wanted), dtype=bool)
+        return wanted[~known].tolist()
+
+    def _select(self, wanted: np.ndarray) -> Dict[str, np.ndarray]:
+        selected = super()._select(wanted)
+        mapped = self._current()
+        if mapped is None or not len(mapped["id"]):
+            return selected
+        positions = np.searchsorted(mapped["id"], wanted)
+        found = positions < len(mapped["id"])
+        found[found] = mapped["id"][positions[found]] == wanted[found]
+        positions = positions[found]
+        for name in COLUMNS:
+            if name == "id":
+                continue
+            values = mapped[name][positions]
+            if name == "category":
+                values = mapped["category_codes"][values]
+            elif name == "source":
+                values = mapped["source_codes"][values]
+            selected[name][found] = values
+        selected["found"] |= found
+        return selected
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        mapped = self._current()
+        stats.update({
+            "source": "artifact" if mapped is not None else "database",
+            "version": self._version,
+            "articles": len(self),
+            "in_process_articles": self._size,
+        })
+        return stats
+
+
+_default_catalog: Optional[ArticleCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_article_catalog() -> ArticleCatalog:
+    """The process-wide article catalog: mapped from ARTIFACT_DIR when set, otherwise loaded in-process"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            store = get_artifact_store()
+            _default_catalog = MappedArticleCatalog(store) if store else ArticleCatalog()
+        return _default_catalog
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+
+# Layout version of a published artifact; readers refuse versions newer than this
+ARTIFACT_FORMAT = 2
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pack_strings(name: str, strings: List[str]) -> Dict[str, np.ndarray]:
+    """A string table as two flat arrays (UTF-8 bytes and their offsets), read back with Artifact.strings()"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {
+        f"{name}.bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{name}.offsets": offsets,
+    }
+
+
+class Artifact:
+    """One published version: metadata plus arrays memory-mapped on first access.
+
+    Arrays are opened read-only, so every worker mapping the same version
+    shares the same page-cache pages; none of them holds a private copy.
+    """
+
+    def __init__(self, version: str, path: str, metadata: Dict):
+        self.version = version
+        self.path = path
+        self.metadata = metadata
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._strings: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.metadata.get("arrays", {})
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            with self._lock:
+                array = self._arrays.get(name)
+                if array is None:
+                    if name not in self:
+                        raise KeyError(f"Artifact {self.version} has no array {name}")
+                    array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+                    self._arrays[name] = array
+        return array
+
+    def strings(self, name: str) -> List[str]:
+        """A string table written with pack_strings(), decoded once per artifact"""
+        strings = self._strings.get(name)
+        if strings is None:
+            data, offsets = self[f"{name}.bytes"].tobytes(), self[f"{name}.offsets"]
+            strings = [data[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+            self._strings[name] = strings
+        return strings
+
+    def verify(self, checksums: bool = True):
+        """Raise ValueError unless every file matches the manifest (sizes only without checksums)"""
+        for filename, entry in self.metadata.get("files", {}).items():
+            path = os.path.join(self.path, filename)
+            size = os.path.getsize(path)
+            if size != entry["size"]:
+                raise ValueError(f"{filename} is {size} bytes, manifest says {entry['size']}")
+            if checksums and file_sha256(path) != entry["sha256"]:
+                raise ValueError(f"{filename} does not match its manifest checksum")
+
+
+class ArtifactStore:
+    """Versioned directory of recommendation artifacts shared by worker processes.
+
+    A builder process writes each version into versions/<version>/ (one .npy
+    file per array plus metadata.json) under a temporary name, renames it into
+    place and then atomically replaces the CURRENT pointer, so readers never
+    see a half-written version. Workers call latest(), which re-reads CURRENT
+    at most every ARTIFACT_POLL_SECONDS and maps the new version when it
+    changes; versions they may still be reading are kept (ARTIFACT_KEEP).
+
+    metadata.json is the version's manifest: format, dtype and shape of every
+    array, and size and SHA-256 of every file. Loading checks the sizes;
+    the checksums are read in full only with ARTIFACT_VERIFY_CHECKSUMS (or
+    verify(), as serve.py does once before starting workers), since hashing
+    a large version on a request thread would stall it.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        keep: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        verify_checksums: Optional[bool] = None
+    ):
+        self.root = root
+        self.keep = keep or int(os.getenv("ARTIFACT_KEEP", 3))
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(os.getenv("ARTIFACT_POLL_SECONDS", 5))
+        self.verify_checksums = verify_checksums if verify_checksums is not None else \
+            os.getenv("ARTIFACT_VERIFY_CHECKSUMS", "false").lower() == "true"
+        self.versions_dir = os.path.join(root, "versions")
+        self.pointer = os.path.join(root, "CURRENT")
+        self._current: Optional[Artifact] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(self.pointer) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version: Optional[str] = None) -> Optional[Artifact]:
+        version = version or self.current_version()
+        if version is None:
+            return None
+        path = os.path.join(self.versions_dir, version)
+        with open(os.path.join(path, "metadata.json")) as f:
+            metadata = json.load(f)
+        if metadata.get("format", 1) > ARTIFACT_FORMAT:
+            raise ValueError(f"Artifact {version} has format {metadata['format']}, newer than {ARTIFACT_FORMAT}")
+        artifact = Artifact(version, path, metadata)
+        artifact.verify(checksums=self.verify_checksums)
+        return artifact
+
+    def latest(self) -> Optional[Artifact]:
+        """The current artifact, picking up newly published versions (cheap enough to call per request)"""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < self.poll_seconds:
+            return self._current
+        with self._lock:
+            if self._current is None or now - self._checked_at >= self.poll_seconds:
+                self._checked_at = now
+                version = self.current_version()
+                if version and (self._current is None or self._current.version != version):
+                    try:
+                        self._current = self.load(version)
+                        print(f"📦 Loaded artifact {version}")
+                    except (OSError, ValueError) as e:
+                        print(f"⚠️ Could not load artifact {version}: {e}")
+            return self._current
+
+    def publish(self, arrays: Dict[str, np.ndarray], metadata: Optional[Dict] = None) -> str:
+        """Write a new version and point CURRENT at it; returns the version name"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.versions_dir)
+        try:
+            files = {}
+            for name, array in arrays.items():
+                path = os.path.join(staging, f"{name}.npy")
+                np.save(path, np.ascontiguousarray(array))
+                files[f"{name}.npy"] = {"size": os.path.getsize(path), "sha256": file_sha256(path)}
+            document = dict(metadata or {})
+            document.update({
+                "format": ARTIFACT_FORMAT,
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "arrays": {name: {"dtype": str(array.dtype), "shape": list(array.shape)} for name, array in arrays.items()},
+                "files": files,
+            })
+            with open(os.path.join(staging, "metadata.json"), "w") as f:
+                json.dump(document, f, indent=2)
+            # mkdtemp creates the directory private to this user; workers may run as another
+            os.chmod(staging, 0o755)
+            os.rename(staging, os.path.join(self.versions_dir, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer_tmp = f"{self.pointer}.tmp"
+        with open(pointer_tmp, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, self.pointer)
+        self.prune()
+        return version
+
+    def prune(self):
+        """Delete all but the newest `keep` versions (never the current one)"""
+        current = self.current_version()
+        versions = sorted(v for v in os.listdir(self.versions_dir) if not v.startswith("."))
+        for version in versions[:-self.keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+
+
+_default_store: Optional[ArtifactStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """The process-wide store at ARTIFACT_DIR, or None when artifacts are not in use"""
+    global _default_store
+    root = os.getenv("ARTIFACT_DIR")
+    if not root:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore(root)
+        return _default_store
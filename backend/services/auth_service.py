@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Set
+from passlib.context import CryptContext
+from services.cache import TTLCache
+from services.events import event_bus, USER_DEACTIVATED
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify operations are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL while it works, so hashing on a few threads keeps
+    the event loop free to serve other requests during login spikes. The queue
+    of pending operations is bounded so a spike sheds load instead of piling up.
+    """
+
+    def __init__(self, rounds: Optional[int] = None, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.rounds = rounds or int(os.getenv("BCRYPT_ROUNDS", 12))
+        self.workers = workers or int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+        self.max_pending = max_pending or int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.rounds)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy("Too many password operations in progress")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+
+class AuthenticatedUser:
+    """Session-independent snapshot of the fields request handlers read from a user"""
+
+    __slots__ = ("id", "email", "username", "is_active", "created_at")
+
+    def __init__(self, id: int, email: str, username: str, is_active: bool, created_at: Optional[datetime]):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.is_active = is_active
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user) -> "AuthenticatedUser":
+        return cls(user.id, user.email, user.username, user.is_active, user.created_at)
+
+
+class TokenCache:
+    """Short-lived cache of validated bearer tokens and the users they resolve to.
+
+    Entries never outlive the token's own expiry, and every token of a user can
+    be dropped at once when that user is deactivated.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 10000):
+        self.ttl = ttl if ttl is not None else float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+        self._cache = TTLCache(maxsize=maxsize, ttl=self.ttl)
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        event_bus.subscribe(USER_DEACTIVATED, self._on_user_deactivated)
+
+    def _on_user_deactivated(self, user_id: int, **_):
+        self.invalidate_user(user_id)
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        return self._cache.get(token)
+
+    def put(self, token: str, user: AuthenticatedUser, expires_at: Optional[float] = None):
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._cache.set(token, user, ttl=ttl)
+        with self._lock:
+            # Drop tokens that have already expired out of the cache
+            tokens = {t for t in self._tokens_by_user.get(user.id, ()) if t in self._cache}
+            tokens.add(token)
+            self._tokens_by_user[user.id] = tokens
+
+    def invalidate_user(self, user_id: int):
+        """Forget every cached token of a user"""
+        with self._lock:
+            tokens = self._tokens_by_user.pop(user_id, set())
+        for token in tokens:
+            self._cache.pop(token)
+
+
+password_hasher = PasswordHasher()
+token_cache = TokenCache()
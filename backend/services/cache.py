@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with an optional per-entry time-to-live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        return entry is not _MISSING and (entry[1] is None or entry[1] >= time.monotonic())
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches the predicate; returns how many were removed"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,428 @@
+import heapq
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Article, ReadingHistory, ArticleFeedback
+from services.artifacts import ArtifactStore, get_artifact_store
+from services.cache import TTLCache
+from services.events import event_bus, ARTICLES_INGESTED
+from services.metrics import observe_stage
+from services.minhash import MinHasher, LSHIndex, band_hashes, normalize_text
+
+
+class StageTimings:
+    """Running per-stage latency totals of the recommendation pipeline, also exported as metrics"""
+
+    def __init__(self, component: str = "recommendation"):
+        self.component = component
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def record(self, stage: str, ms: float):
+        observe_stage(self.component, stage, ms / 1000)
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_ms"] = ms
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": int(entry["count"]),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "last_ms": round(entry["last_ms"], 3)
+                }
+                for stage, entry in self._stages.items()
+            }
+
+
+def topic_tokens(title: Optional[str], tags: Optional[List[str]]) -> Set[str]:
+    """Tokens describing an article's topic: its extracted tags plus the longer title words"""
+    tokens = {normalize_text(tag) for tag in tags or [] if tag}
+    tokens.update(word for word in normalize_text(title or "").split() if len(word) > 3)
+    tokens.discard("")
+    return tokens
+
+
+class ArticleNeighbourIndex:
+    """Approximate nearest-neighbour index of recent articles by topic.
+
+    Articles of the retention window are signed with MinHash over their topic
+    tokens and kept in a loose banded LSH index (two rows per band), so a query
+    touches only the buckets it hashes to. Newly ingested articles are picked
+    up on the next query.
+    """
+
+    def __init__(self, window_days: Optional[int] = None, num_perm: int = 64, bands: int = 32):
+        self.window_days = window_days if window_days is not None else int(os.getenv("CANDIDATE_WINDOW_DAYS", 30))
+        self.minhasher = MinHasher(num_perm=num_perm, seed=7)
+        self.index = LSHIndex(num_perm=num_perm, bands=bands)
+        self._published_at: Dict[int, float] = {}
+        # (published_at, article_id) min-heap, so expiry only touches expired articles
+        self._expiry: List[tuple] = []
+        self._pending: Set[int] = set()
+        self._loaded = False
+        # _lock guards the in-memory index and is never held across database
+        # reads; _load_lock only keeps concurrent first loads from repeating the work
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        event_bus.subscribe(ARTICLES_INGESTED, self._on_articles_ingested)
+
+    def _on_articles_ingested(self, article_ids: List[int], **_):
+        self.add_articles(article_ids)
+
+    def add_articles(self, article_ids: List[int]):
+        """Queue stored articles for indexing on the next sync"""
+        with self._lock:
+            self._pending.update(article_ids)
+
+    def _cutoff(self) -> datetime:
+        return datetime.now() - timedelta(days=self.window_days)
+
+    def _sign_rows(self, rows: Iterable) -> List[tuple]:
+        """(article_id, signature, published_at timestamp) of the rows that have topic tokens"""
+        signed = []
+        for article_id, title, tags, published_at in rows:
+            tokens = topic_tokens(title, tags)
+            if tokens:
+                signed.append((
+                    article_id, self.minhasher.signature(tokens),
+                    published_at.timestamp() if published_at else time.time()
+                ))
+        return signed
+
+    def _insert_signed(self, signed: List[tuple]):
+        """Add signed rows to the index; call with _lock held"""
+        for article_id, signature, published in signed:
+            if article_id in self.index:
+                continue
+            self.index.insert(article_id, signature)
+            self._published_at[article_id] = published
+            heapq.heappush(self._expiry, (published, article_id))
+
+    def _expire(self):
+        """Drop articles that left the window; call with _lock held"""
+        cutoff = self._cutoff().timestamp()
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, article_id = heapq.heappop(self._expiry)
+            if self._published_at.pop(article_id, None) is not None:
+                self.index.remove(article_id)
+
+    def _sync(self, db: Session):
+        """Load the window on first use, then add ingested articles and drop expired ones"""
+        columns = (Article.id, Article.title, Article.tags, Article.published_at)
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    with self._lock:
+                        # Anything ingested from here on is in the query below or stays pending
+                        self._pending.clear()
+                    signed = self._sign_rows(
+                        db.query(*columns).filter(Article.published_at >= self._cutoff()).yield_per(1000)
+                    )
+                    with self._lock:
+                        self._insert_signed(signed)
+                        self._loaded = True
+
+        with self._lock:
+            pending, self._pending = list(self._pending), set()
+        signed = self._sign_rows(db.query(*columns).filter(Article.id.in_(pending)).all()) if pending else []
+        with self._lock:
+            self._insert_signed(signed)
+            self._expire()
+
+    def neighbours(self, db: Session, seed_ids: List[int], per_seed: int, min_similarity: float,
+                   max_per_bucket: int = 50) -> Dict[int, float]:
+        """Best similarity to any seed for the nearest indexed articles of each seed"""
+        if not seed_ids:
+            return {}
+        self._sync(db)
+        seeds = db.query(Article.id, Article.title, Article.tags).filter(Article.id.in_(seed_ids)).all()
+        signatures = []
+        for seed_id, title, tags in seeds:
+            tokens = topic_tokens(title, tags)
+            if tokens:
+                signatures.append((seed_id, self.minhasher.signature(tokens)))
+        found: Dict[int, float] = {}
+        with self._lock:
+            for seed_id, signature in signatures:
+                matches = self._query(signature, min_similarity, max_per_bucket)
+                for article_id, similarity in [m for m in matches if m[0] != seed_id][:per_seed]:
+                    found[article_id] = max(found.get(article_id, 0.0), similarity)
+        return found
+
+    def _query(self, signature: np.ndarray, min_similarity: float, max_per_bucket: int) -> List[tuple]:
+        return self.index.query(signature, min_similarity, max_per_bucket)
+
+    def to_arrays(self, db: Session) -> Dict[str, np.ndarray]:
+        """The window's signatures and sorted band buckets, for publishing as an artifact"""
+        self._sync(db)
+        with self._lock:
+            article_ids = np.array(sorted(self._published_at), dtype=np.int64)
+            signatures = np.stack([self.index._signatures[a] for a in article_ids]) if len(article_ids) else \
+                np.zeros((0, self.minhasher.num_perm), dtype=np.uint32)
+            published = np.array([self._published_at[a] for a in article_ids], dtype=np.float64)
+        keys = band_hashes(signatures, self.index.bands)
+        # Within a bucket, rows run oldest to newest so its tail holds the most recent articles
+        band_rows = np.stack([np.lexsort((published, keys[:, band])) for band in range(self.index.bands)]) \
+            if len(article_ids) else np.zeros((self.index.bands, 0), dtype=np.int64)
+        return {
+            "neighbours.article_ids": article_ids.astype(np.int32),
+            "neighbours.signatures": signatures.astype(np.uint32),
+            "neighbours.published_at": published,
+            "neighbours.band_keys": np.take_along_axis(keys.T, band_rows, axis=1),
+            "neighbours.band_rows": band_rows.astype(np.int32),
+        }
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class MappedNeighbourIndex(ArticleNeighbourIndex):
+    """Neighbour index served from the published artifact plus a small in-memory overlay.
+
+    The artifact holds the window's signatures and, per band, bucket keys in
+    sorted order, all memory-mapped; a bucket is found by binary search.
+    Articles newer than the artifact (by id, from any worker) go into the
+    overlay LSH index, which is emptied whenever a new version is mapped.
+    """
+
+    def __init__(self, store: ArtifactStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self._version: Optional[str] = None
+        self._artifact = None
+        self._last_article_id = 0
+
+    def add_articles(self, article_ids: List[int]):
+        # Ingestion is picked up by id on the next query, whichever worker ingested
+        pass
+
+    def _sync(self, db: Session):
+        artifact = self.store.latest()
+        if artifact is not None and "neighbours.band_keys" not in artifact:
+            artifact = None
+        version = artifact.version if artifact is not None else None
+        with self._lock:
+            if version != self._version or not self._loaded:
+                self.index = LSHIndex(num_perm=self.minhasher.num_perm, bands=self.index.bands)
+                self._published_at, self._expiry = {}, []
+                self._artifact, self._version, self._loaded = artifact, version, True
+                self._last_article_id = artifact.metadata["neighbours"]["max_article_id"] if artifact is not None else 0
+            last_article_id = self._last_article_id
+
+        cutoff = self._cutoff()
+        rows = db.query(Article.id, Article.title, Article.tags, Article.published_at).filter(
+            Article.id > last_article_id
+        ).order_by(Article.id).all()
+        signed = self._sign_rows(r for r in rows if r[3] is None or r[3] >= cutoff)
+        with self._lock:
+            # If a new artifact was mapped meanwhile, the next sync reads on from its own max id
+            if rows and self._version == version:
+                self._insert_signed(signed)
+                self._last_article_id = max(self._last_article_id, rows[-1][0])
+            self._expire()
+
+    def _query(self, signature: np.ndarray, min_similarity: float, max_per_bucket: int) -> List[tuple]:
+        matches = self.index.query(signature, min_similarity, max_per_bucket)
+        artifact = self._artifact
+        if artifact is None:
+            return matches
+
+        keys, band_rows = artifact["neighbours.band_keys"], artifact["neighbours.band_rows"]
+        rows = []
+        for band, key in enumerate(band_hashes(signature, self.index.bands)[0]):
+            low = np.searchsorted(keys[band], key, side="left")
+            high = np.searchsorted(keys[band], key, side="right")
+            rows.append(band_rows[band][max(low, high - max_per_bucket):high])
+        rows = np.unique(np.concatenate(rows))
+        if len(rows):
+            similarities = np.count_nonzero(artifact["neighbours.signatures"][rows] == signature, axis=1) / len(signature)
+            fresh = artifact["neighbours.published_at"][rows] >= self._cutoff().timestamp()
+            keep = (similarities >= min_similarity) & fresh
+            article_ids = artifact["neighbours.article_ids"][rows[keep]]
+            matches.extend((int(a), float(s)) for a, s in zip(article_ids, similarities[keep]))
+            matches.sort(key=lambda x: x[1], reverse=True)
+        return matches
+
+    def __len__(self) -> int:
+        mapped = len(self._artifact["neighbours.article_ids"]) if self._artifact is not None else 0
+        return mapped + len(self.index)
+
+
+class CandidateGenerator:
+    """First stage of the recommender: a few hundred plausible articles per user.
+
+    Each source is a bounded, indexed query (or an LSH lookup), so the number of
+    candidates and the time to produce them do not depend on how many articles
+    are stored. The sources are:
+
+    * category  - newest articles of the user's strongest categories
+    * similar   - topic neighbours of articles the user liked or read recently
+    * co_read   - articles most read by users who read the same articles
+    * trending  - most read articles of the last days, padded with the newest
+    """
+
+    def __init__(
+        self,
+        per_category: Optional[int] = None,
+        max_categories: Optional[int] = None,
+        seed_limit: Optional[int] = None,
+        neighbours_per_seed: Optional[int] = None,
+        co_read_limit: Optional[int] = None,
+        trending_limit: Optional[int] = None,
+        trending_days: Optional[int] = None
+    ):
+        self.per_category = per_category or int(os.getenv("CANDIDATE_PER_CATEGORY", 60))
+        self.max_categories = max_categories or int(os.getenv("CANDIDATE_MAX_CATEGORIES", 5))
+        self.seed_limit = seed_limit or int(os.getenv("CANDIDATE_SEED_LIMIT", 20))
+        self.neighbours_per_seed = neighbours_per_seed or int(os.getenv("CANDIDATE_NEIGHBOURS_PER_SEED", 10))
+        self.neighbour_min_similarity = float(os.getenv("CANDIDATE_NEIGHBOUR_MIN_SIMILARITY", 0.1))
+        self.co_read_limit = co_read_limit or int(os.getenv("CANDIDATE_CO_READ_LIMIT", 100))
+        self.trending_limit = trending_limit or int(os.getenv("CANDIDATE_TRENDING_LIMIT", 50))
+        self.trending_days = trending_days or int(os.getenv("CANDIDATE_TRENDING_DAYS", 2))
+        store = get_artifact_store()
+        self.neighbour_index = MappedNeighbourIndex(store) if store else ArticleNeighbourIndex()
+        # Trending is the same for everybody; recompute it at most once a minute
+        self._trending_cache = TTLCache(maxsize=1, ttl=60)
+        self._requests = 0
+        self._source_totals: Dict[str, int] = {}
+        self._candidate_total = 0
+
+    def generate(self, db: Session, user_id: int, profile: Dict, timings: Optional[StageTimings] = None,
+                 now: Optional[datetime] = None) -> Dict[int, List[str]]:
+        """Candidate article ids mapped to the sources that produced them"""
+        timings = timings or StageTimings()
+        candidates: Dict[int, List[str]] = {}
+
+        def add(source: str, article_ids: Iterable[int]):
+            for article_id in article_ids:
+                candidates.setdefault(article_id, []).append(source)
+
+        with timings.time("candidates.seeds"):
+            seed_ids = self.seed_articles(db, user_id)
+        with timings.time("candidates.category"):
+            add("category", self.category_recent(db, profile))
+        with timings.time("candidates.similar"):
+            add("similar", self.neighbour_index.neighbours(
+                db, seed_ids, self.neighbours_per_seed, self.neighbour_min_similarity
+            ))
+        with timings.time("candidates.co_read"):
+            add("co_read", self.co_reads(db, user_id, seed_ids))
+        with timings.time("candidates.trending"):
+            add("trending", self.trending(db, now))
+
+        self._requests += 1
+        self._candidate_total += len(candidates)
+        for sources in candidates.values():
+            for source in sources:
+                self._source_totals[source] = self._source_totals.get(source, 0) + 1
+        return candidates
+
+    def stats(self) -> Dict:
+        """Average candidates per request, overall and by source"""
+        requests = self._requests or 1
+        return {
+            "requests": self._requests,
+            "avg_candidates": round(self._candidate_total / requests, 1),
+            "avg_by_source": {source: round(total / requests, 1) for source, total in self._source_totals.items()},
+            "indexed_articles": len(self.neighbour_index)
+        }
+
+    def seed_articles(self, db: Session, user_id: int) -> List[int]:
+        """The user's liked articles and most recent reads"""
+        liked = db.query(ArticleFeedback.article_id).filter(
+            ArticleFeedback.user_id == user_id,
+            ArticleFeedback.liked == True
+        ).order_by(ArticleFeedback.created_at.desc()).limit(self.seed_limit).all()
+        read = db.query(ReadingHistory.article_id).filter(
+            ReadingHistory.user_id == user_id
+        ).order_by(ReadingHistory.created_at.desc()).limit(self.seed_limit).all()
+        return list(dict.fromkeys(row[0] for row in liked + read if row[0] is not None))
+
+    def category_recent(self, db: Session, profile: Dict) -> List[int]:
+        weights: Dict[str, float] = {}
+        for category, weight in profile["preferences"].items():
+            weights[category] = weights.get(category, 0.0) + weight * 2
+        for category, affinity in profile["category_affinity"].items():
+            weights[category] = weights.get(category, 0.0) + affinity * 0.5
+        categories = sorted((c for c in weights if c), key=weights.get, reverse=True)[:self.max_categories]
+
+        article_ids = []
+        for category in categories:
+            rows = db.query(Article.id).filter(
+                Article.category == category
+            ).order_by(Article.published_at.desc()).limit(self.per_category).all()
+            article_ids.extend(row[0] for row in rows)
+        return article_ids
+
+    def co_reads(self, db: Session, user_id: int, seed_ids: List[int]) -> List[int]:
+        if not seed_ids:
+            return []
+        peers = db.query(ReadingHistory.user_id).filter(
+            ReadingHistory.article_id.in_(seed_ids),
+            ReadingHistory.user_id != user_id
+        ).distinct().limit(200).subquery()
+        rows = db.query(ReadingHistory.article_id).filter(
+            ReadingHistory.user_id.in_(peers.select()),
+            ReadingHistory.article_id.notin_(seed_ids)
+        ).group_by(ReadingHistory.article_id).order_by(
+            func.count(ReadingHistory.id).desc()
+        ).limit(self.co_read_limit).all()
+        return [row[0] for row in rows]
+
+    def trending(self, db: Session, now: Optional[datetime] = None) -> List[int]:
+        if now is not None:
+            # Replays ask for trending as of a past moment; don't mix that into the cache
+            return self._compute_trending(db, now)
+        return self._trending_cache.get_or_set("trending", lambda: self._compute_trending(db))
+
+    def _compute_trending(self, db: Session, now: Optional[datetime] = None) -> List[int]:
+        now = now or datetime.now()
+        since = now - timedelta(days=self.trending_days)
+        rows = db.query(ReadingHistory.article_id).filter(
+            ReadingHistory.created_at >= since,
+            ReadingHistory.created_at <= now
+        ).group_by(ReadingHistory.article_id).order_by(
+            func.count(ReadingHistory.id).desc()
+        ).limit(self.trending_limit).all()
+        article_ids = [row[0] for row in rows]
+        if len(article_ids) < self.trending_limit:
+            newest = db.query(Article.id).filter(
+                Article.published_at <= now
+            ).order_by(Article.published_at.desc()).limit(self.trending_limit).all()
+            article_ids.extend(row[0] for row in newest if row[0] not in article_ids)
+        return article_ids[:self.trending_limit]
+
+
+# Shared by every AIService instance so the neighbour index is built once per process
+recommendation_timings = StageTimings()
+_default_generator: Optional[CandidateGenerator] = None
+_default_generator_lock = threading.Lock()
+
+
+def get_candidate_generator() -> CandidateGenerator:
+    """Return the process-wide candidate generator"""
+    global _default_generator
+    with _default_generator_lock:
+        if _default_generator is None:
+            _default_generator = CandidateGenerator()
+        return _default_generator
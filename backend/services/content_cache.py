@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+import zlib
+import json
+import os
+from typing import Optional, Dict
+
+
+class ContentCache:
+    """On-disk cache of fetched article pages keyed by URL.
+
+    Each entry keeps the compressed response body, the extracted text and
+    metadata, plus the validators (ETag / Last-Modified) needed to revalidate
+    the page with a conditional GET once it is older than the TTL. The store
+    is bounded by total compressed size and evicts least recently used pages.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_age_seconds: Optional[int] = None):
+        self.path = path or os.getenv("CONTENT_CACHE_PATH", "./content_cache.db")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("CONTENT_CACHE_TTL_SECONDS", 6 * 3600))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("CONTENT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else int(os.getenv("CONTENT_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                text BLOB,
+                metadata TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_accessed_at ON pages (accessed_at)")
+        # Expiry runs on every put; without this it would scan the whole table
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_fetched_at ON pages (fetched_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached page for a URL, or None if it is not cached"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, text, metadata, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+        body, text, metadata, etag, last_modified, fetched_at = row
+        return {
+            "url": url,
+            "body": zlib.decompress(body) if body else b"",
+            "text": zlib.decompress(text).decode("utf-8") if text else None,
+            "metadata": json.loads(metadata) if metadata else {},
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+        }
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """Whether a cached entry can be served without revalidation"""
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def put(self, url: str, body: bytes, text: Optional[str], metadata: Dict,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a freshly downloaded page"""
+        compressed_body = zlib.compress(body or b"", 6)
+        compressed_text = zlib.compress(text.encode("utf-8"), 6) if text else None
+        size = len(compressed_body) + (len(compressed_text) if compressed_text else 0)
+        now = time.time()
+
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, text, metadata, etag, last_modified, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, compressed_body, compressed_text, json.dumps(metadata), etag, last_modified, now, now, size)
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def mark_revalidated(self, url: str):
+        """Reset the freshness clock after a 304 Not Modified response"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired pages, then least recently used pages until under the size bound"""
+        cutoff = time.time() - self.max_age_seconds
+        expired = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages WHERE fetched_at < ?", (cutoff,)).fetchone()[0]
+        if expired:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,))
+            self._total_bytes -= expired
+
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Evict in batches, oldest access first
+        excess = self._total_bytes - self.max_bytes
+        freed = 0
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at ASC"):
+            victims.append((url,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+        self._total_bytes -= freed
+
+    def stats(self) -> Dict:
+        """Return cache size information"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {
+            "entries": entries,
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,44 +1,89 @@
-import requests
 from bs4 import BeautifulSoup
 import re
 from typing import Optional, Dict
 import time
 import random
+from services.content_cache import ContentCache
+from services.http_client import ResilientHTTPClient, get_http_client
+from services.metrics import timed
+
+EMPTY_METADATA = {'title': None, 'author': None, 'published_date': None, 'description': None}
 
 class ContentFetcher:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, cache: Optional[ContentCache] = None, http_client: Optional[ResilientHTTPClient] = None):
+        self.http = http_client or get_http_client()
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        }
+        self.cache = cache if cache is not None else ContentCache()
+        
+    def fetch_article(self, url: str) -> Optional[Dict]:
+        """Fetch a page once and return both its extracted content and metadata.
+        
+        Pages are served from the content cache while fresh; stale entries are
+        revalidated with a conditional GET so unchanged pages are not re-downloaded.
+        """
+        if not url:
+            return None
+        
+        cached = self.cache.get(url)
+        if cached and self.cache.is_fresh(cached):
+            return {'content': cached['text'], 'metadata': cached['metadata']}
+        
+        headers = dict(self.headers)
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         
-    def fetch_full_content(self, url: str) -> Optional[str]:
-        """Fetch full article content from URL"""
         try:
             # Add delay to be respectful to servers
-            time.sleep(random.uniform(1, 3))
-            
-            response = self.session.get(url, timeout=10)
+            with timed("content_fetcher", "politeness_delay"):
+                time.sleep(random.uniform(1, 3))
+            
+            with timed("content_fetcher", "download"):
+                response = self.http.get(url, headers=headers)
+            if response.status_code == 304 and cached:
+                self.cache.mark_revalidated(url)
+                return {'content': cached['text'], 'metadata': cached['metadata']}
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
-                script.decompose()
-            
-            # Try different content extraction strategies
-            content = self._extract_content(soup, url)
-            
-            if content:
-                # Clean up the content
-                content = self._clean_content(content)
-                return content
+            with timed("content_fetcher", "extract"):
+                soup = BeautifulSoup(response.content, 'html.parser')
                 
+                # Metadata selectors look at header elements, so read them before stripping
+                metadata = self._extract_metadata(soup)
+                
+                # Remove script and style elements
+                for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
+                    script.decompose()
+                
+                # Try different content extraction strategies
+                content = self._extract_content(soup, url)
+                if content:
+                    # Clean up the content
+                    content = self._clean_content(content)
+            
+            self.cache.put(
+                url,
+                response.content,
+                content,
+                metadata,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            return {'content': content, 'metadata': metadata}
+            
         except Exception as e:
             print(f"Error fetching content from {url}: {e}")
             
         return None
+        
+    def fetch_full_content(self, url: str) -> Optional[str]:
+        """Fetch full article content from URL"""
+        page = self.fetch_article(url)
+        return page['content'] if page else None
     
     def _extract_content(self, soup: BeautifulSoup, url: str) -> Optional[str]:
         """Extract article content using multiple strategies"""
@@ -146,66 +191,58 @@ class ContentFetcher:
     
     def get_article_metadata(self, url: str) -> Dict:
         """Extract article metadata (title, author, date) from URL"""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            metadata = {
-                'title': None,
-                'author': None,
-                'published_date': None,
-                'description': None
-            }
-            
-            # Extract title
-            title_selectors = [
-                'h1',
-                '[property="og:title"]',
-                '[name="twitter:title"]',
-                'title'
-            ]
-            
-            for selector in title_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    if selector in ['[property="og:title"]', '[name="twitter:title"]']:
-                        metadata['title'] = element.get('content', '').strip()
-                    else:
-                        metadata['title'] = element.get_text().strip()
-                    if metadata['title']:
-                        break
-            
-            # Extract author
-            author_selectors = [
-                '[rel="author"]',
-                '[class*="author"]',
-                '[class*="byline"]',
-                '[property="article:author"]'
-            ]
-            
-            for selector in author_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    metadata['author'] = element.get_text().strip()
-                    break
-            
-            # Extract description
-            desc_selectors = [
-                '[property="og:description"]',
-                '[name="description"]',
-                '[name="twitter:description"]'
-            ]
-            
-            for selector in desc_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    metadata['description'] = element.get('content', '').strip()
+        page = self.fetch_article(url)
+        if page and page['metadata']:
+            return page['metadata']
+        return dict(EMPTY_METADATA)
+    
+    def _extract_metadata(self, soup: BeautifulSoup) -> Dict:
+        """Extract title, author and description from a parsed page"""
+        metadata = dict(EMPTY_METADATA)
+        
+        # Extract title
+        title_selectors = [
+            'h1',
+            '[property="og:title"]',
+            '[name="twitter:title"]',
+            'title'
+        ]
+        
+        for selector in title_selectors:
+            element = soup.select_one(selector)
+            if element:
+                if selector in ['[property="og:title"]', '[name="twitter:title"]']:
+                    metadata['title'] = element.get('content', '').strip()
+                else:
+                    metadata['title'] = element.get_text().strip()
+                if metadata['title']:
                     break
-            
-            return metadata
-            
-        except Exception as e:
-            print(f"Error extracting metadata from {url}: {e}")
-            return {'title': None, 'author': None, 'published_date': None, 'description': None} 
\ No newline at end of file
+        
+        # Extract author
+        author_selectors = [
+            '[rel="author"]',
+            '[class*="author"]',
+            '[class*="byline"]',
+            '[property="article:author"]'
+        ]
+        
+        for selector in author_selectors:
+            element = soup.select_one(selector)
+            if element:
+                metadata['author'] = element.get_text().strip()
+                break
+        
+        # Extract description
+        desc_selectors = [
+            '[property="og:description"]',
+            '[name="description"]',
+            '[name="twitter:description"]'
+        ]
+        
+        for selector in desc_selectors:
+            element = soup.select_one(selector)
+            if element:
+                metadata['description'] = element.get('content', '').strip()
+                break
+        
+        return metadata
\ No newline at end of file
@@ -0,0 +1,82 @@
+import math
+from typing import Optional
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+
+def decay_factor(age_seconds: float, half_life_seconds: float) -> float:
+    """Weight of an event age_seconds old; 1.0 for every age when the half-life is 0 (decay off)"""
+    if half_life_seconds <= 0:
+        return 1.0
+    return math.pow(0.5, max(age_seconds, 0.0) / half_life_seconds)
+
+
+def decay_weights(ages_seconds: np.ndarray, half_life_seconds: float) -> np.ndarray:
+    """Vectorised decay_factor; NaN ages (unknown times) get weight 0"""
+    ages = np.asarray(ages_seconds, dtype=np.float64)
+    if half_life_seconds <= 0:
+        weights = np.ones_like(ages)
+    else:
+        weights = np.power(0.5, np.maximum(ages, 0.0) / half_life_seconds)
+    weights[np.isnan(ages)] = 0.0
+    return weights
+
+
+class DecayedCounter:
+    """An exponentially decaying sum maintained in O(1) per update.
+
+    Only the value at the last update time is stored; reading or adding at a
+    later time first decays it by the elapsed half-lives, so the history never
+    needs to be rescanned. Events older than the last update are decayed by
+    their own age instead.
+    """
+
+    __slots__ = ("half_life", "_value", "_at")
+
+    def __init__(self, half_life_seconds: float):
+        self.half_life = half_life_seconds
+        self._value = 0.0
+        self._at: Optional[float] = None
+
+    def add(self, amount: float, at: float):
+        if self._at is None:
+            self._value, self._at = amount, at
+        elif at >= self._at:
+            self._value = self._value * decay_factor(at - self._at, self.half_life) + amount
+            self._at = at
+        else:
+            self._value += amount * decay_factor(self._at - at, self.half_life)
+
+    def value(self, now: float) -> float:
+        if self._at is None:
+            return 0.0
+        return self._value * decay_factor(now - self._at, self.half_life)
+
+
+class DecayedRecency:
+    """Decay weight of the most recent of a series of events (1.0 right after one)"""
+
+    __slots__ = ("half_life", "_at")
+
+    def __init__(self, half_life_seconds: float):
+        self.half_life = half_life_seconds
+        self._at: Optional[float] = None
+
+    def add(self, at: float):
+        self._at = at if self._at is None else max(self._at, at)
+
+    def value(self, now: float) -> float:
+        if self._at is None:
+            return 0.0
+        return decay_factor(now - self._at, self.half_life)
+
+
+def freshness_prior(published_ts: np.ndarray, now: float, half_life_seconds: float) -> np.ndarray:
+    """Freshness in [0, 1] of articles published at the given epoch seconds (NaN when unknown).
+
+    Unlike history decay, a half-life of 0 turns the prior off (all zeros).
+    """
+    if half_life_seconds <= 0:
+        return np.zeros(len(published_ts))
+    return decay_weights(now - np.asarray(published_ts, dtype=np.float64), half_life_seconds)
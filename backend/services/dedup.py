@@ -0,0 +1,108 @@
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from sqlalchemy.orm import Session
+from models import Article
+from services.minhash import MinHasher, LSHIndex, char_shingles
+
+# Query parameters that only identify the referrer or campaign, never the page
+TRACKING_PARAM_PREFIXES = ("utm_", "mc_", "pk_", "hsa_", "_hs")
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "ocid", "cmpid",
+    "ref", "ref_src", "referrer", "smid", "smtyp", "ito", "taid", "sr_share",
+    "guccounter", "guce_referrer", "guce_referrer_sig"
+}
+
+# NewsAPI appends the publisher to titles ("Headline - Reuters"), which would
+# otherwise hide the same headline carried by two outlets
+_TITLE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,60}$")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different links to the same page compare equal.
+
+    Drops the scheme (http/https), "www.", default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the remaining query parameters.
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/").rstrip("/")
+    for index_page in ("/index.html", "/index.htm", "/index.php"):
+        if path.endswith(index_page):
+            path = path[:-len(index_page)]
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def strip_title_suffix(title: str) -> str:
+    """Remove a trailing " - Publisher" segment from a headline"""
+    if not title:
+        return ""
+    return _TITLE_SUFFIX.sub("", title.strip())
+
+
+class ArticleDeduplicator:
+    """Early duplicate filter for the ingestion pipeline.
+
+    Holds the canonical URLs of every stored article and a MinHash LSH index of
+    recent titles, so incoming NewsAPI items that are already stored (or are the
+    same headline under a different URL) are rejected before any content fetch
+    or AI analysis happens.
+    """
+
+    def __init__(self, title_threshold: Optional[float] = None, num_perm: int = 64, bands: int = 16):
+        self.title_threshold = title_threshold if title_threshold is not None else float(os.getenv("DEDUP_TITLE_THRESHOLD", 0.8))
+        self.minhasher = MinHasher(num_perm=num_perm)
+        self.title_index = LSHIndex(num_perm=num_perm, bands=bands)
+        self.known_urls = set()
+
+    @classmethod
+    def from_db(cls, db: Session, title_window_days: Optional[int] = None) -> "ArticleDeduplicator":
+        """Load stored URLs and recent titles from the articles table"""
+        deduplicator = cls()
+        window_days = title_window_days if title_window_days is not None else int(os.getenv("DEDUP_TITLE_WINDOW_DAYS", 7))
+        title_cutoff = datetime.now() - timedelta(days=window_days)
+
+        rows = db.query(Article.url, Article.title, Article.created_at).yield_per(5000)
+        for url, title, created_at in rows:
+            deduplicator.known_urls.add(canonicalize_url(url))
+            if title and created_at and created_at.replace(tzinfo=None) >= title_cutoff:
+                deduplicator._index_title(url, title)
+
+        return deduplicator
+
+    def _title_signature(self, title: str):
+        return self.minhasher.signature(char_shingles(strip_title_suffix(title)))
+
+    def _index_title(self, url: str, title: str):
+        self.title_index.insert(canonicalize_url(url), self._title_signature(title))
+
+    def duplicate_reason(self, url: str, title: str) -> Optional[str]:
+        """Return "url" or "title" if the article duplicates a known one, else None"""
+        if canonicalize_url(url) in self.known_urls:
+            return "url"
+        if title and self.title_index.query(self._title_signature(title), self.title_threshold):
+            return "title"
+        return None
+
+    def add(self, url: str, title: str):
+        """Record an accepted article so later duplicates in the same run are caught"""
+        self.known_urls.add(canonicalize_url(url))
+        if title:
+            self._index_title(url, title)
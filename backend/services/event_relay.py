@@ -0,0 +1,196 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from database import SessionLocal
+from models import BusEvent
+from services.events import (
+    EventBus, event_bus, PREFERENCES_CHANGED, READING_RECORDED, ARTICLES_INGESTED, USER_DEACTIVATED
+)
+
+# Events whose handlers invalidate per-process state, so every worker must see them
+RELAYED_EVENTS = (PREFERENCES_CHANGED, READING_RECORDED, ARTICLES_INGESTED, USER_DEACTIVATED)
+
+
+class EventRelay:
+    """Carries cache-invalidation events between worker processes through the database.
+
+    EventBus handlers only run in the publishing process, so with several
+    workers (serve.py, gunicorn) the others would keep serving stale
+    recommendations, tokens and article features. The relay buffers every
+    relayed event published in its process (publishers run inside request
+    handlers and must not wait on the database), and a background thread
+    appends the buffer to bus_events and polls that table every
+    EVENT_RELAY_POLL_SECONDS, republishing on
+    the local bus the events other processes wrote, with published_at set to
+    the UTC time the other process wrote them. Ids that are skipped while
+    their transaction is still open are re-checked for EVENT_RELAY_GAP_SECONDS.
+    Rows older than EVENT_RELAY_RETENTION_SECONDS are pruned.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus = event_bus,
+        session_factory=SessionLocal,
+        poll_seconds: Optional[float] = None,
+        retention_seconds: Optional[float] = None,
+        gap_seconds: Optional[float] = None
+    ):
+        self.bus = bus
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds if poll_seconds is not None else float(os.getenv("EVENT_RELAY_POLL_SECONDS", 1))
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(os.getenv("EVENT_RELAY_RETENTION_SECONDS", 3600))
+        self.gap_seconds = gap_seconds if gap_seconds is not None else float(os.getenv("EVENT_RELAY_GAP_SECONDS", 30))
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}  # Unseen ids below _last_id -> when they were first skipped
+        self._forwarders: Dict[str, Callable] = {}
+        self._outbox: List[Tuple[str, Dict, datetime]] = []
+        self._outbox_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pruned_at = 0.0
+        self.sent = 0
+        self.received = 0
+
+    def start(self):
+        if self._worker and self._worker.is_alive():
+            return
+        db = self.session_factory()
+        try:
+            # Events from before this process started concern caches it does not have yet
+            self._last_id = db.query(func.max(BusEvent.id)).scalar() or 0
+        finally:
+            db.close()
+        for event_type in RELAYED_EVENTS:
+            forwarder = self._forwarder(event_type)
+            self._forwarders[event_type] = forwarder
+            self.bus.subscribe(event_type, forwarder)
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="event-relay", daemon=True)
+        self._worker.start()
+        print(f"📡 Event relay started ({self.origin})")
+
+    def stop(self, timeout: float = 5.0):
+        for event_type, forwarder in self._forwarders.items():
+            self.bus.unsubscribe(event_type, forwarder)
+        self._forwarders = {}
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+        # Events published after the last pass still reach the other workers
+        self.flush()
+
+    def _forwarder(self, event_type: str) -> Callable:
+        def forward(**payload):
+            # Events the relay thread republishes came from the table already
+            if threading.current_thread() is self._worker:
+                return
+            self.send(event_type, payload)
+        return forward
+
+    def send(self, event_type: str, payload: Dict):
+        """Queue an event for the relay thread; does not touch the database"""
+        with self._outbox_lock:
+            self._outbox.append((event_type, payload, datetime.utcnow()))
+
+    def flush(self) -> int:
+        """Write the buffered events to bus_events in one transaction; returns how many"""
+        with self._outbox_lock:
+            pending, self._outbox = self._outbox, []
+        if not pending:
+            return 0
+        db = self.session_factory()
+        try:
+            db.add_all([
+                BusEvent(event_type=event_type, payload=payload, origin=self.origin, created_at=created_at)
+                for event_type, payload, created_at in pending
+            ])
+            db.commit()
+            self.sent += len(pending)
+        except Exception as e:
+            db.rollback()
+            # Keep them for the next pass rather than losing the invalidation
+            with self._outbox_lock:
+                self._outbox = pending + self._outbox
+            print(f"Error relaying {len(pending)} events: {e}")
+            return 0
+        finally:
+            db.close()
+        return len(pending)
+
+    def poll(self) -> int:
+        """Republish the events other processes wrote since the last poll; returns how many"""
+        now = time.monotonic()
+        self._gaps = {event_id: seen for event_id, seen in self._gaps.items() if now - seen < self.gap_seconds}
+        db = self.session_factory()
+        try:
+            rows: List[BusEvent] = db.query(BusEvent).filter(BusEvent.id > self._last_id).order_by(BusEvent.id).limit(1000).all()
+            if self._gaps:
+                rows = db.query(BusEvent).filter(BusEvent.id.in_(list(self._gaps))).all() + rows
+            events = []
+            for row in rows:
+                self._gaps.pop(row.id, None)
+                if row.id > self._last_id:
+                    self._gaps.update((event_id, now) for event_id in range(self._last_id + 1, row.id))
+                    self._last_id = row.id
+                if row.origin != self.origin:
+                    events.append((row.event_type, row.payload or {}, row.created_at))
+        finally:
+            db.close()
+
+        for event_type, payload, published_at in events:
+            self.bus.publish(event_type, published_at=published_at, **payload)
+        self.received += len(events)
+        return len(events)
+
+    def prune(self):
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+            db.query(BusEvent).filter(BusEvent.created_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.flush()
+                self.poll()
+                if time.monotonic() - self._pruned_at >= self.retention_seconds / 10:
+                    self._pruned_at = time.monotonic()
+                    self.prune()
+            except Exception as e:
+                print(f"Error polling relayed events: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def stats(self) -> Dict:
+        with self._outbox_lock:
+            buffered = len(self._outbox)
+        return {"origin": self.origin, "sent": self.sent, "buffered": buffered, "received": self.received, "last_id": self._last_id}
+
+
+_default_relay: Optional[EventRelay] = None
+_default_relay_lock = threading.Lock()
+
+
+def get_event_relay() -> Optional[EventRelay]:
+    """The process-wide relay, or None when this is the only worker process.
+
+    On by default whenever ARTIFACT_DIR is set, since that is how serve.py and
+    gunicorn deployments run several workers; EVENT_RELAY=true/false overrides.
+    """
+    global _default_relay
+    enabled = os.getenv("EVENT_RELAY", "true" if os.getenv("ARTIFACT_DIR") else "false").lower() == "true"
+    if not enabled:
+        return None
+    with _default_relay_lock:
+        if _default_relay is None:
+            _default_relay = EventRelay()
+        return _default_relay
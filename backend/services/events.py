@@ -0,0 +1,44 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# Event types
+PREFERENCES_CHANGED = "preferences_changed"  # user_id, categories
+READING_RECORDED = "reading_recorded"  # user_id, article_id
+ARTICLES_INGESTED = "articles_ingested"  # article_ids
+USER_DEACTIVATED = "user_deactivated"  # user_id
+# Events republished by services/event_relay.py also carry published_at (naive UTC)
+
+
+class EventBus:
+    """Minimal in-process publish/subscribe for cache invalidation.
+
+    Handlers run synchronously in the publisher's thread; a failing handler is
+    reported and does not stop the others or the publisher. With several
+    worker processes, services/event_relay.py carries events between them.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type: str, handler: Callable):
+        with self._lock:
+            self._handlers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: str, handler: Callable):
+        with self._lock:
+            if handler in self._handlers[event_type]:
+                self._handlers[event_type].remove(handler)
+
+    def publish(self, event_type: str, **payload):
+        with self._lock:
+            handlers = list(self._handlers[event_type])
+        for handler in handlers:
+            try:
+                handler(**payload)
+            except Exception as e:
+                print(f"Error handling {event_type} event: {e}")
+
+
+event_bus = EventBus()
@@ -0,0 +1,276 @@
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Article, ReadingHistory, UserPreference, UserFeedItem, UserFeedClaim
+from services.events import event_bus, PREFERENCES_CHANGED, READING_RECORDED, ARTICLES_INGESTED
+
+# Queue marker: recompute every active user (queued after ingestion)
+ALL_ACTIVE_USERS = "*"
+
+
+class FeedMaterializer:
+    """Precomputes each active user's top-N feed in the background.
+
+    The hybrid recommender is too slow to run on every page load, so a worker
+    thread writes its output to `user_feed_items` and requests read it back
+    with one indexed join. Users are queued after ingestion (all active users)
+    and after preference changes or every few reads; a user with no feed, a
+    pending profile change or a feed older than the staleness bound is served
+    live instead.
+
+    Every worker process hears the same events through the relay, so before
+    recomputing a user the worker claims it in `user_feed_claims`; a user
+    already claimed since the request (by the event's published_at) is left
+    to the process that claimed it, and the others pick the new feed up from
+    the table.
+    """
+
+    def __init__(
+        self,
+        ai_service,
+        session_factory=SessionLocal,
+        top_n: Optional[int] = None,
+        max_staleness: Optional[float] = None,
+        queue_max: Optional[int] = None,
+        reads_per_refresh: Optional[int] = None,
+        active_days: Optional[int] = None
+    ):
+        self.ai_service = ai_service
+        self.session_factory = session_factory
+        self.top_n = top_n or int(os.getenv("FEED_TOP_N", 50))
+        self.max_staleness = max_staleness if max_staleness is not None else float(os.getenv("FEED_MAX_STALENESS_SECONDS", 3600))
+        self.queue_max = queue_max or int(os.getenv("FEED_QUEUE_MAX", 1000))
+        self.reads_per_refresh = reads_per_refresh or int(os.getenv("FEED_READS_PER_REFRESH", 3))
+        self.active_days = active_days or int(os.getenv("FEED_ACTIVE_DAYS", 30))
+
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        # Pending user ids -> when the latest recomputation was requested (UTC)
+        self._queue: "OrderedDict[object, datetime]" = OrderedDict()
+        self._condition = threading.Condition()
+        # Users whose profile changed -> when; a feed computed before then must not be served
+        self._dirty: Dict[int, datetime] = {}
+        self._reads_since_refresh: Dict[int, int] = {}
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.counters = {"materialized": 0, "skipped": 0, "failed": 0, "dropped": 0, "served": 0, "fallbacks": 0}
+        self.last_duration_ms: Optional[float] = None
+        self.last_materialized_at: Optional[datetime] = None
+
+        event_bus.subscribe(PREFERENCES_CHANGED, self._on_preferences_changed)
+        event_bus.subscribe(READING_RECORDED, self._on_reading_recorded)
+        event_bus.subscribe(ARTICLES_INGESTED, self._on_articles_ingested)
+
+    # Queue
+
+    def enqueue(self, user_id, requested_at: Optional[datetime] = None) -> bool:
+        """Queue a user (or ALL_ACTIVE_USERS) for recomputation; False if the queue is full"""
+        requested_at = requested_at or datetime.utcnow()
+        with self._condition:
+            if user_id in self._queue:
+                self._queue[user_id] = max(self._queue[user_id], requested_at)
+                return True
+            if len(self._queue) >= self.queue_max:
+                self.counters["dropped"] += 1
+                return False
+            self._queue[user_id] = requested_at
+            self._condition.notify()
+            return True
+
+    def _next(self, timeout: float = 1.0):
+        with self._condition:
+            if not self._queue:
+                self._condition.wait(timeout)
+            if not self._queue:
+                return None
+            return self._queue.popitem(last=False)
+
+    def _mark_dirty(self, user_id: int, changed_at: datetime):
+        with self._condition:
+            self._dirty[user_id] = max(self._dirty.get(user_id, changed_at), changed_at)
+            self._reads_since_refresh.pop(user_id, None)
+        self.enqueue(user_id, changed_at)
+
+    def _mark_clean(self, user_id: int, computed_at: datetime):
+        with self._condition:
+            changed_at = self._dirty.get(user_id)
+            if changed_at is not None and changed_at <= computed_at:
+                del self._dirty[user_id]
+
+    def _on_preferences_changed(self, user_id: int, published_at: Optional[datetime] = None, **_):
+        self._mark_dirty(user_id, published_at or datetime.utcnow())
+
+    def _on_reading_recorded(self, user_id: int, published_at: Optional[datetime] = None, **_):
+        # A single read barely moves the profile; recompute every few reads
+        with self._condition:
+            reads = self._reads_since_refresh.get(user_id, 0) + 1
+            self._reads_since_refresh[user_id] = reads
+        if reads >= self.reads_per_refresh:
+            self._mark_dirty(user_id, published_at or datetime.utcnow())
+
+    def _on_articles_ingested(self, published_at: Optional[datetime] = None, **_):
+        self.enqueue(ALL_ACTIVE_USERS, published_at)
+
+    # Worker
+
+    def start(self):
+        if self._worker and self._worker.is_alive():
+            return
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="feed-materializer", daemon=True)
+        self._worker.start()
+        print(f"📰 Feed materializer started (top {self.top_n}, max staleness {self.max_staleness:.0f}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping = True
+        with self._condition:
+            self._condition.notify_all()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _run(self):
+        while not self._stopping:
+            item = self._next()
+            if item is None:
+                continue
+            user_id, requested_at = item
+            db = self.session_factory()
+            try:
+                if user_id == ALL_ACTIVE_USERS:
+                    for active_user_id in self.active_user_ids(db):
+                        self.enqueue(active_user_id, requested_at)
+                else:
+                    claimed_at = self.claim(db, user_id, requested_at)
+                    if claimed_at is None:
+                        self.counters["skipped"] += 1
+                    else:
+                        self.materialize(db, user_id, claimed_at)
+            except Exception as e:
+                db.rollback()
+                self.counters["failed"] += 1
+                print(f"Error materializing feed for {user_id}: {e}")
+            finally:
+                db.close()
+
+    def active_user_ids(self, db: Session) -> List[int]:
+        """Users who read something or changed preferences within the active window"""
+        since = datetime.utcnow() - timedelta(days=self.active_days)
+        readers = db.query(ReadingHistory.user_id).filter(ReadingHistory.created_at >= since)
+        tuners = db.query(UserPreference.user_id).filter(
+            func.coalesce(UserPreference.updated_at, UserPreference.created_at) >= since
+        )
+        return sorted({row[0] for row in readers.union(tuners).all() if row[0] is not None})
+
+    def claim(self, db: Session, user_id: int, requested_at: datetime) -> Optional[datetime]:
+        """Take the user's recomputation; None if another process claimed it since the request"""
+        claimed_at = datetime.utcnow()
+        updated = db.query(UserFeedClaim).filter(
+            UserFeedClaim.user_id == user_id, UserFeedClaim.claimed_at < requested_at
+        ).update({"origin": self.origin, "claimed_at": claimed_at}, synchronize_session=False)
+        if not updated:
+            if db.query(UserFeedClaim.user_id).filter(UserFeedClaim.user_id == user_id).first() is not None:
+                db.rollback()
+                return None
+            db.add(UserFeedClaim(user_id=user_id, origin=self.origin, claimed_at=claimed_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process inserted the first claim for this user
+            db.rollback()
+            return None
+        return claimed_at
+
+    def materialize(self, db: Session, user_id: int, computed_at: Optional[datetime] = None) -> int:
+        """Recompute and store one user's feed; returns the number of items stored
+
+        computed_at is when the inputs were read (the claim time); changes
+        after it leave the user dirty.
+        """
+        computed_at = computed_at or datetime.utcnow()
+        start = time.perf_counter()
+        recommendations = self.ai_service.hybrid_recommendations(db, user_id, self.top_n)
+        rows = [
+            {
+                "user_id": user_id,
+                "rank": rank,
+                "article_id": rec["article"].id,
+                "score": float(rec["score"]),
+                "computed_at": computed_at
+            }
+            for rank, rec in enumerate(recommendations)
+        ]
+
+        db.query(UserFeedItem).filter(UserFeedItem.user_id == user_id).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(UserFeedItem), rows)
+        db.commit()
+        self._mark_clean(user_id, computed_at)
+
+        self.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.last_materialized_at = computed_at
+        self.counters["materialized"] += 1
+        return len(rows)
+
+    # Serving
+
+    def get_feed(self, db: Session, user_id: int, limit: int, columns) -> Optional[List]:
+        """The stored feed as rows of the given Article columns, or None to compute it live.
+
+        None is returned (and the user queued) when the feed is missing, older
+        than the staleness bound or computed before the user's latest profile
+        change. Requests for more than the stored top-N are always computed live.
+        """
+        if limit > self.top_n:
+            self.counters["fallbacks"] += 1
+            return None
+
+        rows = db.query(UserFeedItem.computed_at, *columns).join(
+            Article, Article.id == UserFeedItem.article_id
+        ).filter(
+            UserFeedItem.user_id == user_id
+        ).order_by(UserFeedItem.rank).limit(limit).all()
+
+        if rows:
+            # Another process may have recomputed the feed since the change
+            self._mark_clean(user_id, rows[0].computed_at)
+        if not rows or user_id in self._dirty or rows[0].computed_at < datetime.utcnow() - timedelta(seconds=self.max_staleness):
+            self.counters["fallbacks"] += 1
+            self.enqueue(user_id, self._dirty.get(user_id))
+            return None
+
+        self.counters["served"] += 1
+        return rows
+
+    def stats(self, db: Optional[Session] = None) -> Dict:
+        with self._condition:
+            queue_depth = len(self._queue)
+            dirty = len(self._dirty)
+        stats = {
+            "worker_running": bool(self._worker and self._worker.is_alive()),
+            "queue_depth": queue_depth,
+            "queue_max": self.queue_max,
+            "dirty_users": dirty,
+            "top_n": self.top_n,
+            "max_staleness_seconds": self.max_staleness,
+            "last_duration_ms": self.last_duration_ms,
+            "last_materialized_at": self.last_materialized_at.isoformat() if self.last_materialized_at else None,
+            **self.counters
+        }
+        if db is not None:
+            users, oldest = db.query(
+                func.count(func.distinct(UserFeedItem.user_id)), func.min(UserFeedItem.computed_at)
+            ).one()
+            stats["stored_feeds"] = users
+            stats["oldest_feed_age_seconds"] = (
+                round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None
+            )
+        return stats
@@ -0,0 +1,232 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models import FetchWatermark, NewsAPIUsage
+
+HEADLINE_CATEGORIES = ["technology", "business", "science", "health", "entertainment", "sports"]
+
+TRENDING_QUERIES = [
+    "artificial intelligence",
+    "climate change",
+    "space exploration",
+    "cryptocurrency",
+    "electric vehicles",
+    "renewable energy",
+    "mental health",
+    "remote work"
+]
+
+# Re-request a little before the watermark to catch articles NewsAPI indexes late
+WATERMARK_OVERLAP = timedelta(hours=1)
+
+# Errors that mean the API key is out of requests for now
+QUOTA_ERRORS = {"rateLimited", "maximumResultsReached", "apiKeyExhausted"}
+
+# Stops after which everything newer than the watermark has been fetched; after
+# any other stop (budget, page limit, an error) older pages were never read
+COMPLETE_STOPS = {"exhausted", "watermark", "known_articles"}
+
+
+class FetchQuery:
+    """One NewsAPI query the planner can page through"""
+
+    def __init__(self, key: str, endpoint: str, params: Dict):
+        self.key = key
+        self.endpoint = endpoint
+        self.params = params
+
+    @property
+    def supports_from(self) -> bool:
+        return self.endpoint == "everything"
+
+
+DEFAULT_QUERIES = [
+    FetchQuery(f"top-headlines:{category}", "top-headlines", {"country": "us", "category": category})
+    for category in HEADLINE_CATEGORIES
+] + [
+    FetchQuery(f"everything:{query}", "everything", {"q": query, "sortBy": "publishedAt", "language": "en"})
+    for query in TRENDING_QUERIES
+]
+
+
+def _parse_published_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite hands back naive datetimes; treat them as UTC"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+class FetchPlanner:
+    """Decides which NewsAPI queries to run and how deep to page each one.
+
+    Queries are ordered by their recent yield (new articles per call) with a
+    bonus for queries that haven't run in a while. Each query pages newest
+    first until results reach its publishedAt watermark or are mostly already
+    stored, and "everything" queries only ask for articles since the watermark.
+    Calls are capped per refresh and by the remaining daily quota.
+
+    run() records calls and yields straight away, but returns the watermark
+    moves instead of applying them: the caller applies them with
+    advance_watermarks() once the fetched articles are saved, so a failed
+    refresh fetches the same window again next time.
+    """
+
+    def __init__(self, news_service, queries: Optional[List[FetchQuery]] = None):
+        self.news_service = news_service
+        self.queries = queries or DEFAULT_QUERIES
+        self.daily_quota = int(os.getenv("NEWSAPI_DAILY_QUOTA", 100))
+        self.calls_per_refresh = int(os.getenv("NEWSAPI_CALLS_PER_REFRESH", 20))
+        self.max_pages = int(os.getenv("NEWSAPI_MAX_PAGES", 3))
+        self.page_size = int(os.getenv("NEWSAPI_PAGE_SIZE", 100))
+        self.known_fraction_to_stop = float(os.getenv("NEWSAPI_KNOWN_FRACTION_TO_STOP", 0.5))
+        self.yield_smoothing = 0.3
+        self._usage_row: Optional[NewsAPIUsage] = None
+
+    def _usage(self, db: Session) -> NewsAPIUsage:
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        # Sessions don't autoflush, so keep the pending row rather than adding a second one
+        if self._usage_row is not None and self._usage_row.day == today:
+            return self._usage_row
+        usage = db.query(NewsAPIUsage).filter(NewsAPIUsage.day == today).first()
+        if usage is None:
+            usage = NewsAPIUsage(day=today, calls=0)
+            db.add(usage)
+        self._usage_row = usage
+        return usage
+
+    def remaining_quota(self, db: Session) -> int:
+        """API calls left today"""
+        return max(0, self.daily_quota - (self._usage(db).calls or 0))
+
+    def _watermarks(self, db: Session) -> Dict[str, FetchWatermark]:
+        watermarks = {w.query_key: w for w in db.query(FetchWatermark).all()}
+        for query in self.queries:
+            if query.key not in watermarks:
+                watermark = FetchWatermark(query_key=query.key, yield_per_call=float(self.page_size), total_calls=0, total_new_articles=0)
+                db.add(watermark)
+                watermarks[query.key] = watermark
+        return watermarks
+
+    def prioritize(self, watermarks: Dict[str, FetchWatermark]) -> List[FetchQuery]:
+        """Order queries by expected new articles per call"""
+        now = datetime.now(timezone.utc)
+
+        def priority(query: FetchQuery) -> float:
+            watermark = watermarks[query.key]
+            if watermark.last_run_at is None:
+                return float("inf")
+            hours_idle = (now - _as_utc(watermark.last_run_at)).total_seconds() / 3600
+            # Low-yield queries still come around once they've been idle long enough
+            return (watermark.yield_per_call or 0.0) + hours_idle
+
+        return sorted(self.queries, key=priority, reverse=True)
+
+    def run(self, db: Session, deduplicator) -> Tuple[List[Dict], Dict, Dict[str, datetime]]:
+        """Fetch according to the plan; returns raw NewsAPI articles, a summary and the pending watermark moves"""
+        usage = self._usage(db)
+        watermarks = self._watermarks(db)
+        budget = min(self.calls_per_refresh, self.remaining_quota(db))
+        calls = 0
+        quota_exhausted = False
+        articles: List[Dict] = []
+        query_summaries = []
+        watermark_updates: Dict[str, datetime] = {}
+
+        for query in self.prioritize(watermarks):
+            if calls >= budget or quota_exhausted:
+                break
+
+            watermark = watermarks[query.key]
+            high_water = _as_utc(watermark.last_published_at)
+            params = dict(query.params, pageSize=self.page_size)
+            if query.supports_from and high_water:
+                params["from"] = (high_water - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
+
+            query_calls = 0
+            query_new = 0
+            newest = high_water
+            stop_reason = "max_pages"
+
+            for page in range(1, self.max_pages + 1):
+                if calls >= budget:
+                    stop_reason = "budget"
+                    break
+
+                result = self.news_service.fetch_page(query.endpoint, dict(params, page=page))
+                calls += 1
+                query_calls += 1
+                usage.calls = (usage.calls or 0) + 1
+
+                if result["error"]:
+                    stop_reason = result["error"]
+                    quota_exhausted = result["error"] in QUOTA_ERRORS
+                    break
+
+                page_articles = result["articles"]
+                known = 0
+                reached_watermark = False
+                for article in page_articles:
+                    published_at = _parse_published_at(article.get("publishedAt"))
+                    if published_at and (newest is None or published_at > newest):
+                        newest = published_at
+                    if high_water and published_at and published_at <= high_water - WATERMARK_OVERLAP:
+                        reached_watermark = True
+                    if deduplicator.duplicate_reason(article.get("url") or "", article.get("title") or ""):
+                        known += 1
+                    else:
+                        query_new += 1
+                articles.extend(page_articles)
+
+                if not page_articles or len(page_articles) < self.page_size or page * self.page_size >= result["total_results"]:
+                    stop_reason = "exhausted"
+                    break
+                if reached_watermark:
+                    stop_reason = "watermark"
+                    break
+                if known >= len(page_articles) * self.known_fraction_to_stop:
+                    stop_reason = "known_articles"
+                    break
+
+            if query_calls:
+                if stop_reason in COMPLETE_STOPS and newest is not None and newest != high_water:
+                    watermark_updates[query.key] = newest
+                watermark.last_run_at = datetime.now(timezone.utc)
+                watermark.total_calls = (watermark.total_calls or 0) + query_calls
+                watermark.total_new_articles = (watermark.total_new_articles or 0) + query_new
+                observed_yield = query_new / query_calls
+                watermark.yield_per_call = (
+                    self.yield_smoothing * observed_yield
+                    + (1 - self.yield_smoothing) * (watermark.yield_per_call or 0.0)
+                )
+                query_summaries.append({
+                    "query": query.key,
+                    "calls": query_calls,
+                    "new_articles": query_new,
+                    "stopped": stop_reason
+                })
+
+        db.commit()
+        return articles, {
+            "api_calls": calls,
+            "quota_remaining": self.remaining_quota(db),
+            "quota_exhausted": quota_exhausted,
+            "queries": query_summaries
+        }, watermark_updates
+
+    def advance_watermarks(self, db: Session, updates: Dict[str, datetime]):
+        """Move query watermarks as returned by run(), once its articles are stored"""
+        if not updates:
+            return
+        for watermark in db.query(FetchWatermark).filter(FetchWatermark.query_key.in_(list(updates))).all():
+            watermark.last_published_at = updates[watermark.query_key]
+        db.commit()
@@ -0,0 +1,225 @@
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying; 429 is throttling and always honors Retry-After
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when a host's circuit breaker is open and the request is not attempted"""
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after consecutive failures, probes again after a cool-down.
+
+    Once the cool-down is over the breaker is half-open: a single request is
+    let through as a probe and the others are rejected until the probe
+    reports success (closing the breaker) or failure (re-opening it).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> Tuple[bool, bool]:
+        """Whether a request may go out, and whether it is the half-open probe.
+
+        Closed breakers let requests through, half-open ones only a single
+        probe, open ones none. Only the caller that was admitted as the probe
+        may release it.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True, False
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True, True
+            return False, False
+
+    def release_probe(self):
+        """End a probe that finished without a verdict (e.g. throttled), so another may be sent"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.probing = False
+            self.failures += 1
+            # A failed half-open probe re-opens the breaker for another cool-down
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class ErrorAccounting:
+    """Thread-safe counters of request outcomes per host"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, host: str, outcome: str):
+        with self._lock:
+            self._counts[host][outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(outcomes) for host, outcomes in self._counts.items()}
+
+    def since(self, snapshot: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        """Counts accumulated after an earlier snapshot, omitting hosts with no activity"""
+        delta = {}
+        for host, outcomes in self.snapshot().items():
+            previous = snapshot.get(host, {})
+            changed = {
+                outcome: count - previous.get(outcome, 0)
+                for outcome, count in outcomes.items()
+                if count - previous.get(outcome, 0)
+            }
+            if changed:
+                delta[host] = changed
+        return delta
+
+
+class ResilientHTTPClient:
+    """Connection-pooled HTTP client with timeouts, retries and per-host circuit breakers.
+
+    Retries use exponential backoff with full jitter and honor Retry-After on
+    429/503 responses. Every request outcome is counted in `stats` so callers
+    can report what went wrong during a batch of requests.
+    """
+
+    def __init__(self, connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 pool_size: int = 20, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+        self.read_timeout = read_timeout if read_timeout is not None else float(os.getenv("HTTP_READ_TIMEOUT", 15))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("HTTP_MAX_RETRIES", 3))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.stats = ErrorAccounting()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self._sleep = time.sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            timeout: Optional[tuple] = None) -> requests.Response:
+        """GET with retries; returns the final response or raises requests.RequestException"""
+        host = urlsplit(url).hostname or ""
+        breaker = self.breaker(host)
+        allowed, probe = breaker.allow_request()
+        if not allowed:
+            self.stats.record(host, "circuit_open")
+            raise CircuitOpenError(f"Circuit open for {host}")
+        try:
+            return self._get(url, params, headers, timeout, host, breaker)
+        finally:
+            if probe:
+                breaker.release_probe()
+
+    def _get(self, url: str, params: Optional[Dict], headers: Optional[Dict], timeout: Optional[tuple],
+             host: str, breaker: CircuitBreaker) -> requests.Response:
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                outcome = "timeout" if isinstance(e, requests.Timeout) else "connection_error"
+                self.stats.record(host, outcome)
+                breaker.record_failure()
+                if last_attempt or breaker.state == "open":
+                    raise
+                self.stats.record(host, "retry")
+                self._sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                self.stats.record(host, f"http_{response.status_code}")
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                if last_attempt or breaker.state == "open":
+                    return response
+                delay = self._retry_after(response)
+                self.stats.record(host, "retry")
+                self._sleep(min(self.backoff_max, delay) if delay is not None else self._backoff(attempt))
+                continue
+
+            if response.status_code >= 400:
+                self.stats.record(host, f"http_{response.status_code}")
+            else:
+                self.stats.record(host, "ok")
+            breaker.record_success()
+            return response
+
+
+_default_client: Optional[ResilientHTTPClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> ResilientHTTPClient:
+    """Return the process-wide client shared by NewsService and ContentFetcher"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ResilientHTTPClient()
+        return _default_client
@@ -0,0 +1,418 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import ReadingHistory, ArticleFeedback
+from services.artifacts import ArtifactStore, get_artifact_store
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive datetimes; treat them as UTC"""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class ItemSimilarityModel:
+    """Item-item collaborative filtering over co-read counts.
+
+    Every read and every liked article is an interaction. C = BᵀB of the binary
+    user x article interaction matrix counts how many users touched both
+    articles; it is cosine-normalised by the per-article counts and pruned to
+    the top-k neighbours of each article. Recommending for a user sums the
+    neighbour rows of their recent interactions, so the cost depends on the
+    length of their history, not on the number of users.
+
+    Refreshes are incremental: only users with interactions newer than the
+    last seen row ids contribute a delta (BᵀB - AᵀA over those users' old and
+    new item sets), and only the rows whose similarities that changes are
+    re-pruned. Rows created within ITEM_SIM_CATCH_UP_MARGIN_SECONDS of the
+    newest seen are read again, since transactions can commit out of id
+    order; folding in an interaction twice changes nothing. A full rebuild
+    on a longer schedule drops interactions that fell out of the window.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        top_k: Optional[int] = None,
+        window_days: Optional[int] = None,
+        history_size: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+        rebuild_seconds: Optional[float] = None,
+        catch_up_margin_seconds: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.top_k = top_k or int(os.getenv("ITEM_SIM_TOP_K", 50))
+        self.window_days = window_days or int(os.getenv("ITEM_SIM_WINDOW_DAYS", 90))
+        self.history_size = history_size or int(os.getenv("ITEM_SIM_HISTORY_SIZE", 50))
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(os.getenv("ITEM_SIM_REFRESH_SECONDS", 300))
+        self.rebuild_seconds = rebuild_seconds if rebuild_seconds is not None else float(os.getenv("ITEM_SIM_REBUILD_SECONDS", 86400))
+        self.catch_up_margin_seconds = catch_up_margin_seconds if catch_up_margin_seconds is not None else float(os.getenv("ITEM_SIM_CATCH_UP_MARGIN_SECONDS", 300))
+
+        self.user_items: Dict[int, Set[int]] = {}
+        self.article_index: Dict[int, int] = {}  # article id -> row/column
+        self.article_ids: List[int] = []  # row/column -> article id
+        self.cooccurrence = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.item_counts = np.zeros(0, dtype=np.float32)
+        self.neighbours = sp.csr_matrix((0, 0), dtype=np.float32)
+
+        self._last_reading_id = 0
+        self._last_feedback_id = 0
+        self._newest_at: Optional[datetime] = None  # created_at of the newest interaction seen
+        self._built_at: Optional[float] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_refresh_ms: Optional[float] = None
+
+    # Building
+
+    def _interactions(self, db: Session, after_reading_id: int = 0, after_feedback_id: int = 0,
+                      since: Optional[datetime] = None) -> Tuple[List[Tuple[int, int]], int, int, Optional[datetime]]:
+        """(user_id, article_id) pairs within the window, the highest row ids and the newest created_at seen.
+
+        Rows past the given ids are read, plus, with `since`, any created at or after it.
+        """
+        cutoff = datetime.now() - timedelta(days=self.window_days)
+        reading_filter = ReadingHistory.id > after_reading_id
+        feedback_filter = ArticleFeedback.id > after_feedback_id
+        if since is not None:
+            reading_filter = or_(reading_filter, ReadingHistory.created_at >= since)
+            feedback_filter = or_(feedback_filter, ArticleFeedback.created_at >= since)
+        reads = db.query(ReadingHistory.id, ReadingHistory.user_id, ReadingHistory.article_id, ReadingHistory.created_at).filter(
+            reading_filter,
+            ReadingHistory.created_at >= cutoff
+        ).all()
+        likes = db.query(ArticleFeedback.id, ArticleFeedback.user_id, ArticleFeedback.article_id, ArticleFeedback.created_at).filter(
+            feedback_filter,
+            ArticleFeedback.liked == True,
+            ArticleFeedback.created_at >= cutoff
+        ).all()
+        pairs = [(user_id, article_id) for _, user_id, article_id, _ in reads + likes
+                 if user_id is not None and article_id is not None]
+        last_reading_id = max([row[0] for row in reads], default=after_reading_id)
+        last_feedback_id = max([row[0] for row in likes], default=after_feedback_id)
+        newest_at = max([_as_utc(row[3]) for row in reads + likes if row[3] is not None], default=None)
+        return pairs, last_reading_id, last_feedback_id, newest_at
+
+    def _catch_up_since(self) -> Optional[datetime]:
+        if self._newest_at is None:
+            return None
+        return self._newest_at - timedelta(seconds=self.catch_up_margin_seconds)
+
+    def _columns(self, article_ids: Set[int]) -> np.ndarray:
+        for article_id in article_ids:
+            if article_id not in self.article_index:
+                self.article_index[article_id] = len(self.article_ids)
+                self.article_ids.append(article_id)
+        return np.fromiter((self.article_index[a] for a in article_ids), dtype=np.int64, count=len(article_ids))
+
+    def _interaction_matrix(self, item_sets: List[Set[int]]) -> sp.csr_matrix:
+        rows, cols = [], []
+        for row, items in enumerate(item_sets):
+            columns = self._columns(items)
+            rows.append(np.full(len(columns), row, dtype=np.int64))
+            cols.append(columns)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        data = np.ones(len(rows), dtype=np.float32)
+        return sp.csr_matrix((data, (rows, cols)), shape=(len(item_sets), len(self.article_ids)))
+
+    def rebuild(self, db: Session):
+        """Recompute the model from every interaction in the window"""
+        start = time.perf_counter()
+        pairs, last_reading_id, last_feedback_id, newest_at = self._interactions(db)
+        user_items: Dict[int, Set[int]] = {}
+        for user_id, article_id in pairs:
+            user_items.setdefault(user_id, set()).add(article_id)
+
+        with self._lock:
+            self.user_items = user_items
+            self.article_index, self.article_ids = {}, []
+            interactions = self._interaction_matrix(list(user_items.values()))
+            cooccurrence = (interactions.T @ interactions).tocsr()
+            self.item_counts = cooccurrence.diagonal().astype(np.float32)
+            cooccurrence.setdiag(0)
+            cooccurrence.eliminate_zeros()
+            self.cooccurrence = cooccurrence
+            self._last_reading_id, self._last_feedback_id = last_reading_id, last_feedback_id
+            self._newest_at = newest_at
+            self._normalize()
+            self._built_at = self._refreshed_at = time.time()
+        self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"🔗 Item similarity rebuilt: {len(self.article_ids)} articles, {len(user_items)} users")
+
+    def update(self, db: Session) -> int:
+        """Fold interactions newer than the last refresh into the model; returns users updated"""
+        if self._built_at is None:
+            self.rebuild(db)
+            return len(self.user_items)
+
+        start = time.perf_counter()
+        with self._lock:
+            pairs, last_reading_id, last_feedback_id, newest_at = self._interactions(
+                db, self._last_reading_id, self._last_feedback_id, self._catch_up_since()
+            )
+            added: Dict[int, Set[int]] = {}
+            for user_id, article_id in pairs:
+                if article_id not in self.user_items.get(user_id, ()):
+                    added.setdefault(user_id, set()).add(article_id)
+
+            if added:
+                users = list(added)
+                old_sets = [self.user_items.get(user_id, set()) for user_id in users]
+                new_sets = [old | added[user_id] for user_id, old in zip(users, old_sets)]
+                after = self._interaction_matrix(new_sets)
+                before = self._interaction_matrix(old_sets)
+                size = len(self.article_ids)
+                delta = (after.T @ after - before.T @ before).tocsr()
+
+                self.item_counts = np.concatenate([
+                    self.item_counts, np.zeros(size - len(self.item_counts), dtype=np.float32)
+                ]) + delta.diagonal()
+                delta.setdiag(0)
+                self.cooccurrence.resize((size, size))
+                self.cooccurrence = (self.cooccurrence + delta).tocsr()
+                self.cooccurrence.eliminate_zeros()
+                for user_id, items in zip(users, new_sets):
+                    self.user_items[user_id] = items
+                # Counts change for the articles of these users' item sets, and with the
+                # new articles' norms every similarity to them (co-occurrence is symmetric)
+                touched = np.unique(np.concatenate([self._columns(items) for items in new_sets]))
+                counted = np.unique(np.concatenate([self._columns(items) for items in added.values()]))
+                self._normalize(np.union1d(touched, self.cooccurrence[counted].indices))
+
+            self._last_reading_id, self._last_feedback_id = last_reading_id, last_feedback_id
+            if newest_at is not None and (self._newest_at is None or newest_at > self._newest_at):
+                self._newest_at = newest_at
+            self._refreshed_at = time.time()
+        self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 1)
+        return len(added)
+
+    def _normalize(self, rows: Optional[np.ndarray] = None):
+        """Cosine-normalise the co-occurrence counts and keep the top-k neighbours per article.
+
+        With `rows`, only those rows are recomputed and the others are kept.
+        """
+        size = self.cooccurrence.shape[0]
+        inverse_norms = np.zeros_like(self.item_counts)
+        nonzero = self.item_counts > 0
+        inverse_norms[nonzero] = 1.0 / np.sqrt(self.item_counts[nonzero])
+        selected = np.arange(size) if rows is None else np.asarray(rows, dtype=np.int64)
+        similarity = (sp.diags(inverse_norms[selected]) @ self.cooccurrence[selected] @ sp.diags(inverse_norms)).tocsr()
+
+        indptr = [0]
+        indices, data = [], []
+        for row in range(similarity.shape[0]):
+            start, end = similarity.indptr[row], similarity.indptr[row + 1]
+            row_indices, row_data = similarity.indices[start:end], similarity.data[start:end]
+            if len(row_data) > self.top_k:
+                keep = np.argpartition(row_data, -self.top_k)[-self.top_k:]
+                row_indices, row_data = row_indices[keep], row_data[keep]
+            indices.append(row_indices)
+            data.append(row_data)
+            indptr.append(indptr[-1] + len(row_data))
+        pruned = sp.csr_matrix(
+            (
+                np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+                np.array(indptr)
+            ),
+            shape=similarity.shape
+        )
+        if rows is None:
+            self.neighbours = pruned
+            return
+
+        # Keep the other rows and place the recomputed ones at their positions
+        previous = self.neighbours.copy()
+        previous.resize((size, size))
+        keep = np.ones(size, dtype=np.float32)
+        keep[selected] = 0
+        placement = sp.csr_matrix(
+            (np.ones(len(selected), dtype=np.float32), (selected, np.arange(len(selected)))),
+            shape=(size, len(selected))
+        )
+        self.neighbours = (sp.diags(keep) @ previous + placement @ pruned).tocsr()
+
+    def refresh(self, db: Session):
+        """Incremental update, or a full rebuild once the rebuild interval has passed"""
+        if self._built_at is None or time.time() - self._built_at >= self.rebuild_seconds:
+            self.rebuild(db)
+        else:
+            self.update(db)
+
+    # Scheduling
+
+    def start(self):
+        if self._worker and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="item-similarity", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                self.refresh(db)
+            except Exception as e:
+                print(f"Error refreshing item similarity: {e}")
+            finally:
+                db.close()
+            self._stop.wait(self.refresh_seconds)
+
+    # Serving
+
+    def recent_items(self, db: Session, user_id: int) -> List[int]:
+        """The user's latest reads and likes, most recent first"""
+        reads = db.query(ReadingHistory.article_id).filter(
+            ReadingHistory.user_id == user_id
+        ).order_by(ReadingHistory.created_at.desc()).limit(self.history_size).all()
+        likes = db.query(ArticleFeedback.article_id).filter(
+            ArticleFeedback.user_id == user_id,
+            ArticleFeedback.liked == True
+        ).order_by(ArticleFeedback.created_at.desc()).limit(self.history_size).all()
+        return list(dict.fromkeys(row[0] for row in likes + reads if row[0] is not None))
+
+    def _history_scores(self, db: Session, history: List[int]) -> Tuple[Optional[np.ndarray], List[int]]:
+        """Mean neighbour similarity of every article to the history, and the column -> article id map"""
+        if self._built_at is None:
+            with self._lock:
+                if self._built_at is None:
+                    self.rebuild(db)
+        with self._lock:
+            rows = [self.article_index[a] for a in history if a in self.article_index]
+            if not rows:
+                return None, self.article_ids
+            return np.asarray(self.neighbours[rows].sum(axis=0)).ravel() / len(rows), self.article_ids
+
+    def recommend(self, db: Session, user_id: int, limit: int = 20, exclude: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """(article_id, score) pairs for a user, best first; scores are mean cosine similarity to their history"""
+        history = self.recent_items(db, user_id)
+        seen = set(history) | (exclude or set())
+        scores, article_ids = self._history_scores(db, history)
+        if scores is None:
+            return []
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit + len(seen):
+            candidates = candidates[np.argpartition(scores[candidates], -(limit + len(seen)))[-(limit + len(seen)):]]
+        ranked = sorted(candidates, key=lambda i: scores[i], reverse=True)
+        return [(int(article_ids[i]), float(scores[i])) for i in ranked if article_ids[i] not in seen][:limit]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The neighbour matrix for publishing as an artifact, rows and columns sorted by article id"""
+        with self._lock:
+            ids = np.asarray(self.article_ids, dtype=np.int64)
+            order = np.argsort(ids)
+            neighbours = self.neighbours[order][:, order].tocsr()
+            neighbours.sort_indices()
+            return {
+                "item_sim.article_ids": ids[order].astype(np.int32),
+                "item_sim.data": neighbours.data.astype(np.float32),
+                "item_sim.indices": neighbours.indices.astype(np.int32),
+                "item_sim.indptr": neighbours.indptr.astype(np.int32),
+            }
+
+    def stats(self) -> Dict:
+        return {
+            "articles": len(self.article_ids),
+            "users": len(self.user_items),
+            "cooccurrence_nnz": int(self.cooccurrence.nnz),
+            "neighbour_nnz": int(self.neighbours.nnz),
+            "top_k": self.top_k,
+            "built_at": datetime.fromtimestamp(self._built_at).isoformat() if self._built_at else None,
+            "refreshed_at": datetime.fromtimestamp(self._refreshed_at).isoformat() if self._refreshed_at else None,
+            "last_refresh_ms": self.last_refresh_ms,
+            "worker_running": bool(self._worker and self._worker.is_alive())
+        }
+
+
+class MappedItemSimilarity(ItemSimilarityModel):
+    """Item-item model served from the published artifact instead of built in-process.
+
+    The neighbour matrix and its sorted article ids stay memory-mapped and
+    read-only, and ids are looked up by binary search instead of a dict, so a
+    worker's memory does not grow with the corpus. A newly published version
+    is picked up on the next request; building is left to build_artifacts.py.
+    """
+
+    def __init__(self, store: ArtifactStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self._version: Optional[str] = None
+        self._mapped: Optional[Tuple[np.ndarray, sp.csr_matrix]] = None
+
+    def _matrix(self) -> Optional[Tuple[np.ndarray, sp.csr_matrix]]:
+        artifact = self.store.latest()
+        if artifact is None or "item_sim.indptr" not in artifact:
+            return None
+        if artifact.version != self._version:
+            article_ids = artifact["item_sim.article_ids"]
+            size = len(article_ids)
+            # Matching index dtypes keep scipy from copying the mapped arrays
+            matrix = sp.csr_matrix(
+                (artifact["item_sim.data"], artifact["item_sim.indices"], artifact["item_sim.indptr"]),
+                shape=(size, size), copy=False
+            )
+            self._mapped, self._version = (article_ids, matrix), artifact.version
+        return self._mapped
+
+    def _history_scores(self, db: Session, history: List[int]) -> Tuple[Optional[np.ndarray], List[int]]:
+        mapped = self._matrix()
+        if mapped is None or not history:
+            return None, []
+        article_ids, matrix = mapped
+        wanted = np.asarray(history, dtype=np.int64)
+        positions = np.searchsorted(article_ids, wanted)
+        found = positions < len(article_ids)
+        found[found] = article_ids[positions[found]] == wanted[found]
+        rows = positions[found]
+        if not len(rows):
+            return None, article_ids
+        return np.asarray(matrix[rows].sum(axis=0)).ravel() / len(rows), article_ids
+
+    def rebuild(self, db: Session):
+        raise RuntimeError("The mapped item similarity model is read-only; run build_artifacts.py")
+
+    def start(self):
+        pass
+
+    def stop(self, timeout: float = 5.0):
+        pass
+
+    def stats(self) -> Dict:
+        mapped = self._matrix()
+        return {
+            "source": "artifact",
+            "version": self._version,
+            "articles": len(mapped[0]) if mapped else 0,
+            "neighbour_nnz": int(mapped[1].nnz) if mapped else 0,
+        }
+
+
+_default_model: Optional[ItemSimilarityModel] = None
+_default_model_lock = threading.Lock()
+
+
+def get_item_similarity_model() -> ItemSimilarityModel:
+    """Return the process-wide item similarity model (artifact-backed when ARTIFACT_DIR is set)"""
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            store = get_artifact_store()
+            _default_model = MappedItemSimilarity(store) if store else ItemSimilarityModel()
+        return _default_model
@@ -0,0 +1,306 @@
+"""Request metrics in the Prometheus text format, plus an opt-in sampling profiler.
+
+InstrumentationMiddleware times every request by route template and, through
+SQLAlchemy engine events, counts the queries and SQL time each request
+causes. Code paths worth watching (recommendation stages, content downloads,
+article analysis) wrap themselves in timed(component, stage). Everything is
+exposed by render() for the /metrics endpoint.
+
+With PROFILING_ENABLED=1, a request carrying the X-Profile header is sampled
+every PROFILE_INTERVAL_MS and its stacks are written in the folded format
+(flamegraph.pl, speedscope) to PROFILE_DIR; the file name comes back in the
+X-Profile-File response header.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from starlette.routing import Match
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+REQUEST_EXCEPTIONS = registry.counter(
+    "http_request_exceptions_total", "Requests that raised instead of returning a response", ("route", "exception")
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", ("route",)
+)
+DB_QUERIES = registry.counter(
+    "db_queries_total", "SQL statements executed, inside and outside requests", ("context",)
+)
+STAGE_DURATION = registry.histogram(
+    "stage_duration_seconds", "Time spent in instrumented stages", ("component", "stage")
+)
+
+
+class RequestStats:
+    """What one request has cost so far; shared by every task and thread working for it"""
+
+    __slots__ = ("queries", "sql_seconds", "stages")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.stages: Dict[str, float] = {}
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def observe_stage(component: str, stage: str, seconds: float):
+    STAGE_DURATION.observe(seconds, component=component, stage=stage)
+    stats = _current_request.get()
+    if stats is not None:
+        key = f"{component}.{stage}"
+        stats.stages[key] = stats.stages.get(key, 0.0) + seconds
+
+
+@contextmanager
+def timed(component: str, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(component, stage, time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    """Count statements and SQL time of the engine against the current request"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current_request.get()
+        DB_QUERIES.inc(context="request" if stats is not None else "background")
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval and aggregates folded stacks"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> Iterable[str]:
+        return (f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware recording latency, SQL cost and stage times per route template.
+
+    Requests that run more than METRICS_QUERY_WARN_THRESHOLD statements are
+    logged, which is how N+1 query patterns show up before production does.
+    A Server-Timing header gives the same numbers to browser dev tools.
+    """
+
+    def __init__(self, app, query_warn_threshold: Optional[int] = None, profiling_enabled: Optional[bool] = None,
+                 profile_dir: Optional[str] = None, profile_interval_ms: Optional[float] = None):
+        self.app = app
+        self.query_warn_threshold = query_warn_threshold if query_warn_threshold is not None else int(os.getenv("METRICS_QUERY_WARN_THRESHOLD", 100))
+        self.profiling_enabled = profiling_enabled if profiling_enabled is not None else os.getenv("PROFILING_ENABLED", "0") == "1"
+        self.profile_dir = profile_dir or os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "news-ai-profiles"))
+        self.profile_interval = (profile_interval_ms if profile_interval_ms is not None else float(os.getenv("PROFILE_INTERVAL_MS", 5))) / 1000
+
+    def _route(self, scope) -> str:
+        # Label by template (/api/news/{article_id}), never by raw path, to bound cardinality
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", route.name)
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        profiler = profile_file = None
+        if self.profiling_enabled and any(name == b"x-profile" for name, _ in scope["headers"]):
+            # Endpoints run on the event loop thread, so that is the one sampled
+            profiler = SamplingProfiler(threading.get_ident(), self.profile_interval).start()
+            slug = scope["path"].strip("/").replace("/", "_") or "root"
+            profile_file = os.path.join(self.profile_dir, f"{int(time.time() * 1000)}-{slug}.folded")
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                timing = ", ".join(
+                    [f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries"']
+                    + [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stats.stages.items()]
+                    + [f"app;dur={elapsed_ms:.1f}"]
+                )
+                headers = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+                if profile_file:
+                    headers.append((b"x-profile-file", profile_file.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        route = self._route(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            REQUEST_EXCEPTIONS.inc(route=route, exception=type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            REQUEST_DURATION.observe(elapsed, method=scope["method"], route=route, status=status["code"])
+            REQUEST_DB_QUERIES.observe(stats.queries, route=route)
+            REQUEST_DB_SECONDS.observe(stats.sql_seconds, route=route)
+            if stats.queries > self.query_warn_threshold:
+                print(f"⚠️ {scope['method']} {route} ran {stats.queries} queries "
+                      f"({stats.sql_seconds * 1000:.0f} ms of SQL in {elapsed * 1000:.0f} ms)")
+            if profiler is not None:
+                profiler.stop()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                with open(profile_file, "w") as f:
+                    f.write("\n".join(profiler.folded()) + "\n")
+
+
+def render() -> str:
+    return registry.render()
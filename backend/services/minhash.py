@@ -0,0 +1,143 @@
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse everything but letters and digits to single spaces"""
+    if not text:
+        return ""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def char_shingles(text: str, k: int = 5) -> Set[str]:
+    """Character k-shingles of normalized text, suited to short strings like titles"""
+    text = normalize_text(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def word_shingles(text: str, k: int = 3) -> Set[str]:
+    """Word k-shingles of normalized text, suited to longer bodies"""
+    words = normalize_text(text).split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures of token sets.
+
+    Tokens are hashed with CRC32 so signatures are stable across processes and
+    restarts; the permutations are derived from a fixed seed for the same reason.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, (1 << 32) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        """Return the MinHash signature (uint32 array) of a set of tokens"""
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for token in tokens),
+            dtype=np.uint64
+        )
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimate Jaccard similarity from two MinHash signatures"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def band_hashes(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """One 64-bit key per band of each signature row ((n, num_perm) -> (n, bands)).
+
+    Used where buckets live in sorted arrays rather than dicts; different band
+    contents may hash alike, which only adds candidates verified afterwards.
+    """
+    signatures = np.atleast_2d(signatures).astype(np.uint64)
+    banded = signatures.reshape(signatures.shape[0], bands, signatures.shape[1] // bands)
+    keys = np.zeros(banded.shape[:2], dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(banded.shape[2]):
+            keys = keys * np.uint64(0x100000001B3) + banded[:, :, offset]
+    return keys
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing index over MinHash signatures.
+
+    Lookups only touch the buckets of the query's bands, so the cost per query
+    depends on bucket sizes rather than on the number of indexed items.
+    Candidates are verified against the stored signatures before returning.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        """Add a signature to the index under the given key"""
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band][band_key].append(key)
+
+    def remove(self, key: Hashable):
+        """Remove a key from the index if present"""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def query(self, signature: np.ndarray, threshold: float = 0.0, max_per_bucket: Optional[int] = None) -> List[tuple]:
+        """Return (key, estimated_jaccard) pairs at or above the threshold, best first.
+
+        max_per_bucket bounds the work for loose indexes whose buckets grow with
+        the corpus: only the most recently inserted keys of each bucket are checked.
+        """
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                candidates.update(bucket[-max_per_bucket:] if max_per_bucket else bucket)
+        if not candidates:
+            return []
+
+        keys = list(candidates)
+        stacked = np.stack([self._signatures[key] for key in keys])
+        similarities = np.count_nonzero(stacked == signature, axis=1) / len(signature)
+        matches = [(keys[i], float(similarities[i])) for i in np.flatnonzero(similarities >= threshold)]
+        matches.sort(key=lambda x: x[1], reverse=True)
+        return matches
@@ -1,75 +1,102 @@
 import requests
 import os
-from typing import List, Dict, Optional
+from urllib.parse import urlsplit
+from typing import Callable, List, Dict, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from models import Article
 from services.ai_service import AIService
 from services.content_fetcher import ContentFetcher
+from services.dedup import ArticleDeduplicator
+from services.story_clustering import StoryClusterer
+from services.http_client import get_http_client
+from services.fetch_planner import FetchPlanner
+from services.events import event_bus, ARTICLES_INGESTED
+from services.nlp_pool import get_nlp_pool
+from sqlalchemy import exists, or_
+from sqlalchemy.engine import Row
 import json
 
+# Columns served by list endpoints. Listing queries select only these and
+# return lightweight rows (attribute access like Article) so the large
+# `content` column is read only for the article detail endpoint.
+LISTING_COLUMNS = (
+    Article.id,
+    Article.title,
+    Article.description,
+    Article.url,
+    Article.image_url,
+    Article.source_name,
+    Article.author,
+    Article.published_at,
+    Article.category,
+    Article.tags,
+    Article.sentiment_score,
+    Article.reading_time,
+    Article.story_cluster_id
+)
+
 class NewsService:
     def __init__(self):
         self.api_key = os.getenv("NEWS_API_KEY", "6ed6af63cc174b03a5ee8eb8dfad6ca2")
-        self.base_url = "https://newsapi.org/v2"
+        self.base_url = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2")
+        self.http = get_http_client()
         self.ai_service = AIService()
-        self.content_fetcher = ContentFetcher()
+        self.content_fetcher = ContentFetcher(http_client=self.http)
+        self.story_clusterer = StoryClusterer()
         
-    def fetch_top_headlines(self, country: str = "us", category: Optional[str] = None, page_size: int = 100) -> List[Dict]:
-        """Fetch top headlines from NewsAPI"""
-        url = f"{self.base_url}/top-headlines"
-        params = {
-            "apiKey": self.api_key,
-            "country": country,
-            "pageSize": page_size
-        }
+    def fetch_page(self, endpoint: str, params: Dict) -> Dict:
+        """Request one page from a NewsAPI endpoint.
+        
+        Returns the articles, the total result count and the NewsAPI error code
+        (None on success) so callers can tell an empty page from a refused one.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(params, apiKey=self.api_key)
         
-        if category:
-            params["category"] = category
-            
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self.http.get(url, params=params)
             data = response.json()
             
-            if data["status"] == "ok":
-                return data["articles"]
+            if data.get("status") == "ok":
+                return {"articles": data["articles"], "total_results": data.get("totalResults", 0), "error": None}
             else:
+                error = data.get("code", "error")
+                self.http.stats.record(urlsplit(url).hostname or "", f"api_{error}")
                 print(f"NewsAPI error: {data.get('message', 'Unknown error')}")
-                return []
+                return {"articles": [], "total_results": 0, "error": error}
                 
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             print(f"Error fetching news: {e}")
-            return []
+            return {"articles": [], "total_results": 0, "error": "request_failed"}
     
-    def fetch_everything(self, query: str, from_date: Optional[str] = None, sort_by: str = "publishedAt", page_size: int = 100) -> List[Dict]:
+    def fetch_top_headlines(self, country: str = "us", category: Optional[str] = None, page_size: int = 100, page: int = 1) -> List[Dict]:
+        """Fetch top headlines from NewsAPI"""
+        params = {
+            "country": country,
+            "pageSize": page_size,
+            "page": page
+        }
+        
+        if category:
+            params["category"] = category
+            
+        return self.fetch_page("top-headlines", params)["articles"]
+    
+    def fetch_everything(self, query: str, from_date: Optional[str] = None, sort_by: str = "publishedAt", page_size: int = 100, page: int = 1) -> List[Dict]:
         """Fetch articles from everything endpoint"""
-        url = f"{self.base_url}/everything"
         params = {
-            "apiKey": self.api_key,
             "q": query,
             "sortBy": sort_by,
             "pageSize": page_size,
+            "page": page,
             "language": "en"
         }
         
         if from_date:
             params["from"] = from_date
             
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data["status"] == "ok":
-                return data["articles"]
-            else:
-                print(f"NewsAPI error: {data.get('message', 'Unknown error')}")
-                return []
-                
-        except requests.RequestException as e:
-            print(f"Error fetching news: {e}")
-            return []
+        return self.fetch_page("everything", params)["articles"]
     
     def fetch_by_category(self, category: str, country: str = "us", page_size: int = 50) -> List[Dict]:
         """Fetch articles by category (case-insensitive)"""
@@ -107,10 +134,11 @@ class NewsService:
             
         return all_articles
     
-    def process_article(self, article_data: Dict) -> Dict:
-        """Process and analyze a single article"""
+    def process_article(self, article_data: Dict, analysis: Optional[Dict] = None) -> Dict:
+        """Process and analyze a single article (pass `analysis` when it was computed in a batch)"""
         # Analyze article with AI
-        analysis = self.ai_service.analyze_article(article_data)
+        if analysis is None:
+            analysis = self.ai_service.analyze_article(article_data)
         
         # Parse published date
         published_at = None
@@ -185,14 +213,21 @@ class NewsService:
                 continue
         
         try:
+            # Flush to get IDs, then group the new articles into story clusters
+            db.flush()
+            joined = self.story_clusterer.assign_clusters(db, saved_articles)
             db.commit()
-            print(f"Saved {len(saved_articles)} new articles to database")
+            print(f"Saved {len(saved_articles)} new articles to database ({joined} joined existing stories)")
         except Exception as e:
             db.rollback()
+            for article in saved_articles:
+                if article.id is not None:
+                    self.story_clusterer.forget(article.id)
             print(f"Error saving articles: {e}")
             # Try to save articles one by one to avoid losing all articles due to one bad one
             saved_articles = []
             for article_data in articles:
+                article = None
                 try:
                     existing_article = db.query(Article).filter(Article.url == article_data["url"]).first()
                     if existing_article:
@@ -214,66 +249,119 @@ class NewsService:
                     )
                     
                     db.add(article)
+                    db.flush()
+                    self.story_clusterer.assign_clusters(db, [article])
                     db.commit()
                     saved_articles.append(article)
                     
                 except Exception as e:
                     db.rollback()
+                    if article is not None and article.id is not None:
+                        self.story_clusterer.forget(article.id)
                     print(f"Failed to save article {article_data.get('title', 'Unknown')}: {e}")
                     continue
-            
+        
+        if saved_articles:
+            event_bus.publish(ARTICLES_INGESTED, article_ids=[article.id for article in saved_articles])
         return saved_articles
     
-    def refresh_news_database(self, db: Session) -> int:
-        """Refresh the news database with latest articles"""
+    def refresh_news_database(self, db: Session) -> Dict:
+        """Refresh the news database with latest articles.
+        
+        Returns a summary with the number of articles added, how many fetched
+        articles were skipped as duplicates, and per-host HTTP error counts.
+        """
         print("🔄 Refreshing news database...")
+        http_stats_before = self.http.stats.snapshot()
         
-        # Fetch articles from different categories
-        categories = ["technology", "business", "science", "health", "entertainment", "sports"]
-        all_articles = []
+        # Page through category and trending queries, most productive first, until
+        # each reaches articles we already have or the API budget runs out
+        deduplicator = ArticleDeduplicator.from_db(db)
+        planner = FetchPlanner(self)
+        all_articles, plan_summary, watermark_updates = planner.run(db, deduplicator)
         
-        for category in categories:
-            print(f"Fetching {category} articles...")
-            articles = self.fetch_by_category(category, page_size=30)
-            all_articles.extend(articles)
+        # Drop articles we already have before paying for content fetches and AI analysis
+        new_articles = []
+        skipped = {"url": 0, "title": 0}
+        for article in all_articles:
+            url = article.get("url")
+            title = article.get("title")
+            if not url or not title:  # Only save articles with title and URL
+                continue
+            reason = deduplicator.duplicate_reason(url, title)
+            if reason:
+                skipped[reason] += 1
+                continue
+            deduplicator.add(url, title)
+            new_articles.append(article)
         
-        # Fetch trending topics
-        print("Fetching trending topics...")
-        trending_articles = self.fetch_trending_topics()
-        all_articles.extend(trending_articles)
+        print(f"Skipping {skipped['url']} known URLs and {skipped['title']} near-duplicate titles "
+              f"({len(new_articles)} of {len(all_articles)} articles are new)")
         
-        # Process articles
+        # Analyze on the NLP worker processes, then fetch content and process
+        analyses = get_nlp_pool().analyze_many(new_articles)
         processed_articles = []
-        for article in all_articles:
-            processed = self.process_article(article)
+        for article, analysis in zip(new_articles, analyses):
+            processed = self.process_article(article, analysis)
             if processed["title"] and processed["url"]:  # Only save articles with title and URL
                 processed_articles.append(processed)
         
         # Save to database
         saved_articles = self.save_articles_to_db(db, processed_articles)
+        # Only now that the articles are stored may the next refresh skip their window
+        planner.advance_watermarks(db, watermark_updates)
         
+        errors = self.http.stats.since(http_stats_before)
         print(f"✅ Database refresh complete. Added {len(saved_articles)} new articles.")
-        return len(saved_articles)
+        return {
+            "articles_added": len(saved_articles),
+            "articles_fetched": len(all_articles),
+            "duplicates_skipped": skipped,
+            "fetch_plan": plan_summary,
+            "http": errors
+        }
     
-    def get_articles_by_category(self, db: Session, category: str, limit: int = 20) -> List[Article]:
+    def get_articles_by_category(self, db: Session, category: str, limit: int = 20, collapse_clusters: bool = True) -> List[Row]:
         """Get articles from database by category (case-insensitive)"""
         # Convert category to lowercase for case-insensitive matching
         category_lower = category.lower() if category else ""
-        return db.query(Article).filter(
+        query = db.query(*LISTING_COLUMNS).filter(
             Article.category.ilike(category_lower)
-        ).order_by(Article.published_at.desc()).limit(limit).all()
+        )
+        if collapse_clusters:
+            # The story may have started in another category; keep its first article in this one
+            query = query.filter(self._cluster_representative(lambda article: article.category.ilike(category_lower)))
+        return query.order_by(Article.published_at.desc()).limit(limit).all()
     
-    def get_latest_articles(self, db: Session, limit: int = 50) -> List[Article]:
+    def get_latest_articles(self, db: Session, limit: int = 50, collapse_clusters: bool = True) -> List[Row]:
         """Get latest articles from database"""
-        return db.query(Article).order_by(
+        query = db.query(*LISTING_COLUMNS)
+        if collapse_clusters:
+            query = query.filter(self._cluster_representative())
+        return query.order_by(
             Article.published_at.desc()
         ).limit(limit).all()
     
-    def search_articles(self, db: Session, query: str, limit: int = 20) -> List[Article]:
+    def _cluster_representative(self, matches: Optional[Callable] = None):
+        """Filter matching one article per story: the one that started the cluster.
+        
+        With `matches` (a function of an Article entity returning a filter), the
+        earliest article of the story among those matching it instead.
+        """
+        if matches is None:
+            return or_(Article.story_cluster_id.is_(None), Article.story_cluster_id == Article.id)
+        earlier = aliased(Article)
+        return or_(Article.story_cluster_id.is_(None), ~exists().where(
+            earlier.story_cluster_id == Article.story_cluster_id,
+            earlier.id < Article.id,
+            matches(earlier)
+        ))
+    
+    def search_articles(self, db: Session, query: str, limit: int = 20) -> List[Row]:
         """Search articles in database (case-insensitive)"""
         # Convert query to lowercase for case-insensitive search
         query_lower = query.lower() if query else ""
-        return db.query(Article).filter(
+        return db.query(*LISTING_COLUMNS).filter(
             Article.title.ilike(f'%{query_lower}%') | 
             Article.description.ilike(f'%{query_lower}%') |
             Article.content.ilike(f'%{query_lower}%')
@@ -283,10 +371,14 @@ class NewsService:
         """Get article by ID"""
         return db.query(Article).filter(Article.id == article_id).first()
     
-    def get_articles_by_source(self, db: Session, source_name: str, limit: int = 20) -> List[Article]:
+    def article_exists(self, db: Session, article_id: int) -> bool:
+        """Check whether an article exists without loading it"""
+        return db.query(Article.id).filter(Article.id == article_id).first() is not None
+    
+    def get_articles_by_source(self, db: Session, source_name: str, limit: int = 20) -> List[Row]:
         """Get articles by source (case-insensitive)"""
         # Convert source name to lowercase for case-insensitive matching
         source_lower = source_name.lower() if source_name else ""
-        return db.query(Article).filter(
+        return db.query(*LISTING_COLUMNS).filter(
             Article.source_name.ilike(source_lower)
-        ).order_by(Article.published_at.desc()).limit(limit).all() 
\ No newline at end of file
+        ).order_by(Article.published_at.desc()).limit(limit).all()
\ No newline at end of file
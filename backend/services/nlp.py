@@ -0,0 +1,157 @@
+"""Text analysis used at ingestion and by /api/ai/analyze-article.
+
+Plain functions with no database or service state, so NLP worker
+processes (services/nlp_pool.py) can import them without the rest of the
+backend. AIService exposes the same operations as methods.
+"""
+
+import hashlib
+import os
+import re
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+from sklearn.feature_extraction.text import TfidfVectorizer
+from textblob import TextBlob
+from services.cache import TTLCache
+
+CATEGORY_KEYWORDS = {
+    "technology": ["tech", "technology", "software", "ai", "artificial intelligence", "machine learning", "programming", "startup", "innovation"],
+    "business": ["business", "economy", "finance", "market", "investment", "stock", "trading", "company", "corporate"],
+    "politics": ["politics", "government", "election", "policy", "democrat", "republican", "congress", "senate", "president"],
+    "sports": ["sports", "football", "basketball", "baseball", "soccer", "tennis", "olympics", "championship", "game"],
+    "entertainment": ["entertainment", "movie", "music", "celebrity", "hollywood", "film", "actor", "actress", "award"],
+    "health": ["health", "medical", "medicine", "disease", "treatment", "hospital", "doctor", "patient", "covid"],
+    "science": ["science", "research", "study", "discovery", "experiment", "laboratory", "scientist", "physics", "chemistry"]
+}
+
+
+def preprocess_text(text: str) -> str:
+    """Clean and preprocess text for analysis"""
+    if not text:
+        return ""
+
+    # Convert to lowercase
+    text = text.lower()
+
+    # Remove special characters and numbers
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+
+    # Remove extra whitespace
+    text = ' '.join(text.split())
+
+    return text
+
+
+def analyze_sentiment(text: str) -> float:
+    """Analyze sentiment of text using TextBlob"""
+    if not text:
+        return 0.0
+
+    blob = TextBlob(text)
+    return blob.sentiment.polarity
+
+
+# Keywords of recently seen texts, keyed by a digest of the text so the cache
+# does not keep the texts themselves alive
+keyword_cache = TTLCache(maxsize=int(os.getenv("KEYWORD_CACHE_SIZE", 20000)))
+
+
+def extract_keywords(text: str, top_n: int = 10) -> List[str]:
+    """Extract top keywords from text using TF-IDF (memoized by content hash)"""
+    if not text:
+        return []
+
+    key = (hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), top_n)
+    keywords = keyword_cache.get(key)
+    if keywords is None:
+        keywords = _extract_keywords(text, top_n)
+        keyword_cache.set(key, tuple(keywords))
+    return list(keywords)
+
+
+def _extract_keywords(text: str, top_n: int) -> List[str]:
+    processed_text = preprocess_text(text)
+    if not processed_text:
+        return []
+
+    # Create TF-IDF vectorizer for single document
+    vectorizer = TfidfVectorizer(
+        max_features=top_n,
+        stop_words='english',
+        ngram_range=(1, 2)
+    )
+
+    try:
+        tfidf_matrix = vectorizer.fit_transform([processed_text])
+        feature_names = vectorizer.get_feature_names_out()
+
+        # Get top keywords
+        tfidf_scores = tfidf_matrix.toarray()[0]
+        keyword_scores = list(zip(feature_names, tfidf_scores))
+        keyword_scores.sort(key=lambda x: x[1], reverse=True)
+
+        return [keyword for keyword, score in keyword_scores if score > 0]
+    except:
+        return []
+
+
+def article_keywords(tags: Optional[List[str]], text: Optional[str], top_n: int = 10) -> List[str]:
+    """Top keywords of a stored article: the tags extracted at ingestion, or from `text` if it has none"""
+    if tags:
+        # Tags are stored best first, as extract_keywords returns them
+        return list(tags[:top_n])
+    return extract_keywords(text, top_n)
+
+
+def calculate_reading_time(text: str) -> int:
+    """Estimate reading time in minutes (average 200 words per minute)"""
+    if not text:
+        return 1
+
+    word_count = len(text.split())
+    return max(1, round(word_count / 200))
+
+
+def categorize_article(keywords: List[str], title: str, description: str) -> str:
+    """Categorize article based on keywords and content"""
+    # Check title and description for category keywords
+    text_to_check = f"{title} {description}".lower()
+
+    for category, keywords_list in CATEGORY_KEYWORDS.items():
+        for keyword in keywords_list:
+            if keyword in text_to_check:
+                return category
+
+    # Default category
+    return "general"
+
+
+def analyze_article(article_data: Dict, stage: Callable = lambda name: nullcontext()) -> Dict:
+    """Sentiment, keywords, reading time and category of an article; stage(name) may time each step"""
+    title = article_data.get("title", "")
+    description = article_data.get("description", "")
+    content = article_data.get("content", "")
+
+    # Combine text for analysis
+    full_text = f"{title} {description} {content}"
+
+    # Analyze sentiment
+    with stage("sentiment"):
+        sentiment_score = analyze_sentiment(full_text)
+
+    # Extract keywords
+    with stage("keywords"):
+        keywords = extract_keywords(full_text, top_n=15)
+
+    # Calculate reading time
+    reading_time = calculate_reading_time(full_text)
+
+    # Determine category based on keywords
+    category = categorize_article(keywords, title, description)
+
+    return {
+        "sentiment_score": sentiment_score,
+        "keywords": keywords,
+        "reading_time": reading_time,
+        "category": category
+    }
@@ -0,0 +1,226 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from services import nlp
+from services.metrics import observe_stage
+
+
+class NLPPoolBusy(Exception):
+    """Raised when too many articles are already waiting for analysis"""
+
+
+def _warm_worker():
+    # Run every model once so lazy loading (TextBlob's lexicon, the stop word
+    # list) happens at start-up rather than in the first request's batch
+    nlp.analyze_article({"title": "Warm up", "description": "Warming up the analysis models", "content": ""})
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _analyze_batch(articles: List[Dict]) -> List[Dict]:
+    return [nlp.analyze_article(article) for article in articles]
+
+
+class NLPWorkerPool:
+    """Runs CPU-heavy article analysis on worker processes, fed by a micro-batcher.
+
+    TextBlob sentiment and the per-document TF-IDF fit hold the GIL, so on a
+    request thread they stall every other request of the process. The pool
+    runs them on NLP_WORKERS processes (spawned, not forked, since the API
+    process has threads; each worker loads the models once when it starts).
+
+    analyze() is the event-loop entry point. Concurrent calls are coalesced:
+    a batch is sent when it reaches NLP_BATCH_SIZE articles or NLP_BATCH_WAIT_MS
+    after its first one, as a single task, so pickling and the round trip
+    are paid per batch. At most NLP_MAX_PENDING articles may be waiting
+    (NLPPoolBusy beyond that) and each caller waits at most
+    NLP_TIMEOUT_SECONDS. analyze_many() is the blocking entry point for
+    ingestion, which has its articles in hand already. NLP_WORKERS=0 keeps
+    all analysis in-process.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        batch_wait_ms: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.workers = workers if workers is not None else int(os.getenv("NLP_WORKERS", os.cpu_count() or 1))
+        self.batch_size = batch_size or int(os.getenv("NLP_BATCH_SIZE", 16))
+        self.batch_wait = (batch_wait_ms if batch_wait_ms is not None else float(os.getenv("NLP_BATCH_WAIT_MS", 5))) / 1000
+        self.max_pending = max_pending or int(os.getenv("NLP_MAX_PENDING", 256))
+        self.timeout = timeout if timeout is not None else float(os.getenv("NLP_TIMEOUT_SECONDS", 30))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        # Batch being filled; only touched from the event loop it belongs to
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch: List[Tuple[Dict, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.articles = 0
+
+    # Worker processes
+
+    def start(self):
+        """Start and warm every worker now instead of on the first request"""
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        started = time.perf_counter()
+        for future in [executor.submit(_worker_pid) for _ in range(self.workers)]:
+            future.result()
+        print(f"🧠 NLP pool ready: {self.workers} workers in {time.perf_counter() - started:.1f}s")
+
+    def stop(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self, replace_broken: bool = False) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is not None and replace_broken and getattr(self._executor, "_broken", False):
+                print("⚠️ NLP worker died; starting a new pool")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(os.getenv("NLP_START_METHOD", "spawn")),
+                    initializer=_warm_worker
+                )
+            return self._executor
+
+    def _submit(self, articles: List[Dict]):
+        try:
+            return self._get_executor().submit(_analyze_batch, articles)
+        except BrokenProcessPool:
+            return self._get_executor(replace_broken=True).submit(_analyze_batch, articles)
+
+    # Event-loop front end
+
+    def _reserve(self, count: int = 1):
+        with self._pending_lock:
+            if self._pending + count > self.max_pending:
+                raise NLPPoolBusy("Too many articles waiting for analysis")
+            self._pending += count
+
+    def _release(self, count: int = 1):
+        with self._pending_lock:
+            self._pending -= count
+
+    async def analyze(self, article_data: Dict) -> Dict:
+        """Analysis of one article, batched with whatever else arrives within the batch window"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(nlp.analyze_article, article_data)
+
+        self._reserve()
+        try:
+            loop = asyncio.get_running_loop()
+            if loop is not self._loop:
+                # A new event loop (tests create one per client); the old batch died with its loop
+                self._loop, self._batch, self._flush_handle = loop, [], None
+            future = loop.create_future()
+            self._batch.append((article_data, future))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_wait, self._flush)
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._release()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        batch = [(article, future) for article, future in batch if not future.done()]
+        if not batch:
+            return
+
+        submitted = time.perf_counter()
+        self.batches += 1
+        self.articles += len(batch)
+        try:
+            done = asyncio.wrap_future(self._submit([article for article, _ in batch]), loop=self._loop)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        def deliver(done: asyncio.Future):
+            observe_stage("nlp_pool", "batch", time.perf_counter() - submitted)
+            error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+            for i, (_, future) in enumerate(batch):
+                # Callers that timed out have cancelled their future already
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[i])
+
+        done.add_done_callback(deliver)
+
+    # Blocking front end
+
+    def analyze_many(self, articles: List[Dict]) -> List[Dict]:
+        """Analyses of many articles, in order, spread over the workers in batches"""
+        if not articles:
+            return []
+        if self.workers <= 0:
+            return [nlp.analyze_article(article) for article in articles]
+
+        # Enough batches to keep every worker busy, none bigger than batch_size
+        size = max(1, min(self.batch_size, -(-len(articles) // self.workers)))
+        batches = [articles[i:i + size] for i in range(0, len(articles), size)]
+        started = time.perf_counter()
+        try:
+            futures = [self._submit(batch) for batch in batches]
+            results = [result for future in futures for result in future.result(timeout=self.timeout)]
+        except Exception as e:
+            # Ingestion must not lose articles because the pool failed
+            print(f"⚠️ NLP pool failed ({e!r}); analyzing {len(articles)} articles in-process")
+            return [nlp.analyze_article(article) for article in articles]
+        observe_stage("nlp_pool", "analyze_many", time.perf_counter() - started)
+        self.batches += len(batches)
+        self.articles += len(articles)
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "running": self._executor is not None,
+            "pending": self._pending,
+            "batches": self.batches,
+            "articles": self.articles,
+            "avg_batch_size": round(self.articles / self.batches, 2) if self.batches else 0.0,
+            "batch_size": self.batch_size,
+            "batch_wait_ms": self.batch_wait * 1000,
+        }
+
+
+_default_pool: Optional[NLPWorkerPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_nlp_pool() -> NLPWorkerPool:
+    """Return the process-wide NLP worker pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = NLPWorkerPool()
+        return _default_pool
@@ -0,0 +1,83 @@
+"""Statement counting for tests and checks, to catch N+1 query patterns.
+
+QueryCounter records every statement an engine runs while it is active.
+QueryScalingGuard measures the same requests before and after the data
+behind them grows; a route whose statement count grows with the data is
+loading rows one at a time (usually a lazy relationship in a loop) and is
+reported. Any request callable can be registered, so new endpoints only
+need a line in the check that drives the guard (benchmarks/query_scaling.py).
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Context manager collecting the statements an engine runs, from any thread"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+class QueryScalingGuard:
+    """Flags requests whose statement count grows with data size.
+
+    register() names the requests, measure() runs them all (call it once on
+    the small dataset and once after growing it), and violations() compares
+    the last two runs, allowing `slack` extra statements for one-off work
+    such as a cache miss.
+    """
+
+    def __init__(self, engine, slack: int = 0):
+        self.engine = engine
+        self.slack = slack
+        self.requests: Dict[str, Callable[[], object]] = {}
+        self.runs: List[Dict[str, QueryCounter]] = []
+
+    def register(self, name: str, request: Callable[[], object]):
+        self.requests[name] = request
+
+    def measure(self, check: Optional[Callable[[str, object], None]] = None) -> Dict[str, int]:
+        """Run every request once, returning statement counts; check(name, result) may validate responses"""
+        run = {}
+        for name, request in self.requests.items():
+            with QueryCounter(self.engine) as counter:
+                result = request()
+            if check:
+                check(name, result)
+            run[name] = counter
+        self.runs.append(run)
+        return {name: counter.count for name, counter in run.items()}
+
+    def violations(self) -> List[str]:
+        if len(self.runs) < 2:
+            raise ValueError("measure() before and after growing the data first")
+        before, after = self.runs[-2], self.runs[-1]
+        problems = []
+        for name, counter in after.items():
+            baseline = before.get(name)
+            if baseline is not None and counter.count > baseline.count + self.slack:
+                repeated = max(set(counter.statements), key=counter.statements.count)
+                problems.append(
+                    f"{name}: {baseline.count} -> {counter.count} statements; most repeated "
+                    f"({counter.statements.count(repeated)}x): {' '.join(repeated.split())[:200]}"
+                )
+        return problems
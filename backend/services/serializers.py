@@ -0,0 +1,98 @@
+import os
+from typing import Any, Iterable, Optional, Tuple
+from fastapi.responses import Response
+from services.cache import TTLCache
+
+try:
+    import orjson
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value)
+except ImportError:  # orjson is in requirements.txt; stdlib json keeps the API working without it
+    import json
+    from datetime import date
+
+    def _default(value):
+        if isinstance(value, date):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Field sets of the article shapes returned by the API
+LIST_FIELDS = (
+    "id", "title", "description", "url", "image_url", "source_name", "author",
+    "published_at", "category", "tags", "sentiment_score", "reading_time"
+)
+DETAIL_FIELDS = (
+    "id", "title", "description", "content", "url", "image_url", "source_name", "author",
+    "published_at", "category", "tags", "sentiment_score", "reading_time"
+)
+TRENDING_FIELDS = ("id", "title", "description", "url", "image_url", "source_name", "category", "published_at")
+SOURCE_FIELDS = ("id", "title", "description", "url", "image_url", "category", "published_at")
+RECOMMENDATION_FIELDS = (
+    "id", "title", "description", "url", "image_url", "source_name", "category", "sentiment_score", "reading_time"
+)
+
+
+class RawJSON:
+    """Already-encoded JSON spliced verbatim into a response"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def encode(value: Any) -> bytes:
+    """Encode a payload to JSON bytes, splicing in RawJSON fragments without re-encoding them"""
+    if isinstance(value, RawJSON):
+        return value.data
+    if isinstance(value, dict):
+        if not any(isinstance(v, (RawJSON, list, dict)) for v in value.values()):
+            return dumps(value)
+        return b"{" + b",".join(dumps(str(k)) + b":" + encode(v) for k, v in value.items()) + b"}"
+    if isinstance(value, (list, tuple)):
+        if not any(isinstance(v, (RawJSON, list, dict)) for v in value):
+            return dumps(list(value))
+        return b"[" + b",".join(encode(v) for v in value) + b"]"
+    return dumps(value)
+
+
+class ArticleSerializer:
+    """Serializes articles (ORM objects or listing rows) to cached JSON fragments.
+
+    Articles don't change after ingestion, so the encoded form of each
+    (field set, article id) pair is kept in an LRU and reused across requests.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self.fragments = TTLCache(
+            maxsize=maxsize or int(os.getenv("ARTICLE_FRAGMENT_CACHE_SIZE", 20000)),
+            ttl=ttl or float(os.getenv("ARTICLE_FRAGMENT_TTL_SECONDS", 3600))
+        )
+
+    def fragment(self, article, fields: Tuple[str, ...]) -> RawJSON:
+        """Encoded JSON object of the given fields of one article"""
+        key = (fields, article.id)
+        data = self.fragments.get(key)
+        if data is None:
+            data = dumps({field: getattr(article, field) for field in fields})
+            self.fragments.set(key, data)
+        return RawJSON(data)
+
+    def many(self, articles: Iterable, fields: Tuple[str, ...]) -> RawJSON:
+        """Encoded JSON array of articles"""
+        return RawJSON(b"[" + b",".join(self.fragment(article, fields).data for article in articles) + b"]")
+
+    def invalidate(self, article_id: int):
+        self.fragments.discard_where(lambda key: key[1] == article_id)
+
+
+def json_response(payload: Any, status_code: int = 200) -> Response:
+    """Response carrying pre-encoded JSON, bypassing jsonable_encoder"""
+    return Response(content=encode(payload), status_code=status_code, media_type="application/json")
+
+
+article_serializer = ArticleSerializer()
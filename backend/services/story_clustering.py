@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from models import Article
+from services.minhash import MinHasher, LSHIndex, word_shingles
+from services.dedup import strip_title_suffix
+
+# Only the start of the body is shingled; wire copies diverge after the lede
+CONTENT_PREFIX_CHARS = 2000
+
+
+class StoryClusterer:
+    """Incrementally groups articles that report the same story.
+
+    Articles are signed with MinHash over word shingles of title, description
+    and the start of the content, and looked up in a banded LSH index of recent
+    articles. A new article joins the cluster of its best match above the
+    threshold, or starts a new cluster identified by its own article id. Each
+    assignment only touches the LSH buckets of the new article, so cost per
+    article does not grow with the corpus.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, window_days: Optional[int] = None,
+                 num_perm: int = 128, bands: int = 32):
+        self.threshold = threshold if threshold is not None else float(os.getenv("STORY_CLUSTER_THRESHOLD", 0.5))
+        self.window_days = window_days if window_days is not None else int(os.getenv("STORY_CLUSTER_WINDOW_DAYS", 3))
+        self.num_perm = num_perm
+        self.bands = bands
+        self.minhasher = MinHasher(num_perm=num_perm)
+        self.index = LSHIndex(num_perm=num_perm, bands=bands)
+        self.cluster_of: Dict[int, int] = {}
+        self._indexed_at: Dict[int, float] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def signature(self, title: str, description: str, content: str):
+        """MinHash signature of an article's text, or None if it has no usable text"""
+        text = f"{strip_title_suffix(title or '')} {description or ''} {(content or '')[:CONTENT_PREFIX_CHARS]}"
+        shingles = word_shingles(text)
+        if not shingles:
+            return None
+        return self.minhasher.signature(shingles)
+
+    def _load(self, db: Session, exclude_ids: set):
+        """Index the articles of the clustering window already in the database"""
+        cutoff = datetime.now() - timedelta(days=self.window_days)
+        rows = db.query(
+            Article.id, Article.title, Article.description, Article.content,
+            Article.story_cluster_id, Article.created_at
+        ).filter(Article.created_at >= cutoff).yield_per(1000)
+
+        for article_id, title, description, content, cluster_id, created_at in rows:
+            if article_id in exclude_ids:
+                continue
+            signature = self.signature(title, description, content)
+            if signature is not None:
+                self._insert(article_id, signature, cluster_id or article_id, created_at.timestamp())
+        self._loaded = True
+
+    def _insert(self, article_id: int, signature, cluster_id: int, indexed_at: Optional[float] = None):
+        self.index.insert(article_id, signature)
+        self.cluster_of[article_id] = cluster_id
+        self._indexed_at[article_id] = indexed_at or time.time()
+
+    def _prune(self):
+        """Drop articles that have aged out of the clustering window"""
+        cutoff = time.time() - self.window_days * 86400
+        expired = [article_id for article_id, indexed_at in self._indexed_at.items() if indexed_at < cutoff]
+        for article_id in expired:
+            self.forget(article_id)
+
+    def forget(self, article_id: int):
+        """Remove an article from the index (e.g. after its insert was rolled back)"""
+        self.index.remove(article_id)
+        self.cluster_of.pop(article_id, None)
+        self._indexed_at.pop(article_id, None)
+
+    def assign_clusters(self, db: Session, articles: Iterable[Article]) -> int:
+        """Set story_cluster_id on flushed articles; returns how many joined an existing cluster"""
+        articles = list(articles)
+        joined = 0
+        with self._lock:
+            if not self._loaded:
+                # The articles being assigned are already flushed; don't match them against themselves
+                self._load(db, {article.id for article in articles})
+            else:
+                self._prune()
+
+            for article in articles:
+                signature = self.signature(article.title, article.description, article.content)
+                if signature is None:
+                    article.story_cluster_id = article.id
+                    continue
+
+                matches = self.index.query(signature, self.threshold)
+                if matches:
+                    article.story_cluster_id = self.cluster_of[matches[0][0]]
+                    joined += 1
+                else:
+                    article.story_cluster_id = article.id
+                self._insert(article.id, signature, article.story_cluster_id)
+
+        return joined
+
+
+def collapse_story_clusters(items: List, key=lambda item: item) -> List:
+    """Keep only the first item of each story cluster, preserving order"""
+    seen_clusters = set()
+    collapsed = []
+    for item in items:
+        article = key(item)
+        cluster_id = getattr(article, "story_cluster_id", None) or article.id
+        if cluster_id in seen_clusters:
+            continue
+        seen_clusters.add(cluster_id)
+        collapsed.append(item)
+    return collapsed
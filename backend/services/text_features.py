@@ -0,0 +1,420 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Article
+from services.artifacts import Artifact, ArtifactStore, get_artifact_store, pack_strings
+from services.events import event_bus, ARTICLES_INGESTED
+
+# Tokenisation shared by fitting and by transforming new text against a fitted vocabulary
+ANALYZER = {"stop_words": "english", "ngram_range": (1, 2), "lowercase": True}
+
+
+def article_text(title: Optional[str], description: Optional[str]) -> str:
+    return f"{title or ''} {description or ''}"
+
+
+def id_positions(sorted_ids: np.ndarray, wanted: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of `wanted` ids in a sorted id array, and which of them were found"""
+    wanted = np.asarray(list(wanted), dtype=np.int64)
+    positions = np.searchsorted(sorted_ids, wanted)
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == wanted[found]
+    return positions, found
+
+
+def fit_counts(texts: List[str], max_features: Optional[int] = None, min_df: Optional[int] = None) -> Tuple[sp.csr_matrix, List[str]]:
+    """Term counts of `texts` over a vocabulary chosen from them (TFIDF_MAX_FEATURES terms seen in TFIDF_MIN_DF docs)"""
+    max_features = max_features or int(os.getenv("TFIDF_MAX_FEATURES", 20000))
+    min_df = min_df or int(os.getenv("TFIDF_MIN_DF", 2))
+    # min_df above the corpus size would leave no terms at all
+    counter = CountVectorizer(max_features=max_features, min_df=min(min_df, max(len(texts), 1)), dtype=np.int32, **ANALYZER)
+    try:
+        return counter.fit_transform(texts).tocsr(), counter.get_feature_names_out().tolist()
+    except ValueError:
+        # Empty corpus, or nothing but stop words
+        return sp.csr_matrix((len(texts), 0), dtype=np.int32), []
+
+
+class TextFeatures:
+    """TF-IDF text features of the article corpus.
+
+    Holds the vocabulary, per-term document frequencies and the L2-normalised
+    article-by-term matrix (float32, one row per id in `article_ids`, sorted).
+    IDF follows scikit-learn's smoothed formula, so transform() gives the same
+    vectors a TfidfVectorizer fitted on the corpus would.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        document_frequency: np.ndarray,
+        documents: int,
+        article_ids: np.ndarray,
+        matrix: sp.csr_matrix,
+        idf: Optional[np.ndarray] = None
+    ):
+        self.terms = terms
+        self.document_frequency = document_frequency
+        self.documents = documents
+        self.article_ids = article_ids
+        self.matrix = matrix
+        if idf is None:
+            idf = (np.log((1 + documents) / (1 + document_frequency.astype(np.float64))) + 1).astype(np.float32)
+        self.idf = idf
+        self._counter: Optional[CountVectorizer] = None
+
+    @classmethod
+    def from_counts(cls, terms: List[str], document_frequency: np.ndarray, documents: int, article_ids: np.ndarray, counts: sp.csr_matrix) -> "TextFeatures":
+        features = cls(terms, document_frequency, documents, article_ids, sp.csr_matrix((len(article_ids), len(terms)), dtype=np.float32))
+        features.matrix = features._weigh(counts)
+        return features
+
+    def _weigh(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        if counts.shape[0] == 0:
+            # normalize() rejects an empty matrix (no articles yet)
+            return sp.csr_matrix((0, len(self.terms)), dtype=np.float32)
+        weighted = counts.astype(np.float32).multiply(self.idf).tocsr()
+        weighted = normalize(weighted, norm="l2", copy=False)
+        weighted.indices = weighted.indices.astype(np.int32, copy=False)
+        weighted.indptr = weighted.indptr.astype(np.int32, copy=False)
+        return weighted
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        """TF-IDF vectors of new text against the fitted vocabulary (unknown terms are dropped)"""
+        if self._counter is None:
+            self._counter = CountVectorizer(vocabulary={term: i for i, term in enumerate(self.terms)}, dtype=np.int32, **ANALYZER)
+        if not self.terms:
+            return sp.csr_matrix((len(texts), 0), dtype=np.float32)
+        return self._weigh(self._counter.transform(texts))
+
+    def vectors(self, article_ids: Iterable[int]) -> Tuple[sp.csr_matrix, np.ndarray]:
+        """Rows of the known articles among `article_ids`, and the mask of which were known"""
+        positions, found = id_positions(self.article_ids, article_ids)
+        return self.matrix[positions[found]], found
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "text.article_ids": self.article_ids.astype(np.int32),
+            "text.data": self.matrix.data.astype(np.float32),
+            "text.indices": self.matrix.indices.astype(np.int32),
+            "text.indptr": self.matrix.indptr.astype(np.int32),
+            "text.document_frequency": self.document_frequency.astype(np.int32),
+            "text.idf": self.idf,
+            **pack_strings("text.terms", self.terms),
+        }
+
+    def metadata(self) -> Dict:
+        return {"documents": self.documents, "terms": len(self.terms), "nnz": int(self.matrix.nnz), "analyzer": {
+            "stop_words": ANALYZER["stop_words"], "ngram_range": list(ANALYZER["ngram_range"])
+        }}
+
+    @classmethod
+    def from_artifact(cls, artifact: Artifact) -> "TextFeatures":
+        """The published features, memory-mapped (IDF included); only the vocabulary is decoded"""
+        article_ids = artifact["text.article_ids"]
+        terms = artifact.strings("text.terms")
+        matrix = sp.csr_matrix(
+            (artifact["text.data"], artifact["text.indices"], artifact["text.indptr"]),
+            shape=(len(article_ids), len(terms)), copy=False
+        )
+        # Versions published before the IDF was stored recompute it
+        idf = artifact["text.idf"] if "text.idf" in artifact else None
+        return cls(terms, artifact["text.document_frequency"], artifact.metadata["text"]["documents"], article_ids, matrix, idf)
+
+
+class _TermCounts:
+    """Growable corpus state: append-only vocabulary, running document frequencies, raw count rows"""
+
+    def __init__(self, terms: List[str], article_ids: np.ndarray, counts: sp.csr_matrix):
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.document_frequency = np.bincount(counts.indices, minlength=len(terms)).astype(np.int32)
+        self.documents = len(article_ids)
+        self.chunks: List[Tuple[np.ndarray, sp.csr_matrix]] = [(article_ids, counts)]
+        self.known = set(article_ids.tolist())
+        self.fitted_documents = self.documents
+        self.fitted_terms = len(terms)
+
+    def append(self, analyzer, article_ids: List[int], texts: List[str]) -> int:
+        """Count and append the unseen articles; cost depends only on their text"""
+        ids, indptr, indices, data = [], [0], [], []
+        for article_id, text in zip(article_ids, texts):
+            if article_id in self.known:
+                continue
+            self.known.add(article_id)
+            counts: Dict[int, int] = {}
+            for token in analyzer(text):
+                column = self.vocabulary.get(token)
+                if column is None:
+                    column = self.vocabulary[token] = len(self.terms)
+                    self.terms.append(token)
+                counts[column] = counts.get(column, 0) + 1
+            ids.append(article_id)
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        if not ids:
+            return 0
+
+        columns = np.array(indices, dtype=np.int32)
+        if len(self.terms) > len(self.document_frequency):
+            # Grow geometrically so appends stay amortised O(batch)
+            grown = np.zeros(max(len(self.terms), 2 * len(self.document_frequency)), dtype=np.int32)
+            grown[:len(self.document_frequency)] = self.document_frequency
+            self.document_frequency = grown
+        np.add.at(self.document_frequency, columns, 1)
+        self.documents += len(ids)
+        self.chunks.append((
+            np.array(ids, dtype=np.int32),
+            sp.csr_matrix((np.array(data, dtype=np.int32), columns, np.array(indptr, dtype=np.int32)), shape=(len(ids), len(self.terms)))
+        ))
+        return len(ids)
+
+    def features(self) -> TextFeatures:
+        size = len(self.terms)
+        if len(self.chunks) > 1:
+            # Fold the appended rows into one block so the next snapshot starts from it
+            ids = np.concatenate([chunk_ids for chunk_ids, _ in self.chunks])
+            counts = sp.vstack([
+                sp.csr_matrix((rows.data, rows.indices, rows.indptr), shape=(rows.shape[0], size)) for _, rows in self.chunks
+            ], format="csr")
+            order = np.argsort(ids, kind="stable")
+            self.chunks = [(ids[order], counts[order])]
+        ids, counts = self.chunks[0]
+        counts = sp.csr_matrix((counts.data, counts.indices, counts.indptr), shape=(counts.shape[0], size))
+        return TextFeatures.from_counts(list(self.terms), self.document_frequency[:size].copy(), self.documents, ids, counts)
+
+
+class IncrementalTextFeatures:
+    """TF-IDF text features kept current as articles are ingested.
+
+    The vocabulary is append-only: an ingested article's unseen terms take
+    the next columns, and document frequencies and the document count are
+    running totals, so folding in a batch costs O(batch) and never touches
+    existing rows. Raw counts are kept and weighted with the current IDF when
+    a snapshot is taken; since a new document changes every term's IDF, that
+    reweighs the whole matrix, which the sync thread does at most once per
+    TFIDF_SYNC_SECONDS and only after changes. Appending never prunes, so over time the vocabulary
+    drifts from what a fresh fit would keep (rare terms, TFIDF_MAX_FEATURES,
+    and terms the fit dropped whose frequencies count only newer articles);
+    once appended documents or terms exceed TFIDF_COMPACT_RATIO of the last
+    fit, compact() refits from the database without holding the lock, replays
+    the articles that arrived meanwhile and swaps the new state in.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        compact_ratio: Optional[float] = None,
+        sync_seconds: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.compact_ratio = compact_ratio if compact_ratio is not None else float(os.getenv("TFIDF_COMPACT_RATIO", 0.2))
+        self.sync_seconds = sync_seconds if sync_seconds is not None else float(os.getenv("TFIDF_SYNC_SECONDS", 10))
+        self.analyzer = CountVectorizer(**ANALYZER).build_analyzer()
+        self._state: Optional[_TermCounts] = None
+        self._snapshot: Optional[TextFeatures] = None
+        self._stale = False
+        self._pending: Set[int] = set()
+        self._replay: Optional[List[Tuple[List[int], List[str]]]] = None
+        self._lock = threading.RLock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.compactions = 0
+        self.last_compaction_ms: Optional[float] = None
+        event_bus.subscribe(ARTICLES_INGESTED, self._on_articles_ingested)
+
+    def _on_articles_ingested(self, article_ids: List[int], **_):
+        self.add_articles(article_ids)
+
+    def add_articles(self, article_ids: List[int]):
+        """Queue stored articles to be folded in on the next sync"""
+        with self._lock:
+            self._pending.update(article_ids)
+
+    @staticmethod
+    def _texts(db: Session, article_ids: Optional[List[int]] = None, batch_size: int = 5000) -> Tuple[List[int], List[str]]:
+        query = db.query(Article.id, Article.title, Article.description)
+        if article_ids is not None:
+            query = query.filter(Article.id.in_(article_ids))
+        rows = query.order_by(Article.id).yield_per(batch_size)
+        ids, texts = [], []
+        for article_id, title, description in rows:
+            ids.append(article_id)
+            texts.append(article_text(title, description))
+        return ids, texts
+
+    def add(self, article_ids: List[int], texts: List[str]) -> int:
+        """Append articles not seen before; returns how many were added"""
+        with self._lock:
+            if self._state is None:
+                return 0
+            if self._replay is not None:
+                self._replay.append((article_ids, texts))
+            added = self._state.append(self.analyzer, article_ids, texts)
+            if added:
+                self._stale = True
+            return added
+
+    def sync(self, db: Session):
+        """Fit on first use, then fold in ingested articles and compact when due"""
+        if self._state is None:
+            self.compact(db)
+        with self._lock:
+            pending, self._pending = sorted(self._pending), set()
+        for start in range(0, len(pending), 1000):
+            self.add(*self._texts(db, pending[start:start + 1000]))
+        if self.needs_compaction():
+            self.compact(db)
+        with self._lock:
+            # Weigh the new rows here, so readers keep the previous snapshot meanwhile
+            if (self._stale or self._snapshot is None) and self._state is not None:
+                self._snapshot, self._stale = self._state.features(), False
+
+    def needs_compaction(self) -> bool:
+        state = self._state
+        if state is None:
+            return True
+        return (
+            state.documents - state.fitted_documents > self.compact_ratio * max(state.fitted_documents, 1)
+            or len(state.terms) - state.fitted_terms > self.compact_ratio * max(state.fitted_terms, 1)
+        )
+
+    def compact(self, db: Session):
+        """Refit vocabulary and counts from the database and swap them in atomically"""
+        start = time.perf_counter()
+        with self._lock:
+            self._replay = []
+        try:
+            article_ids, texts = self._texts(db)
+            counts, terms = fit_counts(texts)
+            state = _TermCounts(terms, np.array(article_ids, dtype=np.int32), counts)
+            with self._lock:
+                # Articles appended while fitting; those the fit already saw are skipped
+                for replay_ids, replay_texts in self._replay:
+                    state.append(self.analyzer, replay_ids, replay_texts)
+                self._state, self._snapshot, self._stale = state, None, False
+        finally:
+            with self._lock:
+                self._replay = None
+        self.compactions += 1
+        self.last_compaction_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"🔤 Text features fitted: {state.documents} articles, {len(state.terms)} terms")
+
+    @property
+    def text(self) -> Optional[TextFeatures]:
+        """A consistent snapshot of the features as of the last sync"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None and self._state is not None:
+                self._snapshot = self._state.features()
+            return self._snapshot
+
+    # Scheduling
+
+    def start(self):
+        if self.session_factory is None or (self._worker and self._worker.is_alive()):
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="text-features", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                self.sync(db)
+            except Exception as e:
+                print(f"Error updating text features: {e}")
+            finally:
+                db.close()
+            self._stop.wait(self.sync_seconds)
+
+    def stats(self) -> Dict:
+        state = self._state
+        return {
+            "source": "incremental",
+            "articles": state.documents if state else 0,
+            "terms": len(state.terms) if state else 0,
+            "appended_since_fit": state.documents - state.fitted_documents if state else 0,
+            "terms_since_fit": len(state.terms) - state.fitted_terms if state else 0,
+            "pending": len(self._pending),
+            "compactions": self.compactions,
+            "last_compaction_ms": self.last_compaction_ms,
+            "worker_running": bool(self._worker and self._worker.is_alive())
+        }
+
+
+class MappedArticleFeatures:
+    """The text features of the latest published artifact.
+
+    Workers never fit anything themselves: they map whatever version the
+    builder published last and switch when a new one appears.
+    """
+
+    def __init__(self, store: ArtifactStore):
+        self.store = store
+        self._version: Optional[str] = None
+        self._mapped: Optional[TextFeatures] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[TextFeatures]:
+        artifact = self.store.latest()
+        if artifact is None or "text.indptr" not in artifact:
+            return None
+        if artifact.version != self._version:
+            with self._lock:
+                if artifact.version != self._version:
+                    self._mapped = TextFeatures.from_artifact(artifact)
+                    self._version = artifact.version
+        return self._mapped
+
+    @property
+    def text(self) -> Optional[TextFeatures]:
+        return self._current()
+
+    def start(self):
+        pass
+
+    def stop(self, timeout: float = 5.0):
+        pass
+
+    def stats(self) -> Dict:
+        text = self._current()
+        if text is None:
+            return {"source": "artifact", "version": None}
+        return {
+            "source": "artifact",
+            "version": self._version,
+            "articles": len(text.article_ids),
+            "terms": len(text.terms),
+        }
+
+
+_default_features = None
+_default_features_lock = threading.Lock()
+
+
+def get_article_features():
+    """The process-wide article features: mapped from ARTIFACT_DIR when set, otherwise kept incrementally in-process"""
+    global _default_features
+    with _default_features_lock:
+        if _default_features is None:
+            store = get_artifact_store()
+            _default_features = MappedArticleFeatures(store) if store else IncrementalTextFeatures(SessionLocal)
+        return _default_features
@@ -0,0 +1,209 @@
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models import Article, ReadingHistory, UserPreference, ArticleFeedback
+from services.cache import TTLCache
+from services.decay import DecayedCounter, DecayedRecency, SECONDS_PER_DAY
+
+
+def _timestamp(value: Optional[datetime], default: float) -> float:
+    if value is None:
+        return default
+    # SQLite hands back naive datetimes; they are UTC (server_default now())
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class CatchUpCursor:
+    """Which rows of an append-only table have been folded into a profile.
+
+    New rows are found by id, but ids are assigned at insert and concurrent
+    transactions can commit out of order, so a lower id may appear after a
+    higher one was read. Rows created within `margin` seconds of the newest
+    one seen are therefore read again and skipped by id if already folded in.
+    """
+
+    def __init__(self, margin: float):
+        self.margin = margin
+        self.last_id = 0
+        self.newest: Optional[float] = None
+        self.recent: Dict[int, float] = {}  # Folded-in ids inside the margin -> created_at
+
+    def condition(self, id_column, created_at_column):
+        if self.newest is None:
+            return id_column > self.last_id
+        since = datetime.fromtimestamp(self.newest - self.margin, timezone.utc)
+        return or_(id_column > self.last_id, created_at_column >= since)
+
+    def take(self, row_id: int, at: float) -> bool:
+        """Record a row; False if it was folded in already"""
+        if row_id in self.recent:
+            return False
+        self.recent[row_id] = at
+        self.last_id = max(self.last_id, row_id)
+        self.newest = at if self.newest is None else max(self.newest, at)
+        return True
+
+    def prune(self):
+        cutoff = (self.newest or 0) - self.margin
+        self.recent = {row_id: at for row_id, at in self.recent.items() if at >= cutoff}
+
+
+class DecayedProfile:
+    """Running reading statistics of one user, with raw and time-decayed variants"""
+
+    def __init__(self, history_half_life: float, feedback_half_life: float, catch_up_margin: float = 300):
+        self.history_half_life = history_half_life
+        self.feedback_half_life = feedback_half_life
+        self.readings = CatchUpCursor(catch_up_margin)
+        self.feedback = CatchUpCursor(catch_up_margin)
+        self.total_reads = 0
+        self.category_counts: Dict[str, int] = {}
+        self.source_counts: Dict[str, int] = {}
+        self.categories: Dict[str, DecayedCounter] = {}
+        self.sources: Dict[str, DecayedCounter] = {}
+        self.reads = DecayedCounter(history_half_life)
+        self.sentiment_sum = DecayedCounter(history_half_life)
+        self.reading_time_sum = DecayedCounter(history_half_life)
+        self.liked_keywords: Dict[str, DecayedRecency] = {}
+        self.liked_articles: Dict[int, DecayedRecency] = {}
+        self.lock = threading.Lock()
+
+    def add_read(self, at: float, category: Optional[str], source_name: Optional[str],
+                 sentiment_score: Optional[float], reading_time: Optional[int]):
+        self.total_reads += 1
+        self.reads.add(1.0, at)
+        if category:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+            self.categories.setdefault(category, DecayedCounter(self.history_half_life)).add(1.0, at)
+        if source_name:
+            self.source_counts[source_name] = self.source_counts.get(source_name, 0) + 1
+            self.sources.setdefault(source_name, DecayedCounter(self.history_half_life)).add(1.0, at)
+        if sentiment_score:
+            self.sentiment_sum.add(sentiment_score, at)
+        if reading_time:
+            self.reading_time_sum.add(reading_time, at)
+
+    def add_liked_article(self, at: float, article_id: int):
+        self.liked_articles.setdefault(article_id, DecayedRecency(self.feedback_half_life)).add(at)
+
+    def add_liked_keywords(self, at: float, keywords: List[str]):
+        for keyword in keywords:
+            self.liked_keywords.setdefault(keyword, DecayedRecency(self.feedback_half_life)).add(at)
+
+
+class UserProfileStore:
+    """Incrementally maintained, time-decayed user profiles.
+
+    The first request for a user scans their history once; later requests
+    only read reading_history / article_feedback rows newer than the last ids
+    seen (both tables are append-only), folding them into decayed counters.
+    Reads and likes lose half their weight every PROFILE_HALF_LIFE_DAYS /
+    FEEDBACK_HALF_LIFE_DAYS; a half-life of 0 disables decay. Rows created
+    within PROFILE_CATCH_UP_MARGIN_SECONDS of the newest seen are re-read in
+    case they committed out of id order (see CatchUpCursor). Explicit
+    preferences are read fresh on every build since they can change in place.
+
+    keyword_extractor(tags, description) gives the keywords of a liked
+    article, normally its stored tags.
+    """
+
+    def __init__(
+        self,
+        keyword_extractor: Callable[[Optional[List[str]], Optional[str]], List[str]],
+        history_half_life_days: Optional[float] = None,
+        feedback_half_life_days: Optional[float] = None,
+        maxsize: Optional[int] = None,
+        catch_up_margin_seconds: Optional[float] = None
+    ):
+        self.keyword_extractor = keyword_extractor
+        self.catch_up_margin_seconds = catch_up_margin_seconds if catch_up_margin_seconds is not None else float(os.getenv("PROFILE_CATCH_UP_MARGIN_SECONDS", 300))
+        self.history_half_life_days = history_half_life_days if history_half_life_days is not None else float(os.getenv("PROFILE_HALF_LIFE_DAYS", 14))
+        self.feedback_half_life_days = feedback_half_life_days if feedback_half_life_days is not None else float(os.getenv("FEEDBACK_HALF_LIFE_DAYS", 30))
+        self.history_half_life = self.history_half_life_days * SECONDS_PER_DAY
+        self.feedback_half_life = self.feedback_half_life_days * SECONDS_PER_DAY
+        # Evicted profiles are rebuilt from a full scan on next use
+        self.profiles = TTLCache(maxsize=maxsize or int(os.getenv("PROFILE_STORE_SIZE", 10000)))
+        self._lock = threading.Lock()
+
+    def _profile(self, user_id: int) -> DecayedProfile:
+        with self._lock:
+            profile = self.profiles.get(user_id)
+            if profile is None:
+                profile = DecayedProfile(self.history_half_life, self.feedback_half_life, self.catch_up_margin_seconds)
+                self.profiles.set(user_id, profile)
+            return profile
+
+    def _catch_up(self, db: Session, user_id: int, profile: DecayedProfile, now: float):
+        reads = db.query(
+            ReadingHistory.id, ReadingHistory.created_at, Article.category, Article.source_name,
+            Article.sentiment_score, Article.reading_time
+        ).join(Article, Article.id == ReadingHistory.article_id).filter(
+            ReadingHistory.user_id == user_id,
+            profile.readings.condition(ReadingHistory.id, ReadingHistory.created_at)
+        ).order_by(ReadingHistory.id).all()
+        for reading_id, created_at, category, source_name, sentiment_score, reading_time in reads:
+            at = _timestamp(created_at, now)
+            if profile.readings.take(reading_id, at):
+                profile.add_read(at, category, source_name, sentiment_score, reading_time)
+        profile.readings.prune()
+
+        likes = db.query(
+            ArticleFeedback.id, ArticleFeedback.created_at, ArticleFeedback.article_id, Article.tags, Article.description
+        ).join(
+            Article, Article.id == ArticleFeedback.article_id
+        ).filter(
+            ArticleFeedback.user_id == user_id,
+            profile.feedback.condition(ArticleFeedback.id, ArticleFeedback.created_at),
+            ArticleFeedback.liked == True
+        ).order_by(ArticleFeedback.id).all()
+        for feedback_id, created_at, article_id, tags, description in likes:
+            at = _timestamp(created_at, now)
+            if not profile.feedback.take(feedback_id, at):
+                continue
+            profile.add_liked_article(at, article_id)
+            if tags or description:
+                profile.add_liked_keywords(at, self.keyword_extractor(tags, description))
+        profile.feedback.prune()
+
+    def build(self, db: Session, user_id: int, now: Optional[datetime] = None) -> Dict:
+        """Profile dict of the shape AIService.build_user_profile returns"""
+        now_ts = (now or datetime.now()).timestamp()
+        preferences = db.query(UserPreference.category, UserPreference.weight).filter(
+            UserPreference.user_id == user_id
+        ).all()
+
+        profile = self._profile(user_id)
+        with profile.lock:
+            self._catch_up(db, user_id, profile, now_ts)
+            reads = profile.reads.value(now_ts)
+            keyword_weights = {k: r.value(now_ts) for k, r in profile.liked_keywords.items()}
+            return {
+                "user_id": user_id,
+                "preferences": {category: weight for category, weight in preferences},
+                "categories_read": dict(profile.category_counts),
+                "sources_read": dict(profile.source_counts),
+                "category_affinity": {c: counter.value(now_ts) for c, counter in profile.categories.items()},
+                "source_affinity": {s: counter.value(now_ts) for s, counter in profile.sources.items()},
+                "sentiment_preference": profile.sentiment_sum.value(now_ts) / reads if reads else 0.0,
+                "avg_reading_time": profile.reading_time_sum.value(now_ts) / reads if reads else 0.0,
+                "liked_keywords": sorted(keyword_weights, key=keyword_weights.get, reverse=True),
+                "liked_keyword_weights": keyword_weights,
+                "liked_article_weights": {a: r.value(now_ts) for a, r in profile.liked_articles.items()},
+                "total_articles_read": profile.total_reads
+            }
+
+
+_default_store: Optional[UserProfileStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_user_profile_store(keyword_extractor: Callable[[Optional[List[str]], Optional[str]], List[str]]) -> UserProfileStore:
+    """Return the process-wide profile store, creating it with the given keyword extractor"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = UserProfileStore(keyword_extractor)
+        return _default_store
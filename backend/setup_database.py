@@ -13,6 +13,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models import Base, User, UserPreference
+from database import migrate_schema
 from services.news_service import NewsService
 from passlib.context import CryptContext
 
@@ -38,6 +39,7 @@ def setup_database():
         # Create all tables
         print("📋 Creating database tables...")
         Base.metadata.create_all(bind=engine)
+        migrate_schema(engine)
         print("✅ Database tables created successfully!")
         
         # Create session
@@ -81,7 +83,7 @@ def setup_database():
         # Initialize news service and fetch initial articles
         print("📰 Fetching initial news articles...")
         news_service = NewsService()
-        articles_added = news_service.refresh_news_database(db)
+        articles_added = news_service.refresh_news_database(db)["articles_added"]
         print(f"✅ Added {articles_added} articles to database")
         
         print("\n🎉 Database setup completed successfully!")